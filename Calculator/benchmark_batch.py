@@ -0,0 +1,47 @@
+"""Benchmark batch evaluation: vectorized columns vs the scalar engine row by row.
+
+    python benchmark_batch.py
+    python benchmark_batch.py --rows 1000000 --expression "sqrt(x^2 + y^2)"
+"""
+import argparse
+import re
+import time
+
+import numpy as np
+
+from batch_eval import VectorExpression
+from expression_engine import evaluate
+
+DEFAULT_EXPRESSIONS = ("sin(x)^2 + y", "sqrt(x^2 + y^2)", "exp(-x^2/2)/sqrt(2*pi) * y")
+SCALAR_SAMPLE = 20000
+VARIABLE_PATTERN = re.compile(r"\b[xy]\b")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized batch evaluation")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--expression", action="append", dest="expressions")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    columns = {"x": rng.uniform(-5, 5, args.rows), "y": rng.uniform(-5, 5, args.rows)}
+    print(f"{args.rows:,} rows")
+    print(f"{'expression':>32} {'vector s':>9} {'rows/s':>12} {'scalar s (est.)':>16}")
+    for text in args.expressions or DEFAULT_EXPRESSIONS:
+        expression = VectorExpression(text)
+        start = time.perf_counter()
+        expression(columns)
+        vector = time.perf_counter() - start
+
+        # The scalar engine on a sample, with each row's values substituted into the text
+        sample = min(SCALAR_SAMPLE, args.rows)
+        start = time.perf_counter()
+        for i in range(sample):
+            row = {name: f"({float(column[i])!r})" for name, column in columns.items()}
+            evaluate(VARIABLE_PATTERN.sub(lambda match: row[match.group()], text))
+        scalar = (time.perf_counter() - start) / sample * args.rows
+        print(f"{text:>32} {vector:>9.3f} {args.rows / vector:>12,.0f} {scalar:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,18 @@
 import sys
-import math
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget,
-    QVBoxLayout, QLineEdit, QCheckBox,
-    QGridLayout, QPushButton
+    QVBoxLayout, QHBoxLayout, QLineEdit, QCheckBox,
+    QGridLayout, QPushButton, QComboBox, QSpinBox, QLabel, QListWidget,
+    QListWidgetItem
 )
+# The expression engine, the history tape and the optional panels are loaded
+# on first use, so that the window can appear quickly (see startup_timing.py)
+
+# Number modes offered by the calculator: label -> expression engine mode
+NUMBER_MODES = {'Float': 'float', 'Decimal': 'decimal', 'Fraction': 'fraction'}
+# The engine is imported this long after startup, once the window is up
+WARM_UP_DELAY_MS = 200
 
 class Calculator(QMainWindow):
     def __init__(self):
@@ -19,15 +27,49 @@ class Calculator(QMainWindow):
         self.display.setReadOnly(True)
         self.display.setFixedHeight(40)
         self.display.setStyleSheet("font-size: 18px; padding: 5px;")
+        self.display.textChanged.connect(self.update_live_result)
+
+        # Live result, updated incrementally as the expression changes
+        self.live_label = QLabel()
+        self.live_label.setFixedHeight(20)
+        self.live_label.setStyleSheet("color: gray; padding-right: 5px;")
+        self.live_label.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        self.live_evaluator = None
 
         # Scientific toggle
         self.scientific_checkbox = QCheckBox("Scientific")
         self.scientific_checkbox.stateChanged.connect(self.toggle_scientific)
 
+        # History tape toggle
+        self.history_checkbox = QCheckBox("History")
+        self.history_checkbox.stateChanged.connect(self.toggle_history)
+        self.toggles_layout = QHBoxLayout()
+        self.toggles_layout.addWidget(self.scientific_checkbox)
+        self.toggles_layout.addWidget(self.history_checkbox)
+
+        # Precision: binary floats, decimals with a chosen number of digits, or exact fractions
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItems(list(NUMBER_MODES))
+        self.mode_combo.currentIndexChanged.connect(self.on_mode_changed)
+        # Only shown, and given its range, once a precise mode is chosen
+        self.digits_spin = QSpinBox()
+        self.digits_spin.setSuffix(" digits")
+        self.digits_spin.hide()
+        self.digits_configured = False
+        self.live_checkbox = QCheckBox("Live")
+        self.live_checkbox.setChecked(True)
+        self.live_checkbox.stateChanged.connect(self.reset_live_evaluator)
+        self.mode_layout = QHBoxLayout()
+        self.mode_layout.addWidget(self.mode_combo)
+        self.mode_layout.addWidget(self.digits_spin)
+        self.mode_layout.addWidget(self.live_checkbox)
+
         # Layout composition
         self.main_layout = QVBoxLayout()
         self.main_layout.addWidget(self.display)
-        self.main_layout.addWidget(self.scientific_checkbox)
+        self.main_layout.addWidget(self.live_label)
+        self.main_layout.addLayout(self.toggles_layout)
+        self.main_layout.addLayout(self.mode_layout)
 
         # Buttons grid
         self.buttons_widget = QWidget()
@@ -36,10 +78,46 @@ class Calculator(QMainWindow):
         self.buttons_widget.setLayout(self.buttons_layout)
         self.main_layout.addWidget(self.buttons_widget)
 
-        self._central_widget.setLayout(self.main_layout)
+        self._history = None
+        self.history_widget = None
+        self.plot_views = []
+
+        self.outer_layout = QHBoxLayout()
+        self.outer_layout.addLayout(self.main_layout)
+        self._central_widget.setLayout(self.outer_layout)
 
         self._create_buttons()
+        self.scientific_btn_refs = []  # created on first toggle
         self.toggle_scientific()  # initialize view
+        QTimer.singleShot(WARM_UP_DELAY_MS, self._warm_up)
+
+    def _warm_up(self):
+        # Import the engine while the user is still reaching for the keys
+        import expression_engine  # noqa: F401
+
+    @property
+    def history(self):
+        if self._history is None:
+            from history import History
+            self._history = History()
+        return self._history
+
+    def _create_history_panel(self):
+        # History tape: click inserts a reference to the result, double-click recalls the expression
+        self.history_search = QLineEdit()
+        self.history_search.setPlaceholderText("Search history")
+        self.history_search.textChanged.connect(self.load_history)
+        self.history_list = QListWidget()
+        self.history_list.itemClicked.connect(self.on_history_clicked)
+        self.history_list.itemDoubleClicked.connect(self.on_history_double_clicked)
+        self.history_widget = QWidget()
+        self.history_widget.setFixedWidth(250)
+        history_layout = QVBoxLayout(self.history_widget)
+        history_layout.setContentsMargins(0, 0, 0, 0)
+        history_layout.addWidget(self.history_search)
+        history_layout.addWidget(self.history_list)
+        self.outer_layout.addWidget(self.history_widget)
+        self.load_history()
 
     def _create_buttons(self):
         # Normal calculator buttons including parentheses and backspace
@@ -53,7 +131,8 @@ class Calculator(QMainWindow):
         # Scientific calculator buttons, shifted down
         self.scientific_buttons = {
             'sin': (5, 0), 'cos': (5, 1), 'tan': (5, 2), 'log': (5, 3),
-            'ln': (6, 0), 'sqrt': (6, 1), '^': (6, 2)
+            'ln': (6, 0), 'sqrt': (6, 1), '^': (6, 2), 'ans': (6, 3),
+            'x': (7, 0), 'plot': (7, 1)
         }
 
         # Create normal buttons
@@ -63,7 +142,7 @@ class Calculator(QMainWindow):
             btn.clicked.connect(lambda _, t=text: self.on_button_clicked(t))
             self.buttons_layout.addWidget(btn, pos[0], pos[1])
 
-        # Create scientific buttons
+    def _create_scientific_buttons(self):
         self.scientific_btn_refs = []
         for text, pos in self.scientific_buttons.items():
             btn = QPushButton(text)
@@ -74,11 +153,89 @@ class Calculator(QMainWindow):
 
     def toggle_scientific(self):
         show = self.scientific_checkbox.isChecked()
+        if show and not self.scientific_btn_refs:
+            self._create_scientific_buttons()
         for btn in self.scientific_btn_refs:
             btn.setVisible(show)
-        # adjust window height based on mode
-        height = 480 if show else 380
-        self.setFixedSize(300, height)
+        self.update_size()
+
+    def toggle_history(self):
+        show = self.history_checkbox.isChecked()
+        if show and self.history_widget is None:
+            # The tape is only read when it is first shown
+            self._create_history_panel()
+        if self.history_widget is not None:
+            self.history_widget.setVisible(show)
+        self.update_size()
+
+    def update_size(self):
+        # adjust window size based on mode
+        height = 585 if self.scientific_checkbox.isChecked() else 440
+        width = 560 if self.history_checkbox.isChecked() else 300
+        self.setFixedSize(width, height)
+
+    def load_history(self):
+        query = self.history_search.text()
+        entries = self.history.search(query) if query else self.history.recent()
+        self.history_list.clear()
+        for entry in entries:
+            self.add_history_item(entry)
+
+    def add_history_item(self, entry):
+        item = QListWidgetItem(f"#{entry.id}  {entry.expression} = {entry.result}")
+        item.setData(Qt.UserRole, entry)
+        self.history_list.addItem(item)
+        self.history_list.scrollToBottom()
+
+    def on_history_clicked(self, item):
+        self.display.insert(f"#{item.data(Qt.UserRole).id}")
+
+    def on_history_double_clicked(self, item):
+        self.display.setText(item.data(Qt.UserRole).expression)
+
+    def on_mode_changed(self):
+        precise = self.number_mode() != 'float'
+        if precise and not self.digits_configured:
+            from precision import DEFAULT_DIGITS, MAX_DIGITS
+            self.digits_spin.setRange(1, MAX_DIGITS)
+            self.digits_spin.setValue(DEFAULT_DIGITS)
+            self.digits_spin.valueChanged.connect(self.reset_live_evaluator)
+            self.digits_configured = True
+        # Floats always have the same precision
+        self.digits_spin.setVisible(precise)
+        self.reset_live_evaluator()
+
+    def number_mode(self):
+        return NUMBER_MODES[self.mode_combo.currentText()]
+
+    def digits(self):
+        return self.digits_spin.value() if self.number_mode() != 'float' else 0
+
+    def reset_live_evaluator(self):
+        # Saved parse states hold values of the old mode and precision
+        self.live_evaluator = None
+        self.update_live_result()
+
+    def update_live_result(self):
+        expr = self.display.text()
+        if not expr or not self.live_checkbox.isChecked():
+            self.live_label.clear()
+            return
+        from expression_engine import format_result
+        if self.live_evaluator is None:
+            from live_eval import LiveEvaluator
+            self.live_evaluator = LiveEvaluator(self.number_mode(), self.digits())
+        try:
+            text = self.history.resolve(expr)
+        except ValueError as e:
+            # Say why a reference cannot be used, as pressing = would only show "Error"
+            self.live_label.setText(str(e))
+            return
+        result = self.live_evaluator.update(text)
+        if result is None:
+            self.live_label.clear()
+        else:
+            self.live_label.setText("= " + format_result(result, self.digits()))
 
     def on_button_clicked(self, char):
         if char == 'C':
@@ -88,6 +245,8 @@ class Calculator(QMainWindow):
             self.display.setText(current[:-1])
         elif char == '=':
             self.calculate()
+        elif char == 'plot':
+            self.plot()
         else:
             # translate '^' to '**'
             if char == '^':
@@ -104,15 +263,44 @@ class Calculator(QMainWindow):
             self.display.insert(char)
 
     def calculate(self):
+        from expression_engine import evaluate, format_result
         expr = self.display.text()
+        mode = self.number_mode()
+        digits = self.digits()
         try:
-            # Safe evaluation environment
-            allowed_names = {k: getattr(math, k) for k in dir(math) if not k.startswith('_')}
-            allowed_names.update({'abs': abs})
-            result = eval(expr, {"__builtins__": None}, allowed_names)
-            self.display.setText(str(result))
+            # A calculation already on the tape is not evaluated again
+            text = self.history.cached_result(expr, mode, digits)
+            if text is None:
+                # Parsed and compiled by the expression engine; eval is never used
+                result = evaluate(self.history.resolve(expr), mode, digits)
+                text = format_result(result, digits)
         except Exception:
             self.display.setText("Error")
+            return
+        entry = self.history.add(expr, text, mode, digits)
+        if self.history_widget is not None and not self.history_search.text():
+            self.add_history_item(entry)
+        self.display.setText(text)
+
+    def plot(self):
+        # NumPy and the plot widget are only loaded once something is plotted
+        from plot_view import PlotWidget
+        expr = self.display.text()
+        try:
+            view = PlotWidget(self.history.resolve(expr))
+        except Exception:
+            self.display.setText("Error")
+            return
+        view.setWindowTitle(f"Plot: {expr}")
+        view.resize(600, 400)
+        view.show()
+        # Keep open plots alive; closed ones can go
+        self.plot_views = [v for v in self.plot_views if v.isVisible()] + [view]
+
+    def closeEvent(self, event):
+        if self._history is not None:
+            self._history.close()
+        super().closeEvent(event)
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
@@ -0,0 +1,334 @@
+"""Expression engine for the calculator.
+
+Expressions are tokenized, parsed with a Pratt parser and compiled into a
+tree of small closures, so evaluating never goes through ``eval`` and only
+numbers, the arithmetic operators, parentheses and the names in
+``FUNCTIONS`` and ``CONSTANTS`` can appear. Results match what Python would
+compute for the same expression: ``**`` binds tighter than unary minus,
+``/`` always gives a float, integers stay exact and ``log`` is the natural
+logarithm with an optional base. ``^`` is accepted as a synonym for ``**``.
+
+Besides binary floats, expressions can be evaluated in ``decimal`` mode at a
+chosen number of significant digits, or in ``fraction`` mode with exact
+rationals (see ``precision.py``).
+
+Compiled expressions are kept in an LRU cache, and subexpressions made only
+of constants are folded when they are compiled.
+"""
+import math
+import operator
+import re
+from decimal import Decimal
+from fractions import Fraction
+from functools import lru_cache
+
+import precision
+from precision import DEFAULT_DIGITS
+
+CACHE_SIZE = 512
+# Results beyond this would not be displayable anyway (Python refuses to print
+# integers over 4300 digits); refusing them up front keeps evaluation fast
+MAX_INT_BITS = 15000
+MAX_FACTORIAL = 1500
+
+# Function table, built once: every public function of `math` plus abs
+FUNCTIONS = {name: getattr(math, name) for name in dir(math)
+             if not name.startswith('_') and callable(getattr(math, name))}
+FUNCTIONS['abs'] = abs
+CONSTANTS = {name: getattr(math, name) for name in ('pi', 'e', 'tau', 'inf', 'nan')}
+
+TOKEN_PATTERN = re.compile(r"""
+      (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<name>[A-Za-z_]\w*)
+    | (?P<op>\*\*|//|[-+*/%(),^])
+    | (?P<space>\s+)
+    | (?P<error>.)
+    """, re.VERBOSE | re.DOTALL)
+
+
+class ExpressionError(ValueError):
+    """Raised for expressions that cannot be parsed; `position` is the offending offset"""
+
+    def __init__(self, message, position):
+        super().__init__(f"{message} at position {position}")
+        self.position = position
+
+
+def _checked_pow(base, exponent):
+    if (isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and abs(base) > 1
+            and exponent * abs(base).bit_length() > MAX_INT_BITS):
+        raise OverflowError("integer result too large")
+    return operator.pow(base, exponent)
+
+
+def _checked_factorial(n):
+    if n > MAX_FACTORIAL:
+        raise OverflowError("factorial argument too large")
+    return math.factorial(n)
+
+
+# perm(n, k) and comb(n, k) are products of at most k factors <= n, so k times
+# n's bit length bounds the size of the result (comb is symmetric in k, n-k)
+def _checked_perm(n, k=None):
+    if isinstance(n, int) and n > 1:
+        count = n if k is None else k
+        if isinstance(count, int) and min(count, n) * n.bit_length() > MAX_INT_BITS:
+            raise OverflowError("integer result too large")
+    return math.perm(n, k)
+
+
+def _checked_comb(n, k):
+    if isinstance(n, int) and isinstance(k, int) and 0 <= k <= n:
+        if min(k, n - k) * n.bit_length() > MAX_INT_BITS:
+            raise OverflowError("integer result too large")
+    return math.comb(n, k)
+
+
+def _checked_lcm(*integers):
+    # One argument at a time, so no step works on more than twice the limit
+    result = 1
+    for integer in integers:
+        result = math.lcm(result, integer)
+        if result.bit_length() > MAX_INT_BITS:
+            raise OverflowError("integer result too large")
+    return result
+
+
+def _fraction_literal(literal):
+    # Fraction('1e999999999') builds 10**999999999 before anything else can check it
+    if abs(Decimal(literal).adjusted()) * math.log2(10) > MAX_INT_BITS:
+        raise OverflowError("number too large for exact arithmetic")
+    return Fraction(literal)
+
+
+FUNCTIONS['factorial'] = _checked_factorial
+FUNCTIONS['perm'] = _checked_perm
+FUNCTIONS['comb'] = _checked_comb
+FUNCTIONS['lcm'] = _checked_lcm
+
+BINARY_OPERATORS = {
+    '+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv,
+    '//': operator.floordiv, '%': operator.mod, '**': _checked_pow,
+}
+UNARY_OPERATORS = {'-': operator.neg, '+': operator.pos}
+
+# Binding powers, as in Python's grammar: unary minus binds looser than ** on
+# its right (-2**2 == -4) but tighter than everything else
+INFIX_BINDING = {'+': 10, '-': 10, '*': 20, '/': 20, '//': 20, '%': 20, '**': 40}
+PREFIX_BINDING = 30
+
+
+class _Mode:
+    """How numbers, operators, functions and constants are evaluated in one mode"""
+
+    def __init__(self, number, operators, functions, constant):
+        self.number = number
+        self.operators = operators
+        self.functions = functions
+        self.constant = constant
+
+
+# Numbers are built from the literal text so that 0.1 really is one tenth
+MODES = {
+    'float': _Mode(lambda value, literal: value, BINARY_OPERATORS, FUNCTIONS, CONSTANTS.__getitem__),
+    'decimal': _Mode(lambda value, literal: Decimal(literal), precision.DECIMAL_OPERATORS,
+                     precision.DECIMAL_FUNCTIONS, lambda name: precision.DECIMAL_CONSTANTS[name]()),
+    'fraction': _Mode(lambda value, literal: _fraction_literal(literal), precision.FRACTION_OPERATORS,
+                      precision.FRACTION_FUNCTIONS, lambda name: precision.DECIMAL_CONSTANTS[name]()),
+}
+
+
+def token_value(kind, text):
+    """The value of one token: numbers are converted and ``^`` becomes ``**``"""
+    if kind == 'number':
+        return float(text) if '.' in text or 'e' in text or 'E' in text else int(text)
+    if text == '^':
+        return '**'
+    return text
+
+
+def tokenize(text):
+    """Return ``(kind, value, position)`` tuples, ending with an ``end`` token"""
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if kind == 'space':
+            continue
+        if kind == 'error':
+            raise ExpressionError(f"unexpected character {match.group()!r}", match.start())
+        tokens.append((kind, token_value(kind, match.group()), match.start()))
+    tokens.append(('end', None, len(text)))
+    return tokens
+
+
+class _Parser:
+    """Pratt parser producing nested tuples:
+
+    ``('num', value)``, ``('const', name)``, ``('var', name)``,
+    ``('unary', op, operand)``, ``('binary', op, left, right)`` and
+    ``('call', name, args)``. Number nodes also carry their literal text as a
+    third item. Names in `variables` become ``var`` nodes, and only names in
+    `functions` may be called.
+    """
+
+    def __init__(self, text, variables=(), functions=FUNCTIONS):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.index = 0
+        self.variables = variables
+        self.functions = functions
+
+    def peek(self):
+        return self.tokens[self.index]
+
+    def advance(self):
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def expect(self, value):
+        kind, token_value, position = self.advance()
+        if token_value != value or kind != 'op':
+            raise ExpressionError(f"expected {value!r}", position)
+
+    def parse(self):
+        tree = self.expression(0)
+        kind, value, position = self.peek()
+        if kind != 'end':
+            raise ExpressionError(f"unexpected {value!r}", position)
+        return tree
+
+    def expression(self, min_binding):
+        left = self.prefix()
+        while True:
+            kind, value, _ = self.peek()
+            binding = INFIX_BINDING.get(value) if kind == 'op' else None
+            if binding is None or binding <= min_binding:
+                return left
+            self.advance()
+            # ** is right-associative, the others are left-associative
+            right = self.expression(binding - 1 if value == '**' else binding)
+            left = ('binary', value, left, right)
+
+    def prefix(self):
+        kind, value, position = self.advance()
+        if kind == 'number':
+            return ('num', value, TOKEN_PATTERN.match(self.text, position).group())
+        if kind == 'op' and value in UNARY_OPERATORS:
+            return ('unary', value, self.expression(PREFIX_BINDING))
+        if kind == 'op' and value == '(':
+            tree = self.expression(0)
+            self.expect(')')
+            return tree
+        if kind == 'name':
+            if self.peek()[1] == '(' and self.peek()[0] == 'op':
+                if value not in self.functions:
+                    if value in FUNCTIONS:
+                        raise ExpressionError(f"function {value!r} is not available in this mode", position)
+                    raise ExpressionError(f"unknown function {value!r}", position)
+                self.advance()
+                args = []
+                if self.peek()[1] != ')':
+                    args.append(self.expression(0))
+                    while self.peek()[1] == ',':
+                        self.advance()
+                        args.append(self.expression(0))
+                self.expect(')')
+                return ('call', value, args)
+            if value in self.variables:
+                return ('var', value)
+            if value not in CONSTANTS:
+                raise ExpressionError(f"unknown name {value!r}", position)
+            return ('const', value)
+        if kind == 'end':
+            raise ExpressionError("unexpected end of expression", position)
+        raise ExpressionError(f"unexpected {value!r}", position)
+
+
+def parse(text, variables=(), functions=FUNCTIONS):
+    return _Parser(text, variables, functions).parse()
+
+
+def _constant(value):
+    return lambda: value
+
+
+def _fold(function, *args):
+    """Evaluate a node whose inputs are all constant now, unless that fails.
+
+    Errors such as division by zero are left to evaluation time, so that
+    compiling never raises for a well-formed expression.
+    """
+    try:
+        return _constant(function(*(arg() for arg in args)))
+    except Exception:
+        return None
+
+
+def _compile_node(node, mode):
+    """Return ``(closure, is_constant)`` for one parse-tree node"""
+    kind = node[0]
+    if kind == 'num':
+        return _constant(mode.number(node[1], node[2])), True
+    if kind == 'const':
+        return _constant(mode.constant(node[1])), True
+    if kind == 'unary':
+        operand, constant = _compile_node(node[2], mode)
+        function = UNARY_OPERATORS[node[1]]
+        folded = constant and _fold(function, operand)
+        if folded:
+            return folded, True
+        return (lambda: function(operand())), False
+    if kind == 'binary':
+        left, left_constant = _compile_node(node[2], mode)
+        right, right_constant = _compile_node(node[3], mode)
+        function = mode.operators[node[1]]
+        folded = left_constant and right_constant and _fold(function, left, right)
+        if folded:
+            return folded, True
+        return (lambda: function(left(), right())), False
+    if kind == 'call':
+        function = mode.functions[node[1]]
+        compiled = [_compile_node(arg, mode) for arg in node[2]]
+        args = [closure for closure, _ in compiled]
+        folded = all(constant for _, constant in compiled) and _fold(function, *args)
+        if folded:
+            return folded, True
+        if len(args) == 1:
+            arg = args[0]
+            return (lambda: function(arg())), False
+        return (lambda: function(*[arg() for arg in args])), False
+    raise ValueError(f"unknown node {kind!r}")
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_expression(text, mode='float', digits=DEFAULT_DIGITS):
+    """Compile `text` into a callable returning its value; raises ExpressionError.
+
+    Decimal results depend on the precision in effect, so expressions for the
+    decimal and fraction modes must be compiled and called within
+    ``precision.context(digits)``.
+    """
+    number_mode = MODES[mode]
+    closure, _ = _compile_node(parse(text, functions=number_mode.functions), number_mode)
+    return closure
+
+
+def evaluate(text, mode='float', digits=DEFAULT_DIGITS):
+    """Evaluate `text`; arithmetic errors (ZeroDivisionError, ValueError, ...) propagate.
+
+    In ``decimal`` and ``fraction`` mode, inexact results are Decimals rounded
+    to `digits` significant digits.
+    """
+    if mode == 'float':
+        return compile_expression(text)()
+    with precision.context(digits):
+        result = compile_expression(text, mode, digits)()
+    return precision.round_result(result, digits)
+
+
+def format_result(value, digits=DEFAULT_DIGITS):
+    """Text shown for a result of `evaluate`"""
+    if isinstance(value, Decimal):
+        return precision.format_decimal(value, digits)
+    return str(value)
@@ -0,0 +1,148 @@
+"""Persistent history tape for the calculator.
+
+Every calculation is stored as one row of a small SQLite database: the
+expression, the displayed result, and the mode and precision it was computed
+in. Expressions are indexed, so a calculation that is already on the tape is
+answered from it instead of being evaluated again. The newest entries are
+read by primary key, so startup cost does not grow with the size of the tape.
+
+Expressions can refer to earlier results: ``ans`` is the last result and
+``#12`` is the result of entry 12. References are replaced by the stored
+results, in parentheses, before evaluation. A result the expression engine
+cannot read back, such as a complex number, is shown on the tape but cannot be
+referred to.
+"""
+import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+
+from expression_engine import ExpressionError, parse
+
+HISTORY_FILE = os.path.join(os.path.expanduser("~"), ".calculator", "history.sqlite3")
+RECENT_LIMIT = 200
+RESULT_CACHE_SIZE = 256
+
+REFERENCE_PATTERN = re.compile(r"#(\d+)|\bans\b")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    expression TEXT NOT NULL,
+    result TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    digits INTEGER NOT NULL,
+    created INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_expression ON entries (expression, mode, digits);
+"""
+
+
+class HistoryEntry:
+    def __init__(self, entry_id, expression, result, mode, digits):
+        self.id = entry_id
+        self.expression = expression
+        self.result = result
+        self.mode = mode
+        self.digits = digits
+
+    def __repr__(self):
+        return f"#{self.id} {self.expression} = {self.result}"
+
+
+class History:
+    """The history tape stored in `path`; use ':memory:' for a throwaway tape"""
+
+    def __init__(self, path=HISTORY_FILE):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self._results = OrderedDict()  # entry id -> result, for references
+        last = self.connection.execute(
+            "SELECT result FROM entries ORDER BY id DESC LIMIT 1").fetchone()
+        self.last_result = last[0] if last else None
+
+    def close(self):
+        self.connection.close()
+
+    def add(self, expression, result, mode, digits):
+        """Append one calculation; returns its entry"""
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO entries (expression, result, mode, digits, created) VALUES (?, ?, ?, ?, ?)",
+                (expression, result, mode, digits, int(time.time())))
+        self.last_result = result
+        self._remember(cursor.lastrowid, result)
+        return HistoryEntry(cursor.lastrowid, expression, result, mode, digits)
+
+    def cached_result(self, expression, mode, digits):
+        """The stored result of an identical earlier calculation, or None.
+
+        Expressions using ``ans`` depend on the previous result, so they are
+        never answered from the tape.
+        """
+        if 'ans' in expression:
+            return None
+        row = self.connection.execute(
+            "SELECT result FROM entries WHERE expression = ? AND mode = ? AND digits = ? "
+            "ORDER BY id DESC LIMIT 1", (expression, mode, digits)).fetchone()
+        return row[0] if row else None
+
+    def recent(self, limit=RECENT_LIMIT):
+        """The newest `limit` entries, oldest first"""
+        rows = self.connection.execute(
+            "SELECT id, expression, result, mode, digits FROM entries ORDER BY id DESC LIMIT ?",
+            (limit,)).fetchall()
+        return [HistoryEntry(*row) for row in reversed(rows)]
+
+    def search(self, text, limit=RECENT_LIMIT):
+        """The newest `limit` entries whose expression or result contains `text`, oldest first"""
+        pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        rows = self.connection.execute(
+            "SELECT id, expression, result, mode, digits FROM entries "
+            "WHERE expression LIKE ? ESCAPE '\\' OR result LIKE ? ESCAPE '\\' "
+            "ORDER BY id DESC LIMIT ?", (pattern, pattern, limit)).fetchall()
+        return [HistoryEntry(*row) for row in reversed(rows)]
+
+    def result(self, entry_id):
+        """The result of entry `entry_id`, or None if there is no such entry"""
+        result = self._results.get(entry_id)
+        if result is not None:
+            self._results.move_to_end(entry_id)
+            return result
+        row = self.connection.execute("SELECT result FROM entries WHERE id = ?", (entry_id,)).fetchone()
+        if row is None:
+            return None
+        self._remember(entry_id, row[0])
+        return row[0]
+
+    def _remember(self, entry_id, result):
+        self._results[entry_id] = result
+        while len(self._results) > RESULT_CACHE_SIZE:
+            self._results.popitem(last=False)
+
+    def resolve(self, expression):
+        """Replace ``ans`` and ``#N`` in `expression` by the results they refer to"""
+        def replace(match):
+            if match.group(1) is None:
+                result = self.last_result
+                if result is None:
+                    raise ExpressionError("no previous result for 'ans'", match.start())
+            else:
+                result = self.result(int(match.group(1)))
+                if result is None:
+                    raise ExpressionError(f"no history entry {match.group()}", match.start())
+            try:
+                parse(result)
+            except ExpressionError:
+                # Such as a complex result: it was shown, but cannot be typed back in
+                raise ExpressionError(f"result of {match.group()} is not reusable: {result}",
+                                      match.start()) from None
+            return f"({result})"
+        if '#' not in expression and 'ans' not in expression:
+            return expression
+        return REFERENCE_PATTERN.sub(replace, expression)
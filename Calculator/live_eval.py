@@ -0,0 +1,217 @@
+"""Live evaluation of the calculator display while the expression is typed.
+
+The expression is parsed by an operator-precedence (shift-reduce) parser
+that evaluates as it reduces, so its state holds the values of every
+subexpression completed so far. States are immutable linked stacks, and the
+state before each token is kept. When the text changes, only the tokens
+from the first edited character onwards are re-tokenized, and parsing
+resumes from the state saved before them. Typing at the end therefore costs
+one or two tokens of work, however long the expression is.
+
+Results are the same as ``expression_engine.evaluate`` for complete
+expressions. Unclosed parentheses are treated as closed, so that ``sqrt(2``
+already shows a value.
+"""
+from bisect import bisect_left
+from collections import OrderedDict
+
+import precision
+from expression_engine import (INFIX_BINDING, MODES, PREFIX_BINDING, TOKEN_PATTERN, UNARY_OPERATORS,
+                               ExpressionError, token_value)
+from precision import DEFAULT_DIGITS
+
+MEMO_SIZE = 256
+# A number token may look up to this many characters past its end ("1e-5")
+LOOKAHEAD = 2
+
+# Parser state: (values, operators, expecting_operand, pending_name). Values and
+# operators are linked stacks, ``(top, rest)`` or None, so saved states share them.
+# Operators are ('unary', op), ('binary', op, binding), ('paren',) or ('call', name, commas).
+INITIAL_STATE = (None, None, True, None)
+
+
+class LiveEvaluator:
+    """Evaluates successive versions of one expression, reparsing only what changed"""
+
+    def __init__(self, mode='float', digits=DEFAULT_DIGITS):
+        self.mode = MODES[mode]
+        self.mode_name = mode
+        self.digits = digits
+        self.text = ''
+        self.tokens = []  # (kind, value, start, end, literal)
+        self.states = [INITIAL_STATE]  # states[i] is the state before tokens[i]
+        self.error = None
+        self._calls = OrderedDict()
+
+    def update(self, text):
+        """Evaluate `text`; returns None while it is incomplete or invalid (see `error`)"""
+        if self.mode_name == 'float':
+            return self._update(text)
+        with precision.context(self.digits):
+            result = self._update(text)
+        return precision.round_result(result, self.digits) if result is not None else None
+
+    def _update(self, text):
+        changed = _common_prefix_length(self.text, text)
+        # Keep the tokens that cannot have been affected by the edit
+        kept = bisect_left(self.tokens, changed - LOOKAHEAD, key=_token_end)
+        del self.tokens[kept:]
+        del self.states[kept + 1:]
+        start = self.tokens[-1][3] if self.tokens else 0
+        self.text = text
+
+        state = self.states[-1]
+        for match in TOKEN_PATTERN.finditer(text, start):
+            kind = match.lastgroup
+            if kind == 'space':
+                continue
+            literal = match.group()
+            token = (kind, token_value(kind, literal), match.start(), match.end(), literal)
+            if not isinstance(state, Exception):
+                try:
+                    state = self._step(state, token)
+                except Exception as e:
+                    # Failed states stay failed until the text before them changes
+                    state = e
+            self.tokens.append(token)
+            self.states.append(state)
+
+        self.error = None
+        if isinstance(state, Exception):
+            self.error = state
+            return None
+        try:
+            return self._finish(state)
+        except Exception as e:
+            self.error = e
+            return None
+
+    # -- parsing ---------------------------------------------------------------
+
+    def _step(self, state, token):
+        values, operators, expecting, pending = state
+        kind, value, position, _, literal = token
+        if pending is not None:
+            if kind == 'op' and value == '(':
+                if pending[0] not in self.mode.functions:
+                    raise ExpressionError(f"unknown function {pending[0]!r}", pending[1])
+                return values, (('call', pending[0], 0), operators), True, None
+            values, operators, expecting, pending = self._resolve_name(state)
+
+        if expecting:
+            if kind == 'number':
+                return (self.mode.number(value, literal), values), operators, False, None
+            if kind == 'name':
+                return values, operators, False, (value, position)
+            if kind == 'op' and value == '(':
+                return values, (('paren',), operators), True, None
+            if kind == 'op' and value in UNARY_OPERATORS:
+                return values, (('unary', value), operators), True, None
+            if kind == 'op' and value == ')' and operators and operators[0][0] == 'call' and operators[0][2] == 0:
+                # A call without arguments
+                _, name, _ = operators[0]
+                return (self._call(name, ()), values), operators[1], False, None
+            raise ExpressionError(f"unexpected {value!r}", position)
+
+        if kind != 'op':
+            raise ExpressionError(f"unexpected {value!r}", position)
+        binding = INFIX_BINDING.get(value)
+        if binding is not None:
+            values, operators = self._reduce(values, operators, binding, value == '**')
+            return values, (('binary', value, binding), operators), True, None
+        if value in (')', ','):
+            values, operators = self._reduce(values, operators, -1, False)
+            if operators is None or operators[0][0] not in ('paren', 'call'):
+                raise ExpressionError(f"unexpected {value!r}", position)
+            if value == ',':
+                if operators[0][0] != 'call':
+                    raise ExpressionError("unexpected ','", position)
+                _, name, commas = operators[0]
+                return values, (('call', name, commas + 1), operators[1]), True, None
+            values, operators = self._close(values, operators)
+            return values, operators, False, None
+        raise ExpressionError(f"unexpected {value!r}", position)
+
+    def _resolve_name(self, state):
+        values, operators, _, (name, position) = state
+        try:
+            constant = self.mode.constant(name)
+        except KeyError:
+            raise ExpressionError(f"unknown name {name!r}", position) from None
+        return (constant, values), operators, False, None
+
+    def _reduce(self, values, operators, binding, right_associative):
+        """Apply the stacked operators that bind tighter than an incoming `binding`"""
+        while operators is not None:
+            operator = operators[0]
+            if operator[0] == 'unary':
+                if PREFIX_BINDING < binding:
+                    break
+                operand, values = values
+                values = (UNARY_OPERATORS[operator[1]](operand), values)
+            elif operator[0] == 'binary':
+                if operator[2] < binding or (operator[2] == binding and right_associative):
+                    break
+                right, (left, values) = values
+                values = (self.mode.operators[operator[1]](left, right), values)
+            else:
+                break
+            operators = operators[1]
+        return values, operators
+
+    def _close(self, values, operators):
+        """Pop the parenthesis or call on top of `operators`, calling the function"""
+        operator, operators = operators
+        if operator[0] == 'paren':
+            return values, operators
+        args = []
+        for _ in range(operator[2] + 1):
+            arg, values = values
+            args.append(arg)
+        return (self._call(operator[1], tuple(reversed(args))), values), operators
+
+    def _call(self, name, args):
+        # Types are part of the key: factorial(2) is valid but factorial(2.) is not
+        key = (name, args, tuple(type(arg) for arg in args))
+        result = self._calls.get(key)
+        if result is None:
+            result = self.mode.functions[name](*args)
+            self._calls[key] = result
+            if len(self._calls) > MEMO_SIZE:
+                self._calls.popitem(last=False)
+        else:
+            self._calls.move_to_end(key)
+        return result
+
+    def _finish(self, state):
+        """The value of the expression if it ended after `state`, closing open parentheses"""
+        if state[3] is not None:
+            state = self._resolve_name(state)
+        values, operators, expecting, _ = state
+        if expecting:
+            return None
+        while True:
+            values, operators = self._reduce(values, operators, -1, False)
+            if operators is None:
+                return values[0]
+            values, operators = self._close(values, operators)
+
+
+def _token_end(token):
+    return token[3]
+
+
+def _common_prefix_length(a, b):
+    if b.startswith(a):
+        return len(a)
+    n = min(len(a), len(b))
+    low, high = 0, n
+    # Binary search over prefix comparisons, which run at C speed
+    # low is a known common prefix length; only a[low:middle] needs comparing
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
@@ -0,0 +1,313 @@
+"""Function plots for the calculator's scientific panel.
+
+An expression in ``x`` is evaluated with NumPy (see ``batch_eval.py``) over
+tiles of the x axis. Each tile starts from an even grid and is refined where
+the curve bends sharply or leaves its domain. Jumps that refinement cannot
+resolve, such as the asymptotes of ``tan``, break the line. Tiles are cached
+per zoom level, so panning only samples the tiles that come into view.
+
+Before drawing, the samples are reduced to the first, lowest, highest and
+last point of every pixel column. The cost of a frame therefore depends on
+the width of the widget rather than on the number of samples.
+"""
+import math
+from collections import OrderedDict
+
+import numpy as np
+from PyQt5.QtCore import Qt, QPointF
+from PyQt5.QtGui import QColor, QPainter, QPen, QPolygonF
+from PyQt5.QtWidgets import QWidget
+
+from batch_eval import VectorExpression
+
+TILE_SAMPLES = 256
+MAX_TILE_SAMPLES = 16 * TILE_SAMPLES
+MAX_REFINEMENTS = 8
+# Tiles are 2**level wide, chosen so that about this many cover the view
+TILES_PER_VIEW = 4
+TILE_CACHE_SIZE = 1024
+# A sample this far off the chord of its neighbours, relative to the curve's
+# height in the tile, gets the intervals around it refined
+CURVATURE_TOLERANCE = 2e-4
+# After refinement, an interval rising this much faster than both of its
+# neighbours is a discontinuity rather than a steep part of the curve
+JUMP_RATIO = 64
+# Curves whose drawn length exceeds this many widget heights are drawn without antialiasing
+ANTIALIAS_LIMIT = 50
+FIT_SAMPLES = 512
+# Zoom limits for the width of the view, well within float precision
+MIN_SPAN = 1e-9
+MAX_SPAN = 1e12
+
+AXIS_COLOR = QColor('#808080')
+GRID_COLOR = QColor('#e6e6e6')
+CURVE_COLOR = QColor('#1f5fbf')
+
+
+def _height(y):
+    finite = y[np.isfinite(y)]
+    if finite.size < 2:
+        return 0.0
+    low, high = np.percentile(finite, (5, 95))
+    return high - low
+
+
+def _rough_intervals(x, y, height):
+    """Intervals worth splitting: at the edge of the domain or next to a sharp bend"""
+    finite = np.isfinite(y)
+    flagged = finite[:-1] != finite[1:]
+    if x.size < 3 or height <= 0:
+        return flagged
+    # Distance of each interior sample from the chord through its neighbours
+    t = (x[1:-1] - x[:-2]) / (x[2:] - x[:-2])
+    deviation = np.abs(y[1:-1] - (y[:-2] + (y[2:] - y[:-2]) * t))
+    bent = deviation > CURVATURE_TOLERANCE * height
+    flagged[:-1] |= bent
+    flagged[1:] |= bent
+    return flagged
+
+
+def _jumps(x, y, height, resolution):
+    """Intervals the curve does not cross continuously.
+
+    Only intervals refined down to `resolution` are considered. A step is much
+    steeper than the intervals on either side of it; at a pole the curve jumps
+    against the direction it runs in on both sides.
+    """
+    dy = np.diff(y)
+    jumps = (np.abs(dy) > 0.25 * height) & (np.diff(x) <= resolution)
+    if dy.size > 2:
+        slope = dy / np.diff(x)
+        before, after = np.r_[0, slope[:-1]], np.r_[slope[1:], 0]
+        steep = np.abs(slope) > JUMP_RATIO * np.maximum(np.abs(before), np.abs(after))
+        reversed_ = (np.sign(before) == -np.sign(slope)) & (np.sign(after) == -np.sign(slope))
+        jumps &= steep | reversed_
+    return jumps
+
+
+def _evaluate(function, x):
+    y = function({'x': x})
+    # Infinite values cannot be drawn; they break the line like NaNs
+    y[np.isinf(y)] = np.nan
+    return y
+
+
+def sample_tile(function, x0, x1):
+    """Adaptively sample `function` on [x0, x1]; returns sorted x and y arrays"""
+    x = np.linspace(x0, x1, TILE_SAMPLES + 1)
+    y = _evaluate(function, x)
+    height = _height(y)
+    for _ in range(MAX_REFINEMENTS):
+        if x.size >= MAX_TILE_SAMPLES:
+            break
+        flagged = _rough_intervals(x, y, height)
+        if not flagged.any():
+            break
+        positions = np.flatnonzero(flagged) + 1
+        middle = (x[positions - 1] + x[positions]) / 2
+        x = np.insert(x, positions, middle)
+        y = np.insert(y, positions, _evaluate(function, middle))
+    # Intervals as narrow as the last refinements make them; wider ones were left
+    # alone because the curve is smooth there, or the sample budget ran out
+    resolution = (x1 - x0) / TILE_SAMPLES / 2 ** (MAX_REFINEMENTS - 2)
+    jumps = _jumps(x, y, height, resolution)
+    if jumps.any():
+        positions = np.flatnonzero(jumps) + 1
+        x = np.insert(x, positions, (x[positions - 1] + x[positions]) / 2)
+        y = np.insert(y, positions, np.nan)
+    return x, y
+
+
+def downsample(x, y, x_min, x_max, columns):
+    """Reduce sorted samples to at most four points per pixel column.
+
+    The first, lowest, highest and last sample of each column are kept, so the
+    drawn line covers the same pixels as one through every sample. NaNs break
+    the line.
+    """
+    start, stop = np.searchsorted(x, (x_min, x_max))
+    # One sample beyond each edge keeps the line running off the sides
+    x = x[max(start - 1, 0):stop + 1]
+    y = y[max(start - 1, 0):stop + 1]
+    if x.size <= 4 * columns:
+        return x, y
+    column = ((x - x_min) * (columns / (x_max - x_min))).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, column[1:] != column[:-1]])
+    ends = np.r_[starts[1:], x.size] - 1
+    nan = np.isnan(y)
+    low = np.fmin.reduceat(y, starts)
+    high = np.fmax.reduceat(y, starts)
+    broken = np.add.reduceat(nan, starts) > 0
+    rising = y[starts] <= y[ends]
+    middle_x = (x[starts] + x[ends]) / 2
+    second = np.where(rising, low, high)
+    third = np.where(rising, high, low)
+    second[broken] = np.nan
+    third[broken] = np.nan
+    xs = np.column_stack((x[starts], middle_x, middle_x, x[ends])).ravel()
+    ys = np.column_stack((y[starts], second, third, y[ends])).ravel()
+    return xs, ys
+
+
+def _polygon(px, py):
+    """A QPolygonF filled straight from the coordinate arrays, without a QPointF per point"""
+    polygon = QPolygonF(px.size)
+    buffer = polygon.data()
+    buffer.setsize(px.size * 2 * np.dtype(np.float64).itemsize)
+    points = np.frombuffer(buffer, np.float64).reshape(-1, 2)
+    points[:, 0] = px
+    points[:, 1] = py
+    return polygon
+
+
+def _nice_step(span, count):
+    raw = span / count
+    power = 10 ** math.floor(math.log10(raw))
+    for factor in (1, 2, 5, 10):
+        if raw <= factor * power:
+            return factor * power
+    return 10 * power
+
+
+class PlotWidget(QWidget):
+    """Graph of an expression in ``x``; drag to pan, wheel to zoom, double-click to fit"""
+
+    def __init__(self, expression, parent=None):
+        super().__init__(parent)
+        # Raises ExpressionError for expressions that cannot be plotted
+        self.function = VectorExpression(expression, ('x',))
+        self.expression = expression
+        self.x_range = (-10.0, 10.0)
+        self.y_range = (-10.0, 10.0)
+        self._tiles = OrderedDict()
+        self._drag = None
+        self.setMinimumSize(300, 200)
+        self.setAutoFillBackground(True)
+        self.fit_y()
+
+    # -- sampling --------------------------------------------------------------
+
+    def tile(self, level, index):
+        key = (level, index)
+        tile = self._tiles.get(key)
+        if tile is None:
+            width = 2.0 ** level
+            tile = self._tiles[key] = sample_tile(self.function, index * width, (index + 1) * width)
+            while len(self._tiles) > TILE_CACHE_SIZE:
+                self._tiles.popitem(last=False)
+        else:
+            self._tiles.move_to_end(key)
+        return tile
+
+    def visible_samples(self):
+        x_min, x_max = self.x_range
+        level = math.floor(math.log2((x_max - x_min) / TILES_PER_VIEW))
+        width = 2.0 ** level
+        tiles = [self.tile(level, index)
+                 for index in range(math.floor(x_min / width), math.floor(x_max / width) + 1)]
+        return np.concatenate([x for x, _ in tiles]), np.concatenate([y for _, y in tiles])
+
+    def fit_y(self):
+        """Choose a y range showing the bulk of the visible curve"""
+        # An even grid, as refined samples crowd around poles and steps
+        y = _evaluate(self.function, np.linspace(*self.x_range, FIT_SAMPLES))
+        finite = y[np.isfinite(y)]
+        if finite.size:
+            low, high = np.percentile(finite, (5, 95))
+            if high - low < 1e-12:
+                low, high = low - 1, high + 1
+            margin = (high - low) * 0.1
+            self.y_range = (float(low - margin), float(high + margin))
+        self.update()
+
+    # -- painting --------------------------------------------------------------
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.white)
+        width, height = self.width(), self.height()
+        x_min, x_max = self.x_range
+        y_min, y_max = self.y_range
+        x_scale = width / (x_max - x_min)
+        y_scale = height / (y_max - y_min)
+
+        self._paint_grid(painter, width, height)
+
+        x, y = self.visible_samples()
+        x, y = downsample(x, y, x_min, x_max, width)
+        px = (x - x_min) * x_scale
+        # Clamped so far-off points still draw as steep lines without overflowing
+        py = np.clip((y_max - y) * y_scale, -10 * height, 11 * height)
+        if np.nansum(np.abs(np.diff(py))) < ANTIALIAS_LIMIT * height:
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setPen(QPen(CURVE_COLOR, 1.5))
+        else:
+            # A curve filling whole pixel columns is slow to antialias, and it would not show
+            painter.setPen(QPen(CURVE_COLOR, 0))
+        breaks = np.flatnonzero(np.isnan(py))
+        for segment_x, segment_y in zip(np.split(px, breaks), np.split(py, breaks)):
+            keep = ~np.isnan(segment_y)
+            if keep.sum() >= 2:
+                painter.drawPolyline(_polygon(segment_x[keep], segment_y[keep]))
+        painter.end()
+
+    def _paint_grid(self, painter, width, height):
+        x_min, x_max = self.x_range
+        y_min, y_max = self.y_range
+        x_scale = width / (x_max - x_min)
+        y_scale = height / (y_max - y_min)
+        step = _nice_step(x_max - x_min, 8)
+        for i in range(math.ceil(x_min / step), math.floor(x_max / step) + 1):
+            px = (i * step - x_min) * x_scale
+            painter.setPen(GRID_COLOR)
+            painter.drawLine(QPointF(px, 0), QPointF(px, height))
+            painter.setPen(AXIS_COLOR)
+            painter.drawText(QPointF(px + 2, height - 4), f"{i * step:g}")
+        step = _nice_step(y_max - y_min, 6)
+        for i in range(math.ceil(y_min / step), math.floor(y_max / step) + 1):
+            py = (y_max - i * step) * y_scale
+            painter.setPen(GRID_COLOR)
+            painter.drawLine(QPointF(0, py), QPointF(width, py))
+            painter.setPen(AXIS_COLOR)
+            painter.drawText(QPointF(2, py - 2), f"{i * step:g}")
+        painter.setPen(AXIS_COLOR)
+        if x_min <= 0 <= x_max:
+            painter.drawLine(QPointF(-x_min * x_scale, 0), QPointF(-x_min * x_scale, height))
+        if y_min <= 0 <= y_max:
+            painter.drawLine(QPointF(0, y_max * y_scale), QPointF(width, y_max * y_scale))
+
+    # -- navigation ------------------------------------------------------------
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._drag = (event.pos(), self.x_range, self.y_range)
+
+    def mouseMoveEvent(self, event):
+        if self._drag is None:
+            return
+        start, (x_min, x_max), (y_min, y_max) = self._drag
+        dx = (event.pos().x() - start.x()) * (x_max - x_min) / self.width()
+        dy = (event.pos().y() - start.y()) * (y_max - y_min) / self.height()
+        self.x_range = (x_min - dx, x_max - dx)
+        self.y_range = (y_min + dy, y_max + dy)
+        self.update()
+
+    def mouseReleaseEvent(self, event):
+        self._drag = None
+
+    def mouseDoubleClickEvent(self, event):
+        self.fit_y()
+
+    def wheelEvent(self, event):
+        factor = 0.8 ** (event.angleDelta().y() / 120)
+        position = event.pos()
+        x_min, x_max = self.x_range
+        if not MIN_SPAN <= (x_max - x_min) * factor <= MAX_SPAN:
+            return
+        y_min, y_max = self.y_range
+        # Zoom around the point under the cursor
+        x = x_min + position.x() / self.width() * (x_max - x_min)
+        y = y_max - position.y() / self.height() * (y_max - y_min)
+        self.x_range = (x - (x - x_min) * factor, x + (x_max - x) * factor)
+        self.y_range = (y - (y - y_min) * factor, y + (y_max - y) * factor)
+        self.update()
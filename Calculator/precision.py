@@ -0,0 +1,344 @@
+"""Decimal and exact rational arithmetic for the calculator's precise modes.
+
+In ``decimal`` mode numbers are ``Decimal`` values and every operation is
+rounded to the selected number of digits (plus a few guard digits). In
+``fraction`` mode numbers are ``Fraction`` values, so arithmetic stays exact;
+functions without an exact result, such as ``sin``, are computed in decimal
+at the selected precision and give a ``Decimal``.
+
+Constants (pi, ln 2) are cached at the highest precision computed so far and
+rounded down for lower precisions, and the inverse factorials used by the
+sine series are cached per precision, so repeated high-precision results
+come back quickly.
+"""
+import math
+import operator
+from decimal import (Context, Decimal, InvalidOperation, MAX_EMAX, MIN_EMIN, ROUND_CEILING,
+                     ROUND_DOWN, ROUND_FLOOR, getcontext, localcontext)
+from fractions import Fraction
+
+DEFAULT_DIGITS = 50
+MAX_DIGITS = 10000
+GUARD_DIGITS = 5
+MAX_FACTORIAL = 100000
+MAX_EXACT_FACTORIAL = 1500
+# Exact results beyond this would not be displayable anyway, as in float mode
+MAX_INT_BITS = 15000
+MAX_CACHED_PRECISIONS = 8
+
+
+def context(digits):
+    """Context manager for evaluating at `digits` significant digits"""
+    if not 1 <= digits <= MAX_DIGITS:
+        raise ValueError(f"digits must be between 1 and {MAX_DIGITS}")
+    return localcontext(Context(prec=digits + GUARD_DIGITS, Emax=MAX_EMAX, Emin=MIN_EMIN))
+
+
+def round_result(value, digits):
+    """Round a Decimal result to `digits` significant digits; exact values are returned as they are"""
+    if isinstance(value, Decimal):
+        return Context(prec=digits, Emax=MAX_EMAX, Emin=MIN_EMIN).plus(value)
+    return value
+
+
+def format_decimal(value, digits):
+    """Show `value` without trailing zeros, and integers in plain notation when they fit"""
+    if not value.is_finite():
+        return str(value)
+    value = value.normalize(Context(prec=digits, Emax=MAX_EMAX, Emin=MIN_EMIN))
+    if value.as_tuple().exponent > 0 and value.adjusted() < digits:
+        return f"{value:f}"
+    return str(value)
+
+
+def to_decimal(value):
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, Fraction):
+        return Decimal(value.numerator) / value.denominator
+    return Decimal(value)
+
+
+# -- constants --------------------------------------------------------------
+
+_constants = {}  # name -> (precision, value)
+
+
+def _cached_constant(name, compute):
+    """`name` at the current precision, computing it only when more digits are needed"""
+    prec = getcontext().prec
+    cached = _constants.get(name)
+    if cached is None or cached[0] < prec:
+        cached = (prec, compute(prec))
+        _constants[name] = cached
+    return +cached[1]
+
+
+def _compute_pi(prec):
+    # Gauss-Legendre: the number of correct digits doubles with each iteration
+    with localcontext() as ctx:
+        ctx.prec = prec + 10
+        a, b, t, p = Decimal(1), Decimal(2).sqrt() / 2, Decimal('0.25'), 1
+        for _ in range(int(math.log2(ctx.prec)) + 2):
+            a, b, t, p = (a + b) / 2, (a * b).sqrt(), t - p * ((a - b) / 2) ** 2, 2 * p
+        return (a + b) ** 2 / (4 * t)
+
+
+def _compute_ln2(prec):
+    with localcontext() as ctx:
+        ctx.prec = prec + 10
+        return Decimal(2).ln()
+
+
+def pi():
+    return _cached_constant('pi', _compute_pi)
+
+
+def tau():
+    return 2 * pi()
+
+
+def e():
+    return Decimal(1).exp()
+
+
+# -- series -----------------------------------------------------------------
+
+_inverse_factorials = {}  # precision -> [1/0!, 1/1!, 1/2!, ...]
+
+
+def _inverse_factorial(n):
+    prec = getcontext().prec
+    terms = _inverse_factorials.get(prec)
+    if terms is None:
+        if len(_inverse_factorials) >= MAX_CACHED_PRECISIONS:
+            del _inverse_factorials[next(iter(_inverse_factorials))]
+        terms = _inverse_factorials[prec] = [Decimal(1)]
+    while len(terms) <= n:
+        terms.append(terms[-1] / len(terms))
+    return terms[n]
+
+
+def _sin_series(x):
+    """Taylor series of sin for a small `x`"""
+    if not x:
+        return x
+    square = x * x
+    power = total = x
+    limit = x.adjusted() - getcontext().prec - 1
+    n = 1
+    while True:
+        power *= square
+        term = power * _inverse_factorial(2 * n + 1)
+        if not term or term.adjusted() < limit:
+            return total
+        total = total - term if n % 2 else total + term
+        n += 1
+
+
+def _sin(x, quarter_turns=0):
+    """sin(x + quarter_turns * pi/2)"""
+    x = to_decimal(x)
+    if not x.is_finite():
+        raise ValueError("math domain error")
+    if x.adjusted() > MAX_DIGITS:
+        raise ValueError("argument too large")
+    with localcontext() as ctx:
+        # Digits lost to the reduction modulo 2*pi and to the triple-angle steps below
+        triplings = int(math.sqrt(ctx.prec)) // 2
+        ctx.prec += max(0, x.adjusted()) + triplings // 2 + GUARD_DIGITS
+        half_pi = pi() / 2
+        x = (x + quarter_turns * half_pi).remainder_near(4 * half_pi)
+        # sin(3a) = 3 sin(a) - 4 sin(a)^3, so the series only sees x / 3^k
+        s = _sin_series(x / 3 ** triplings)
+        for _ in range(triplings):
+            s = s * (3 - 4 * s * s)
+    return +s
+
+
+def sin(x):
+    return _sin(x)
+
+
+def cos(x):
+    return _sin(x, 1)
+
+
+def tan(x):
+    with localcontext() as ctx:
+        ctx.prec += GUARD_DIGITS
+        result = sin(x) / cos(x)
+    return +result
+
+
+# -- other functions --------------------------------------------------------
+
+def sqrt(x):
+    return to_decimal(x).sqrt()
+
+
+def exp(x):
+    return to_decimal(x).exp()
+
+
+def log(x, base=None):
+    if base is None:
+        return to_decimal(x).ln()
+    with localcontext() as ctx:
+        ctx.prec += GUARD_DIGITS
+        result = to_decimal(x).ln() / to_decimal(base).ln()
+    return +result
+
+
+def log10(x):
+    return to_decimal(x).log10()
+
+
+def log2(x):
+    with localcontext() as ctx:
+        ctx.prec += GUARD_DIGITS
+        result = to_decimal(x).ln() / _cached_constant('ln2', _compute_ln2)
+    return +result
+
+
+def power(base, exponent):
+    return to_decimal(base) ** to_decimal(exponent)
+
+
+def _integral(x, rounding):
+    return to_decimal(x).to_integral_value(rounding=rounding)
+
+
+def floor(x):
+    return _integral(x, ROUND_FLOOR)
+
+
+def ceil(x):
+    return _integral(x, ROUND_CEILING)
+
+
+def trunc(x):
+    return _integral(x, ROUND_DOWN)
+
+
+def factorial(n):
+    n = to_decimal(n)
+    if n != n.to_integral_value() or n < 0:
+        raise ValueError("factorial() only accepts non-negative integral values")
+    if n > MAX_FACTORIAL:
+        raise OverflowError("factorial argument too large")
+    with localcontext() as ctx:
+        ctx.prec += len(str(MAX_FACTORIAL))
+        result = Decimal(1)
+        for i in range(2, int(n) + 1):
+            result *= i
+    return +result
+
+
+def degrees(x):
+    return to_decimal(x) * 180 / pi()
+
+
+def radians(x):
+    return to_decimal(x) * pi() / 180
+
+
+def hypot(*args):
+    return sum(to_decimal(arg) ** 2 for arg in args).sqrt()
+
+
+def floordiv(a, b):
+    """Python's floor division; Decimal's own // truncates towards zero"""
+    quotient, remainder = divmod(a, b)
+    if remainder and (remainder < 0) != (b < 0):
+        quotient -= 1
+    return quotient
+
+
+def mod(a, b):
+    """Python's modulo, with the sign of the divisor"""
+    remainder = a % b
+    if remainder and (remainder < 0) != (b < 0):
+        remainder += b
+    return remainder
+
+
+DECIMAL_FUNCTIONS = {
+    'sin': sin, 'cos': cos, 'tan': tan, 'sqrt': sqrt, 'exp': exp, 'log': log,
+    'log10': log10, 'log2': log2, 'pow': power, 'abs': abs, 'fabs': abs,
+    'floor': floor, 'ceil': ceil, 'trunc': trunc, 'factorial': factorial,
+    'degrees': degrees, 'radians': radians, 'hypot': hypot,
+}
+DECIMAL_CONSTANTS = {
+    'pi': pi, 'e': e, 'tau': tau,
+    'inf': lambda: Decimal('Infinity'), 'nan': lambda: Decimal('NaN'),
+}
+
+
+def _checked_decimal_pow(base, exponent):
+    try:
+        return base ** exponent
+    except InvalidOperation:
+        # A negative base with a fractional exponent, as math.pow reports it
+        raise ValueError("math domain error") from None
+
+
+DECIMAL_OPERATORS = {
+    '+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv,
+    '//': floordiv, '%': mod, '**': _checked_decimal_pow,
+}
+
+
+# -- exact rationals ----------------------------------------------------------
+
+def _coerced(function):
+    """Apply a binary operator exactly, or in decimal once either side is a Decimal"""
+    def apply(a, b):
+        if isinstance(a, Decimal) or isinstance(b, Decimal):
+            return DECIMAL_OPERATORS[function](to_decimal(a), to_decimal(b))
+        return EXACT_OPERATORS[function](a, b)
+    return apply
+
+
+def _exact_pow(base, exponent):
+    if exponent.denominator != 1:
+        return _checked_decimal_pow(to_decimal(base), to_decimal(exponent))
+    exponent = exponent.numerator
+    bits = max(base.numerator.bit_length(), base.denominator.bit_length())
+    if abs(exponent) * bits > MAX_INT_BITS and abs(base) != 1:
+        raise OverflowError("result too large")
+    return base ** exponent
+
+
+def _exact_sqrt(x):
+    if isinstance(x, Fraction) and x >= 0:
+        numerator, denominator = math.isqrt(x.numerator), math.isqrt(x.denominator)
+        if numerator * numerator == x.numerator and denominator * denominator == x.denominator:
+            return Fraction(numerator, denominator)
+    return sqrt(x)
+
+
+def _exact_factorial(n):
+    if isinstance(n, Fraction) and n.denominator == 1 and 0 <= n <= MAX_EXACT_FACTORIAL:
+        return Fraction(math.factorial(n.numerator))
+    return factorial(n)
+
+
+def _exact_integral(function, decimal_function):
+    def apply(x):
+        if isinstance(x, Fraction):
+            return Fraction(function(x))
+        return decimal_function(x)
+    return apply
+
+
+EXACT_OPERATORS = {
+    '+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv,
+    '//': operator.floordiv, '%': operator.mod, '**': _exact_pow,
+}
+FRACTION_OPERATORS = {op: _coerced(op) for op in EXACT_OPERATORS}
+FRACTION_FUNCTIONS = dict(DECIMAL_FUNCTIONS, **{
+    'sqrt': _exact_sqrt, 'factorial': _exact_factorial,
+    'floor': _exact_integral(math.floor, floor), 'ceil': _exact_integral(math.ceil, ceil),
+    'trunc': _exact_integral(math.trunc, trunc),
+})
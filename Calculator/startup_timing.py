@@ -0,0 +1,97 @@
+"""Measure how long the Calculator takes from a cold process start to its first paint.
+
+Each run starts a fresh interpreter, which imports the calculator, builds the
+window and exits as soon as the window has painted once. The run reports the
+time spent in interpreter startup, imports, building the window and getting
+to the first paint.
+
+    python startup_timing.py
+    python startup_timing.py --runs 20 --importtime
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+TARGET_MS = 150
+
+CHILD = r"""
+import json, sys, time
+started = float(sys.argv[1])
+script_start = time.time()
+from PyQt5.QtCore import QEvent, QObject, QTimer
+from PyQt5.QtWidgets import QApplication
+import calculator
+imported = time.time()
+app = QApplication(sys.argv[:1])
+window = calculator.Calculator()
+built = time.time()
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and obj is window:
+            painted = time.time()
+            print(json.dumps({
+                "interpreter": script_start - started, "imports": imported - script_start,
+                "window": built - imported, "paint": painted - built, "total": painted - started,
+            }))
+            window.removeEventFilter(self)
+            QTimer.singleShot(0, app.quit)
+        return False
+
+paint_filter = FirstPaint()
+window.installEventFilter(paint_filter)
+window.show()
+app.exec_()
+"""
+
+PHASES = ("interpreter", "imports", "window", "paint", "total")
+
+
+def run_once(importtime=False):
+    args = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", CHILD, repr(time.time())]
+    result = subprocess.run(args, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, result.stderr
+
+
+def slowest_imports(importtime_output, count=10):
+    """The modules with the largest cumulative import time, from ``-X importtime`` output"""
+    rows = []
+    for line in importtime_output.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the Calculator's cold start to first paint")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--importtime", action="store_true", help="also list the slowest imports")
+    args = parser.parse_args()
+
+    run_once()  # warm the OS file cache, as a pop-up utility would find it
+    runs = [run_once()[0] for _ in range(args.runs)]
+    print(f"{'phase':>12} {'median ms':>10} {'min ms':>8}")
+    for phase in PHASES:
+        values = [run[phase] * 1000 for run in runs]
+        print(f"{phase:>12} {statistics.median(values):>10.1f} {min(values):>8.1f}")
+    total = statistics.median(run["total"] * 1000 for run in runs)
+    print(f"cold start to first paint: {total:.0f} ms (target {TARGET_MS} ms)")
+
+    if args.importtime:
+        _, output = run_once(importtime=True)
+        print("\nslowest imports (cumulative us):")
+        for microseconds, name in slowest_imports(output):
+            print(f"{microseconds:>10} {name}")
+    return 0 if total <= TARGET_MS else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,28 @@
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QFormLayout, QLineEdit,
-    QPushButton, QMessageBox, QVBoxLayout, QLabel
+    QPushButton, QMessageBox, QVBoxLayout, QLabel, QFileDialog, QInputDialog
 )
+import math
 import sys
+import time
+
+from rate_feed import FeedWorker, open_feed
+
+# Live rates are applied at most this often, however fast the feed ticks
+FEED_REFRESH_MS = 200
+
+def valid_rate(rate):
+    """Whether `rate` can price a position: a zero, negative or infinite rate gives no profit/loss"""
+    return math.isfinite(rate) and rate > 0
 
 class CurrencyExchangeCalculator(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Currency Exchange Calculator")
-        self.setFixedSize(400, 300)
+        self.setFixedSize(400, 450)
+        self._rate_store = None
+        self.feed_worker = None
         self.init_ui()
 
     def init_ui(self):
@@ -27,36 +41,223 @@ class CurrencyExchangeCalculator(QWidget):
         form_layout.addRow("Exchange Rate (1 Initial = ? Target):", self.exchange_rate_input)
         form_layout.addRow("New Exchange Rate (1 Initial = ? Target):", self.new_exchange_rate_input)
 
+        # With a rate table loaded, an empty new rate means the current cross rate
+        self.initial_currency_input.textChanged.connect(self.update_cross_rate)
+        self.target_currency_input.textChanged.connect(self.update_cross_rate)
+
+        self.load_rates_button = QPushButton("Load Rates...")
+        self.load_rates_button.clicked.connect(self.load_rates)
+        self.rates_label = QLabel("No rate table loaded.")
+
         self.calculate_button = QPushButton("Calculate")
         self.calculate_button.clicked.connect(self.calculate_profit_loss)
 
+        self.portfolio_button = QPushButton("Portfolio...")
+        self.portfolio_button.clicked.connect(self.open_portfolio)
+        self.portfolio_window = None
+
+        self.scenario_button = QPushButton("Scenarios...")
+        self.scenario_button.clicked.connect(self.open_scenarios)
+        self.scenario_window = None
+
+        self.feed_button = QPushButton("Connect Feed...")
+        self.feed_button.clicked.connect(self.toggle_feed)
+        self.feed_label = QLabel("")
+        self.live_label = QLabel("")
+        self.feed_timer = QTimer(self)
+        self.feed_timer.setInterval(FEED_REFRESH_MS)
+        self.feed_timer.timeout.connect(self.apply_feed_updates)
+        for field in (self.amount_input, self.exchange_rate_input, self.new_exchange_rate_input):
+            field.textChanged.connect(self.update_live_result)
+
         layout.addLayout(form_layout)
         layout.addWidget(self.calculate_button)
+        layout.addWidget(self.live_label)
+        layout.addWidget(self.load_rates_button)
+        layout.addWidget(self.rates_label)
+        layout.addWidget(self.feed_button)
+        layout.addWidget(self.feed_label)
+        layout.addWidget(self.portfolio_button)
+        layout.addWidget(self.scenario_button)
 
         self.setLayout(layout)
 
+    @property
+    def rate_store(self):
+        """The loaded and live rates, created on first use"""
+        if self._rate_store is None:
+            # Imported on first use, so the single-position form starts without NumPy
+            from rate_store import RateStore
+            self._rate_store = RateStore()
+        return self._rate_store
+
     def calculate_profit_loss(self):
+        from forex_calc import describe, profit_loss
         try:
             initial_currency = self.initial_currency_input.text().strip()
             amount = float(self.amount_input.text())
             exchange_rate = float(self.exchange_rate_input.text())
-            new_exchange_rate = float(self.new_exchange_rate_input.text())
+            new_exchange_rate = self.new_exchange_rate(initial_currency)
+            if not (valid_rate(exchange_rate) and valid_rate(new_exchange_rate)):
+                QMessageBox.critical(self, "Input Error", "Exchange rates must be positive.")
+                return
 
-            target_amount = amount * exchange_rate
-            new_amount = target_amount / new_exchange_rate
-            profit_loss = new_amount - amount
+            result = profit_loss(amount, exchange_rate, new_exchange_rate)
 
-            if profit_loss >= 0:
-                result = f"Your profit would be {profit_loss:.2f} {initial_currency}."
-            else:
-                result = f"Your loss would be {-profit_loss:.2f} {initial_currency}."
-
-            QMessageBox.information(self, "Result", result)
+            QMessageBox.information(self, "Result", describe(result, initial_currency))
         except ValueError:
             QMessageBox.critical(self, "Input Error", "Please enter valid numeric values.")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"An unexpected error occurred:\n{str(e)}")
 
+    def new_exchange_rate(self, initial_currency):
+        text = self.new_exchange_rate_input.text().strip()
+        if text:
+            return float(text)
+        target_currency = self.target_currency_input.text().strip().upper()
+        store = self._rate_store
+        if store is None or initial_currency.upper() not in store or target_currency not in store:
+            raise ValueError("no new exchange rate and no loaded rate for this pair")
+        return store.cross(initial_currency.upper(), target_currency)
+
+    def update_cross_rate(self):
+        initial_currency = self.initial_currency_input.text().strip().upper()
+        target_currency = self.target_currency_input.text().strip().upper()
+        store = self._rate_store
+        if store is not None and initial_currency in store and target_currency in store:
+            rate = store.cross(initial_currency, target_currency)
+            self.new_exchange_rate_input.setPlaceholderText(f"{rate:.6g} (loaded rates)")
+        else:
+            self.new_exchange_rate_input.setPlaceholderText("")
+        self.update_live_result()
+
+    def update_live_result(self):
+        """Show the profit/loss for the form as it stands, when a feed is connected"""
+        if self.feed_worker is None:
+            self.live_label.setText("")
+            return
+        try:
+            initial_currency = self.initial_currency_input.text().strip()
+            amount = float(self.amount_input.text())
+            exchange_rate = float(self.exchange_rate_input.text())
+            new_exchange_rate = self.new_exchange_rate(initial_currency)
+        except ValueError:
+            self.live_label.setText("")
+            return
+        if not (valid_rate(exchange_rate) and valid_rate(new_exchange_rate)):
+            self.live_label.setText("")
+            return
+        from forex_calc import profit_loss
+        result = profit_loss(amount, exchange_rate, new_exchange_rate)
+        self.live_label.setText(f"Live profit/loss: {result:,.2f} {initial_currency} "
+                                f"at {new_exchange_rate:.6g}")
+
+    def toggle_feed(self):
+        if self.feed_worker is not None:
+            self.stop_feed()
+            return
+        source, ok = QInputDialog.getText(self, "Connect Feed", "Feed source (file:PATH or udp:PORT):")
+        if ok and source.strip():
+            self.start_feed(source.strip())
+
+    def start_feed(self, source):
+        try:
+            feed = open_feed(source)
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Error", f"Could not connect the feed:\n{str(e)}")
+            return
+        self.feed_worker = FeedWorker(feed)
+        self.feed_worker.start()
+        self.feed_source = source
+        self.feed_ticks = 0
+        self.feed_counted_at = time.perf_counter()
+        self.feed_timer.start()
+        self.feed_button.setText("Disconnect Feed")
+        self.feed_label.setText(f"Connected to {source}.")
+
+    def stop_feed(self):
+        self.feed_timer.stop()
+        self.feed_worker.stop()
+        self.feed_worker = None
+        self.feed_button.setText("Connect Feed...")
+        self.feed_label.setText("")
+        self.update_live_result()
+
+    def apply_feed_updates(self):
+        worker = self.feed_worker
+        if worker.error is not None:
+            error = worker.error
+            self.stop_feed()
+            QMessageBox.critical(self, "Error", f"The rate feed stopped:\n{str(error)}")
+            return
+        pending = worker.take()
+        rejected = None
+        if pending:
+            try:
+                self.rate_store.update(pending)
+            except ValueError as e:
+                # An exception escaping this slot would abort the application; skip the batch instead
+                rejected = e
+            else:
+                self.update_cross_rate()
+                if self.portfolio_window is not None:
+                    self.portfolio_window.rates_changed()
+        # Ticks per second over the refresh interval, from the worker's running count
+        now = time.perf_counter()
+        ticks = worker.ticks
+        rate = (ticks - self.feed_ticks) / max(now - self.feed_counted_at, 1e-9)
+        self.feed_ticks, self.feed_counted_at = ticks, now
+        if rejected is not None:
+            self.feed_label.setText(f"{self.feed_source}: {rate:,.0f} ticks/s, batch skipped ({rejected})")
+        else:
+            self.feed_label.setText(f"{self.feed_source}: {rate:,.0f} ticks/s, {len(pending)} currencies updated")
+
+    def closeEvent(self, event):
+        if self.feed_worker is not None:
+            self.stop_feed()
+        super().closeEvent(event)
+
+    def load_rates(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Load Rates", "", "CSV Files (*.csv)")
+        if not path:
+            return
+        from portfolio import load_rates
+        try:
+            self.rate_store.set_rates(load_rates(path))
+        except (OSError, ValueError, KeyError) as e:
+            QMessageBox.critical(self, "Error", f"Could not load rates:\n{str(e)}")
+            return
+        self.rates_label.setText(f"{len(self.rate_store)} currencies loaded.")
+        self.update_cross_rate()
+        if self.portfolio_window is not None:
+            self.portfolio_window.rates_changed()
+
+    def open_portfolio(self):
+        if self.portfolio_window is None:
+            from portfolio_window import PortfolioWindow
+            self.portfolio_window = PortfolioWindow(self.rate_store)
+        self.portfolio_window.show()
+        self.portfolio_window.raise_()
+
+    def open_scenarios(self):
+        if self.scenario_window is None:
+            from scenario_view import ScenarioWindow
+            self.scenario_window = ScenarioWindow()
+        initial_currency = self.initial_currency_input.text().strip()
+        try:
+            amount = float(self.amount_input.text())
+            exchange_rate = float(self.exchange_rate_input.text())
+        except ValueError:
+            pass  # Nothing to start from; the sweep form is filled in by hand
+        else:
+            try:
+                new_exchange_rate = self.new_exchange_rate(initial_currency)
+            except ValueError:
+                new_exchange_rate = None
+            self.scenario_window.set_position(initial_currency, amount, exchange_rate, new_exchange_rate)
+        self.scenario_window.show()
+        self.scenario_window.raise_()
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = CurrencyExchangeCalculator()
@@ -0,0 +1,160 @@
+"""Backtest tab of the portfolio window: the portfolio's profit/loss path over a rate history.
+
+The path can have millions of points (minute data over years), so the chart
+reduces it to the lowest and highest value in each pixel column before
+drawing; a repaint costs the same however long the path is.
+"""
+import time
+
+import numpy as np
+from PyQt5.QtCore import Qt, QDate, QPointF
+from PyQt5.QtGui import QPainter, QPen, QPolygonF
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QComboBox,
+    QDateEdit, QFileDialog, QMessageBox
+)
+
+from rate_history import RateHistory, format_times, portfolio_path
+
+STEP_CHOICES = (("Every stored rate", None), ("Minute", 60), ("Hour", 3600), ("Day", 86400),
+                ("Week", 7 * 86400))
+
+
+class PathChart(QWidget):
+    """Line chart of a time series, drawn as a min/max band per pixel column"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(200)
+        self.times = np.empty(0, dtype=np.int64)
+        self.values = np.empty(0)
+        self._reduced = None
+
+    def set_path(self, times, values):
+        self.times, self.values = times, values
+        self._reduced = None
+        self.update()
+
+    def _reduce(self, width):
+        """Pixel columns with a value, and the lowest and highest value in each; cached per width"""
+        if self._reduced is None or self._reduced[0] != width:
+            count = len(self.values)
+            # First point of each pixel column; fmin/fmax skip NaN, leaving NaN only for empty columns
+            starts = np.unique((np.arange(width, dtype=np.int64) * count + width - 1) // width)
+            starts = starts[starts < count]
+            low = np.fmin.reduceat(self.values, starts)
+            high = np.fmax.reduceat(self.values, starts)
+            columns = starts * width // count
+            shown = ~np.isnan(low)
+            self._reduced = (width, columns[shown], low[shown], high[shown])
+        return self._reduced[1:]
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.white)
+        width, height = self.width(), self.height()
+        columns, low, high = self._reduce(width) if len(self.values) else ((), (), ())
+        if not len(columns):
+            painter.drawText(self.rect(), Qt.AlignCenter, "No profit/loss path to show.")
+            return
+        bottom, top = min(low.min(), 0.0), max(high.max(), 0.0)
+        scale = (height - 20) / ((top - bottom) or 1.0)
+
+        def y(value):
+            return 10 + (top - value) * scale
+
+        painter.setPen(QPen(Qt.gray, 1, Qt.DashLine))
+        painter.drawLine(0, int(y(0.0)), width, int(y(0.0)))  # break-even
+        painter.setPen(QPen(Qt.darkBlue, 1))
+        polygon = QPolygonF()
+        for column, column_low, column_high in zip(columns.tolist(), low.tolist(), high.tolist()):
+            polygon.append(QPointF(column, y(column_high)))
+            polygon.append(QPointF(column, y(column_low)))
+        painter.drawPolyline(polygon)
+        painter.setPen(Qt.black)
+        painter.drawText(4, 14, f"{top:,.2f}")
+        painter.drawText(4, height - 4, f"{bottom:,.2f}")
+
+
+class BacktestPanel(QWidget):
+    def __init__(self, portfolio_window, parent=None):
+        super().__init__(parent)
+        self.portfolio_window = portfolio_window
+        self.history = None
+
+        self.open_button = QPushButton("Open History...")
+        self.open_button.clicked.connect(self.open_history)
+        self.start_input = QDateEdit(QDate.currentDate().addYears(-5))
+        self.end_input = QDateEdit(QDate.currentDate())
+        for date_input in (self.start_input, self.end_input):
+            date_input.setCalendarPopup(True)
+            date_input.setDisplayFormat("yyyy-MM-dd")
+        self.step_input = QComboBox()
+        for name, _ in STEP_CHOICES:
+            self.step_input.addItem(name)
+        self.step_input.setCurrentIndex(3)
+        self.run_button = QPushButton("Run Backtest")
+        self.run_button.clicked.connect(self.run)
+        self.chart = PathChart()
+        self.result_label = QLabel("Open a rate history directory (see rate_history.py).")
+
+        controls = QHBoxLayout()
+        controls.addWidget(self.open_button)
+        controls.addWidget(QLabel("From:"))
+        controls.addWidget(self.start_input)
+        controls.addWidget(QLabel("To:"))
+        controls.addWidget(self.end_input)
+        controls.addWidget(self.step_input)
+        controls.addWidget(self.run_button)
+        layout = QVBoxLayout()
+        layout.addLayout(controls)
+        layout.addWidget(self.chart)
+        layout.addWidget(self.result_label)
+        self.setLayout(layout)
+
+    def open_history(self):
+        directory = QFileDialog.getExistingDirectory(self, "Open Rate History")
+        if not directory:
+            return
+        try:
+            history = RateHistory(directory)
+        except (OSError, ValueError) as e:
+            # A corrupt meta.json raises JSONDecodeError, a ValueError
+            QMessageBox.critical(self, "Error", f"Could not open the rate history:\n{str(e)}")
+            return
+        self.set_history(history)
+
+    def set_history(self, history):
+        self.history = history
+        self.result_label.setText(f"{len(history.currencies)} currencies in {history.directory}, "
+                                  f"base {history.base or 'unknown'}.")
+
+    def run(self):
+        portfolio = self.portfolio_window.portfolio
+        if self.history is None or portfolio is None:
+            QMessageBox.information(self, "Backtest", "Load positions and open a rate history first.")
+            return
+        start = np.datetime64(self.start_input.date().toString("yyyy-MM-dd"))
+        # The end date is included, up to its last second
+        end = np.datetime64(self.end_input.date().toString("yyyy-MM-dd")) + np.timedelta64(86399, "s")
+        step = STEP_CHOICES[self.step_input.currentIndex()][1]
+        started = time.perf_counter()
+        try:
+            times, path = portfolio_path(self.history, portfolio, start, end, step)
+        except KeyError as e:
+            QMessageBox.critical(self, "Error", f"Could not run the backtest:\n{e.args[0]}")
+            return
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Error", f"Could not run the backtest:\n{str(e)}")
+            return
+        elapsed = time.perf_counter() - started
+        self.chart.set_path(times, path)
+        if not len(path) or np.all(np.isnan(path)):
+            self.result_label.setText("No rates in the selected range.")
+            return
+        low, high = np.nanargmin(path), np.nanargmax(path)
+        stamps = format_times(times[[low, high]])
+        self.result_label.setText(
+            f"{len(path):,} points in {elapsed:.2f} s. Profit/loss (base currency): "
+            f"final {path[-1]:,.2f}, low {path[low]:,.2f} on {stamps[0][:10]}, "
+            f"high {path[high]:,.2f} on {stamps[1][:10]}")
@@ -0,0 +1,78 @@
+"""Benchmark the rate history store: scans and backtests over synthetic minute data.
+
+Writes random-walk minute rates for a number of currencies into a store
+(skipped if the store already holds them), then times a full scan of every
+series, a one-position backtest and a portfolio backtest over the whole span.
+
+    python benchmark_history.py /tmp/history
+    python benchmark_history.py /tmp/history --currencies 50 --years 10 --positions 5000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from portfolio import Portfolio
+from rate_history import RateHistory, portfolio_path, position_path
+
+MINUTES_PER_YEAR = 365 * 24 * 60
+START = np.datetime64("2015-01-01T00:00", "s").astype(np.int64)
+WRITE_CHUNK = 10_000_000
+
+
+def build(history, currencies, minutes, rng):
+    for currency in currencies:
+        if currency in history.currencies:
+            continue
+        level = rng.uniform(0.5, 150)
+        for first in range(0, minutes, WRITE_CHUNK):
+            count = min(WRITE_CHUNK, minutes - first)
+            walk = np.cumsum(rng.normal(0, 2e-4, count))
+            rates = level * np.exp(walk)
+            level = rates[-1]
+            history.append(currency, START + 60 * np.arange(first, first + count, dtype=np.int64), rates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rate history scans and backtests")
+    parser.add_argument("store")
+    parser.add_argument("--currencies", type=int, default=50)
+    parser.add_argument("--years", type=float, default=10)
+    parser.add_argument("--positions", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    currencies = [f"C{i:02d}" for i in range(args.currencies)]
+    minutes = int(args.years * MINUTES_PER_YEAR)
+    history = RateHistory(args.store, base="USD")
+    start = time.perf_counter()
+    build(history, currencies, minutes, rng)
+    print(f"{args.currencies} currencies x {minutes:,} minutes; built in {time.perf_counter() - start:.1f} s")
+
+    start = time.perf_counter()
+    history = RateHistory(args.store)
+    total = 0
+    for currency in currencies:
+        _, rates = history.series(currency)
+        total += len(rates)
+        rates.min(), rates.max()
+    scanned = time.perf_counter() - start
+    print(f"full scan (min/max of every series): {total:,} rates in {scanned:.2f} s")
+
+    start = time.perf_counter()
+    times, path = position_path(history, currencies[0], currencies[1], 100_000, 1.0)
+    print(f"one position, every minute: {len(path):,} points in {time.perf_counter() - start:.2f} s")
+
+    books = rng.integers(0, 20, args.positions).astype(str)
+    pairs = rng.integers(0, args.currencies, (args.positions, 2))
+    portfolio = Portfolio(books, [currencies[i] for i in pairs[:, 0]], [currencies[i] for i in pairs[:, 1]],
+                          rng.uniform(1e3, 1e6, args.positions), rng.uniform(0.5, 2, args.positions))
+    for step, name in ((86400, "daily"), (None, "every minute")):
+        start = time.perf_counter()
+        times, path = portfolio_path(history, portfolio, step=step)
+        print(f"{args.positions:,} positions, {name}: {len(path):,} points in "
+              f"{time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Profit/loss arithmetic of the Forex calculator, without Qt.
+
+Every function takes scalars or NumPy arrays (broadcast against each other)
+and returns the same, so one call prices one position or millions. The
+window, the portfolio engine, the backtests and the scenario sweep all use
+these functions, so they agree to the last bit.
+
+The command line streams a CSV of positions through the arithmetic in
+chunks, writing results as it goes, so inputs of any size run in constant
+memory and nothing imports PyQt5:
+
+    python forex_calc.py positions.csv -o results.csv
+    python forex_calc.py positions.csv --rates rates.csv > results.csv
+    cat positions.csv | python forex_calc.py - | gzip > results.csv.gz
+
+Input columns: currency, amount, target, rate (1 currency = ? target at
+entry) and new_rate. With ``--rates`` (a ``currency,rate`` table against one
+base, as used by the portfolio), rows without a new_rate column or value
+get the current cross rate. Output is the input columns plus new_rate and
+profit_loss, in the position's currency; rows that cannot be priced (a new
+rate of zero, or none known) get ``inf`` or ``nan``.
+"""
+import argparse
+import csv
+import io
+import sys
+import time
+
+import numpy as np
+
+CHUNK_ROWS = 100_000
+INPUT_COLUMNS = ("currency", "amount", "target", "rate")
+
+
+def target_amount(amounts, exchange_rates):
+    """What `amounts` of the initial currency buy of the target at `exchange_rates`"""
+    return np.multiply(amounts, exchange_rates)
+
+
+def profit_loss(amounts, exchange_rates, new_exchange_rates, out=None):
+    """Profit (positive) or loss of exchanging `amounts` at `exchange_rates` and back at `new_exchange_rates`.
+
+    In the initial currency. `out`, if given, is an array to write the result
+    into; it must not share memory with the inputs.
+    """
+    if out is None:
+        return np.multiply(amounts, exchange_rates) / new_exchange_rates - amounts
+    np.multiply(amounts, exchange_rates, out=out)
+    out /= new_exchange_rates
+    out -= amounts
+    return out
+
+
+def cross_rates(initial_rates, target_rates):
+    """Rates for 1 initial = ? target, from both currencies' rates against a common base"""
+    return np.divide(target_rates, initial_rates)
+
+
+def base_profit_loss(profit_losses, initial_rates):
+    """Profit/loss in the base currency, from profit/loss in the initial currency"""
+    return np.divide(profit_losses, initial_rates)
+
+
+def describe(profit_loss_value, currency):
+    """The calculator's sentence for one result"""
+    if profit_loss_value >= 0:
+        return f"Your profit would be {profit_loss_value:.2f} {currency}."
+    return f"Your loss would be {-profit_loss_value:.2f} {currency}."
+
+
+def _numbers(values, name, line_numbers):
+    try:
+        return np.array(values, dtype=np.float64)
+    except ValueError:
+        for line, value in zip(line_numbers, values):
+            try:
+                float(value)
+            except ValueError:
+                raise ValueError(f"line {line}: {name} {value!r} is not a number") from None
+        raise
+
+
+def _read_rows(reader, count, needed):
+    """Up to `count` rows and their line numbers, skipping blank lines"""
+    rows, line_numbers = [], []
+    for row in reader:
+        if not row:
+            continue
+        if len(row) <= needed:
+            raise ValueError(f"line {reader.line_num}: the row has fewer columns than the header")
+        rows.append(row)
+        line_numbers.append(reader.line_num)
+        if len(rows) == count:
+            break
+    return rows, line_numbers
+
+
+def process_csv(source, destination, rate_store=None, chunk_rows=CHUNK_ROWS):
+    """Stream positions from the `source` file object to `destination`; returns the row count.
+
+    `source` should be opened with ``newline=""``, so that quoted fields may
+    hold commas and line breaks. Output rows are the input fields with the
+    results appended, so the input columns pass through untouched. Rows
+    are not rejected for their values: a new rate of zero gives a profit/loss
+    of ``inf`` (or ``nan`` with a zero amount), and a missing or unknown new
+    rate gives ``nan``.
+    """
+    reader = csv.reader(source)
+    header = next(reader, None)
+    if not header:
+        raise ValueError("empty input")
+    names = [name.strip().lower() for name in header]
+    missing = [name for name in INPUT_COLUMNS if name not in names]
+    if missing:
+        raise ValueError(f"missing column(s) {', '.join(missing)}")
+    currency, amount, target, rate = (names.index(name) for name in INPUT_COLUMNS)
+    new_rate = names.index("new_rate") if "new_rate" in names else None
+    if new_rate is None and rate_store is None:
+        raise ValueError("no new_rate column; give --rates to use current cross rates")
+    needed = max(currency, amount, target, rate, -1 if new_rate is None else new_rate)
+
+    writer = csv.writer(destination, lineterminator="\n")
+    writer.writerow(header + (["new_rate"] if new_rate is None else []) + ["profit_loss"])
+    total = 0
+    while True:
+        rows, line_numbers = _read_rows(reader, chunk_rows, needed)
+        if not rows:
+            return total
+        amounts = _numbers([row[amount] for row in rows], "amount", line_numbers)
+        rates = _numbers([row[rate] for row in rows], "rate", line_numbers)
+        if new_rate is not None:
+            new_rates = _numbers([row[new_rate].strip() or "nan" for row in rows], "new_rate", line_numbers)
+        else:
+            new_rates = np.full(len(rows), np.nan)
+        filled = np.empty(0, dtype=np.intp)
+        if rate_store is not None:
+            # Rows without a new rate are priced at the current cross rate (NaN if it is unknown)
+            empty = np.flatnonzero(np.isnan(new_rates))
+            if len(empty):
+                codes = rate_store.codes
+                initial = np.array([codes.get(rows[i][currency].strip().upper(), -1) for i in empty])
+                final = np.array([codes.get(rows[i][target].strip().upper(), -1) for i in empty])
+                known = (initial >= 0) & (final >= 0)
+                filled = empty[known]
+                new_rates[filled] = rate_store.matrix[initial[known], final[known]]
+        # A zero new rate gives inf and a missing one nan; they are results, not errors
+        with np.errstate(divide="ignore", invalid="ignore"):
+            results = profit_loss(amounts, rates, new_rates).tolist()
+        if new_rate is None:
+            for row, r, p in zip(rows, new_rates.tolist(), results):
+                row += (repr(r), repr(p))
+        else:
+            for i in filled.tolist():
+                rows[i][new_rate] = repr(float(new_rates[i]))
+            for row, p in zip(rows, results):
+                row.append(repr(p))
+        writer.writerows(rows)
+        total += len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute Forex profit/loss for a CSV of positions")
+    parser.add_argument("positions", help="CSV with currency, amount, target, rate and new_rate columns "
+                                          "('-' for standard input)")
+    parser.add_argument("-o", "--output", default="-", help="output CSV (default: standard output)")
+    parser.add_argument("--rates", help="currency,rate table used where new_rate is missing")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        rate_store = None
+        if args.rates:
+            from portfolio import load_rates
+            from rate_store import RateStore
+            rate_store = RateStore(load_rates(args.rates))
+        # utf-8-sig drops the byte order mark some spreadsheets write before the header
+        if args.positions == "-":
+            source = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="")
+        else:
+            source = open(args.positions, "r", newline="", encoding="utf-8-sig")
+        destination = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+        try:
+            rows = process_csv(source, destination, rate_store, args.chunk_rows)
+        finally:
+            if args.positions != "-":
+                source.close()
+            if destination is not sys.stdout:
+                destination.close()
+    except BrokenPipeError:
+        return 0
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    print(f"{rows:,} rows in {time.perf_counter() - start:.2f} s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Portfolio profit/loss engine for the Forex calculator.
+
+A position is an amount of one currency exchanged into a target currency at
+an entry rate, as in the single-position form: it is worth
+``amount * entry_rate / current_rate`` of the initial currency today.
+Positions are held as NumPy columns, with currencies and books replaced by
+integer codes when they are loaded. Revaluing every position against a new
+rate table is then a few array operations, and the totals per currency and
+per book are ``bincount`` sums.
+
+Rates are given against one base currency: ``rates[c]`` is the number of
+units of ``c`` per unit of the base, so the rate for 1 initial = ? target is
+``rates[target] / rates[initial]``.
+
+Positions CSV (header required)::
+
+    book,currency,target,amount,rate
+    macro,USD,EUR,100000,0.92
+
+Rates CSV::
+
+    currency,rate
+    USD,1
+    EUR,0.91
+"""
+import csv
+
+import numpy as np
+
+from forex_calc import base_profit_loss, cross_rates, profit_loss
+
+POSITION_COLUMNS = ("book", "currency", "target", "amount", "rate")
+
+
+def load_rates(path):
+    """Read a ``currency,rate`` CSV into a dict of currency -> units per unit of the base"""
+    rates = {}
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            rates[row["currency"].strip().upper()] = float(row["rate"])
+    return rates
+
+
+def _codes(values):
+    """Integer codes for `values` and the list of distinct values they index"""
+    names, codes = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+    return codes.astype(np.int32), [str(name) for name in names]
+
+
+class Portfolio:
+    """Positions as columns; `revalue` prices them all against a rate table at once"""
+
+    def __init__(self, books, currencies, targets, amounts, entry_rates):
+        self.book_codes, self.books = _codes(books)
+        # Initial and target currencies share one code table, so one rate array serves both
+        codes, self.currencies = _codes(list(currencies) + list(targets))
+        self.currency_codes = codes[:len(currencies)]
+        self.target_codes = codes[len(currencies):]
+        self.amounts = np.asarray(amounts, dtype=np.float64)
+        self.entry_rates = np.asarray(entry_rates, dtype=np.float64)
+        self.current_rates = np.full(len(self.amounts), np.nan)
+        self.profit_loss = np.full(len(self.amounts), np.nan)
+        self.base_profit_loss = np.full(len(self.amounts), np.nan)
+
+    def __len__(self):
+        return len(self.amounts)
+
+    @classmethod
+    def from_csv(cls, path):
+        columns = {name: [] for name in POSITION_COLUMNS}
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            missing = [name for name in POSITION_COLUMNS if name not in (reader.fieldnames or [])]
+            if missing:
+                raise ValueError(f"{path}: missing column(s) {', '.join(missing)}")
+            for row in reader:
+                for name in POSITION_COLUMNS:
+                    # Short rows leave the last columns as None
+                    if row[name] is None:
+                        raise ValueError(f"{path}: line {reader.line_num}: missing {name}")
+                    columns[name].append(row[name].strip())
+        return cls(columns["book"],
+                   [c.upper() for c in columns["currency"]],
+                   [c.upper() for c in columns["target"]],
+                   np.array(columns["amount"], dtype=np.float64),
+                   np.array(columns["rate"], dtype=np.float64))
+
+    def rate_vector(self, rates):
+        """Rates against the base, indexed by currency code; NaN where `rates` has none"""
+        return np.array([rates.get(currency, np.nan) for currency in self.currencies], dtype=np.float64)
+
+    def revalue(self, rates):
+        """Recompute current rates and profit/loss of every position from `rates`.
+
+        `rates` maps currency -> units per unit of the base (a dict or a
+        RateStore), or is an array already indexed by currency code (see
+        `rate_vector`). Positions in currencies without a rate get NaN.
+        """
+        vector = rates if isinstance(rates, np.ndarray) else self.rate_vector(rates)
+        initial = vector[self.currency_codes]
+        self.current_rates[:] = cross_rates(initial, vector[self.target_codes])
+        # Same arithmetic as the single-position form, for every row at once
+        profit_loss(self.amounts, self.entry_rates, self.current_rates, out=self.profit_loss)
+        self.base_profit_loss[:] = base_profit_loss(self.profit_loss, initial)
+
+    def by_currency(self):
+        """``(currency, positions, without rates, profit/loss in that currency, profit/loss in base)`` rows
+
+        Positions without rates are counted, not summed, so one of them does
+        not turn its whole group's profit/loss into NaN.
+        """
+        count = len(self.currencies)
+        positions = np.bincount(self.currency_codes, minlength=count)
+        unpriced = np.bincount(self.currency_codes, weights=self._unpriced(), minlength=count)
+        native = np.bincount(self.currency_codes, weights=self._priced(self.profit_loss), minlength=count)
+        base = np.bincount(self.currency_codes, weights=self._priced(self.base_profit_loss), minlength=count)
+        return [(currency, int(positions[i]), int(unpriced[i]), float(native[i]), float(base[i]))
+                for i, currency in enumerate(self.currencies) if positions[i]]
+
+    def by_book(self):
+        """``(book, position count, without rates, profit/loss in base)`` rows"""
+        count = len(self.books)
+        positions = np.bincount(self.book_codes, minlength=count)
+        unpriced = np.bincount(self.book_codes, weights=self._unpriced(), minlength=count)
+        base = np.bincount(self.book_codes, weights=self._priced(self.base_profit_loss), minlength=count)
+        return [(book, int(positions[i]), int(unpriced[i]), float(base[i])) for i, book in enumerate(self.books)]
+
+    def unpriced_count(self):
+        """How many positions have no profit/loss, for want of a rate"""
+        return int(np.count_nonzero(self._unpriced()))
+
+    def _unpriced(self):
+        return ~np.isfinite(self.base_profit_loss)
+
+    def _priced(self, values):
+        # Zero where there is no profit/loss, so sums cover the priced positions only
+        return np.where(self._unpriced(), 0.0, values)
+
+    def total(self):
+        """Total profit/loss in the base currency, ignoring positions without rates"""
+        return float(self._priced(self.base_profit_loss).sum())
@@ -0,0 +1,258 @@
+"""Portfolio window for the Forex calculator.
+
+Shows every position of a portfolio (see ``portfolio.py``) with its current
+rate and profit/loss, plus totals by currency and by book. The position table
+reads straight from the portfolio's NumPy columns through a row order array,
+so sorting is one ``argsort`` and a revaluation only repaints the visible
+cells. Rates can be loaded from a CSV file or edited in the Rates tab; every
+change revalues the whole portfolio.
+"""
+import time
+
+import numpy as np
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTableView,
+    QTabWidget, QTableWidget, QTableWidgetItem, QFileDialog, QMessageBox,
+    QHeaderView
+)
+
+from backtest_view import BacktestPanel
+from portfolio import Portfolio, load_rates
+from rate_store import RateStore
+
+# Numeric columns read a Portfolio array; code columns read codes and the names they index
+POSITION_HEADERS = ("Book", "Currency", "Target", "Amount", "Entry rate", "Current rate",
+                    "P/L", "P/L (base)")
+NUMERIC_COLUMNS = {3: "amounts", 4: "entry_rates", 5: "current_rates", 6: "profit_loss",
+                   7: "base_profit_loss"}
+CODE_COLUMNS = {0: ("book_codes", "books"), 1: ("currency_codes", "currencies"),
+                2: ("target_codes", "currencies")}
+# Columns that change when rates do
+REVALUED_COLUMNS = (5, 7)
+
+
+class PositionTableModel(QAbstractTableModel):
+    """Table model over a Portfolio's columns, sorted through an index array"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.portfolio = None
+        self.order = np.empty(0, dtype=np.intp)
+        self.sort_column = None
+        self.sort_order = Qt.AscendingOrder
+
+    def set_portfolio(self, portfolio):
+        self.beginResetModel()
+        self.portfolio = portfolio
+        self.order = np.arange(len(portfolio), dtype=np.intp)
+        self.endResetModel()
+        if self.sort_column is not None:
+            self.sort(self.sort_column, self.sort_order)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.order)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(POSITION_HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return POSITION_HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.order[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column in CODE_COLUMNS:
+                codes, names = CODE_COLUMNS[column]
+                return getattr(self.portfolio, names)[getattr(self.portfolio, codes)[row]]
+            value = getattr(self.portfolio, NUMERIC_COLUMNS[column])[row]
+            if np.isnan(value):
+                return "no rate"
+            return f"{value:,.6f}" if column in (4, 5) else f"{value:,.2f}"
+        if role == Qt.TextAlignmentRole and column in NUMERIC_COLUMNS:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role == Qt.ForegroundRole and column in (6, 7):
+            value = getattr(self.portfolio, NUMERIC_COLUMNS[column])[row]
+            if value < 0:
+                return Qt.red
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if self.portfolio is None:
+            return
+        self.sort_column, self.sort_order = column, order
+        if column in CODE_COLUMNS:
+            codes, names = CODE_COLUMNS[column]
+            # Codes follow sorted names, so sorting codes sorts by name
+            keys = getattr(self.portfolio, codes)
+        else:
+            keys = getattr(self.portfolio, NUMERIC_COLUMNS[column])
+        if order == Qt.DescendingOrder:
+            # Negated rather than reversed, so positions without rates (NaN) stay last
+            keys = -keys.astype(np.float64)
+        self.layoutAboutToBeChanged.emit()
+        self.order = np.argsort(keys, kind="stable")
+        self.layoutChanged.emit()
+
+    def revalued(self):
+        """Repaint the columns that depend on rates, re-sorting if they are the sort key"""
+        if self.portfolio is None or not len(self.order):
+            return
+        if self.sort_column is not None and self.sort_column >= min(REVALUED_COLUMNS):
+            self.sort(self.sort_column, self.sort_order)
+        else:
+            self.dataChanged.emit(self.index(0, REVALUED_COLUMNS[0]),
+                                  self.index(len(self.order) - 1, REVALUED_COLUMNS[-1]))
+
+
+class PortfolioWindow(QWidget):
+    def __init__(self, rates=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Portfolio")
+        self.resize(900, 600)
+        self.portfolio = None
+        # Shared with the calculator window when it opens this one
+        self.rates = rates if rates is not None else RateStore()
+
+        self.positions_button = QPushButton("Load Positions CSV")
+        self.positions_button.clicked.connect(self.load_positions)
+        self.rates_button = QPushButton("Load Rates CSV")
+        self.rates_button.clicked.connect(self.load_rates_file)
+        self.summary_label = QLabel("Load a positions CSV and a rates CSV.")
+
+        self.position_model = PositionTableModel(self)
+        self.position_view = QTableView()
+        self.position_view.setModel(self.position_model)
+        self.position_view.setSortingEnabled(True)
+        self.position_view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        # Uniform rows, so the view never has to measure thousands of them
+        self.position_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+
+        self.currency_table = self._summary_table(("Currency", "Positions", "Without rates", "P/L", "P/L (base)"))
+        self.book_table = self._summary_table(("Book", "Positions", "Without rates", "P/L (base)"))
+        self.rates_table = QTableWidget(0, 2)
+        self.rates_table.setHorizontalHeaderLabels(["Currency", "Units per base"])
+        self.rates_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.rates_table.itemChanged.connect(self.on_rate_edited)
+
+        self.tabs = QTabWidget()
+        self.tabs.addTab(self.position_view, "Positions")
+        self.tabs.addTab(self.currency_table, "By Currency")
+        self.tabs.addTab(self.book_table, "By Book")
+        self.tabs.addTab(self.rates_table, "Rates")
+        self.backtest_panel = BacktestPanel(self)
+        self.tabs.addTab(self.backtest_panel, "Backtest")
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.positions_button)
+        buttons.addWidget(self.rates_button)
+        layout = QVBoxLayout()
+        layout.addLayout(buttons)
+        layout.addWidget(self.tabs)
+        layout.addWidget(self.summary_label)
+        self.setLayout(layout)
+
+    def _summary_table(self, headers):
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(list(headers))
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.setSortingEnabled(True)
+        return table
+
+    def load_positions(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Load Positions", "", "CSV Files (*.csv)")
+        if path:
+            self.set_positions_file(path)
+
+    def set_positions_file(self, path):
+        try:
+            portfolio = Portfolio.from_csv(path)
+        except (OSError, ValueError, KeyError) as e:
+            QMessageBox.critical(self, "Error", f"Could not load positions:\n{e}")
+            return
+        self.portfolio = portfolio
+        self.position_model.set_portfolio(portfolio)
+        self.refresh_rates_table()
+        self.recompute()
+
+    def load_rates_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Load Rates", "", "CSV Files (*.csv)")
+        if path:
+            self.set_rates_file(path)
+
+    def set_rates_file(self, path):
+        try:
+            self.rates.set_rates(load_rates(path))
+        except (OSError, ValueError, KeyError) as e:
+            QMessageBox.critical(self, "Error", f"Could not load rates:\n{e}")
+            return
+        self.rates_changed()
+
+    def rates_changed(self):
+        """Show and apply the current rates, after they were changed elsewhere"""
+        self.refresh_rates_table()
+        self.recompute()
+
+    def refresh_rates_table(self):
+        currencies = sorted(set(self.rates.currencies) | set(self.portfolio.currencies if self.portfolio else ()))
+        self.rates_table.blockSignals(True)
+        self.rates_table.setRowCount(len(currencies))
+        for row, currency in enumerate(currencies):
+            name = QTableWidgetItem(currency)
+            name.setFlags(name.flags() & ~Qt.ItemIsEditable)
+            self.rates_table.setItem(row, 0, name)
+            rate = self.rates.get(currency)
+            self.rates_table.setItem(row, 1, QTableWidgetItem("" if rate is None else f"{rate:g}"))
+        self.rates_table.blockSignals(False)
+
+    def on_rate_edited(self, item):
+        if item.column() != 1:
+            return
+        currency = self.rates_table.item(item.row(), 0).text()
+        try:
+            self.rates.set_rate(currency, item.text())
+        except ValueError as e:
+            QMessageBox.warning(self, "Input Error", str(e))
+            self.refresh_rates_table()
+            return
+        self.recompute()
+
+    def recompute(self):
+        if self.portfolio is None:
+            return
+        start = time.perf_counter()
+        self.portfolio.revalue(self.rates)
+        self.position_model.revalued()
+        self._fill_table(self.currency_table, self.portfolio.by_currency())
+        self._fill_table(self.book_table, self.portfolio.by_book())
+        elapsed = time.perf_counter() - start
+        missing = self.portfolio.unpriced_count()
+        text = (f"{len(self.portfolio):,} positions, total P/L {self.portfolio.total():,.2f} (base currency)"
+                f" - revalued in {elapsed * 1000:.0f} ms")
+        if missing:
+            text += f" - {missing:,} without rates"
+        self.summary_label.setText(text)
+
+    def _fill_table(self, table, rows):
+        table.setSortingEnabled(False)
+        table.setRowCount(len(rows))
+        for r, values in enumerate(rows):
+            for c, value in enumerate(values):
+                item = QTableWidgetItem()
+                if isinstance(value, float):
+                    # Numbers sort as numbers, and show formatted
+                    item.setData(Qt.DisplayRole, round(value, 2))
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                elif isinstance(value, int):
+                    item.setData(Qt.DisplayRole, value)
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                else:
+                    item.setText(value)
+                table.setItem(r, c, item)
+        table.setSortingEnabled(True)
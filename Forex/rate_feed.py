@@ -0,0 +1,218 @@
+"""Streaming rate feeds for the Forex calculator.
+
+A feed delivers ticks, ``(currency, rate)`` pairs with the rate against the
+base currency, in batches from a source such as a growing file or a local
+socket. `FeedWorker` reads a feed on a background thread and keeps only the
+latest rate per currency. The GUI takes the pending rates on a timer, so a
+feed sending thousands of ticks per second costs the event loop one small
+update per refresh, however fast it runs.
+
+Ticks are text lines ``CURRENCY,RATE`` (anything after a third comma is
+ignored). Two stand-in sources are included for testing:
+
+    file:/path/to/ticks.txt   lines appended to a file, as with ``tail -f``
+    udp:9999                  datagrams of lines sent to 127.0.0.1:9999
+
+    python rate_feed.py simulate udp:9999 --ticks-per-second 5000
+    python rate_feed.py simulate file:/tmp/ticks.txt --currencies EUR,JPY,GBP
+"""
+import argparse
+import math
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+POLL_INTERVAL = 0.05
+DATAGRAM_SIZE = 65536
+
+
+def parse_ticks(lines):
+    """``(currency, rate)`` pairs from tick lines, skipping lines that are not ticks"""
+    ticks = []
+    for line in lines:
+        parts = line.split(",", 2)
+        if len(parts) < 2:
+            continue
+        try:
+            rate = float(parts[1])
+        except ValueError:
+            continue
+        if math.isfinite(rate) and rate > 0:
+            ticks.append((parts[0].strip().upper(), rate))
+    return ticks
+
+
+class RateFeed:
+    """A source of ticks. Subclasses implement `read`, and may implement `close`."""
+
+    def read(self, timeout):
+        """The ticks received so far, waiting up to `timeout` seconds for some; may be empty"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class FileTailFeed(RateFeed):
+    """Ticks appended to a text file after the feed is opened"""
+
+    def __init__(self, path):
+        self.file = open(path, "r", encoding="utf-8")
+        self.file.seek(0, os.SEEK_END)
+        self.partial = ""
+
+    def read(self, timeout):
+        data = self.file.read()
+        if not data:
+            time.sleep(timeout)
+            data = self.file.read()
+        # A line is only complete once its newline has been written
+        lines = (self.partial + data).split("\n")
+        self.partial = lines.pop()
+        return parse_ticks(lines)
+
+    def close(self):
+        self.file.close()
+
+
+class UdpFeed(RateFeed):
+    """Ticks sent as datagrams of lines to a local UDP port"""
+
+    def __init__(self, port, host="127.0.0.1"):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+
+    def read(self, timeout):
+        self.socket.settimeout(timeout)
+        lines = []
+        try:
+            lines.extend(self.socket.recv(DATAGRAM_SIZE).decode("utf-8", "replace").splitlines())
+            # Drain whatever else is queued without waiting again
+            self.socket.setblocking(False)
+            while True:
+                lines.extend(self.socket.recv(DATAGRAM_SIZE).decode("utf-8", "replace").splitlines())
+        except (BlockingIOError, socket.timeout):
+            pass
+        return parse_ticks(lines)
+
+    def close(self):
+        self.socket.close()
+
+
+def open_feed(source):
+    """A feed for a source such as ``file:ticks.txt`` or ``udp:9999``"""
+    kind, _, target = source.partition(":")
+    if kind == "file" and target:
+        return FileTailFeed(target)
+    if kind == "udp" and target.isdigit():
+        return UdpFeed(int(target))
+    raise ValueError(f"unknown feed source {source!r}; use file:PATH or udp:PORT")
+
+
+class FeedWorker:
+    """Reads a feed on a daemon thread, keeping the latest rate per currency until taken"""
+
+    def __init__(self, feed):
+        self.feed = feed
+        self.ticks = 0
+        self.error = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.feed.close()
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def take(self):
+        """The latest rate of every currency that ticked since the last call"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                ticks = self.feed.read(POLL_INTERVAL)
+                if ticks:
+                    with self._lock:
+                        self._pending.update(ticks)
+                        self.ticks += len(ticks)
+        except (OSError, ValueError) as e:
+            self.error = e
+
+
+def simulate(source, currencies, ticks_per_second, seconds):
+    """Send random-walk ticks to a file or UDP source, in batches of about 10 ms"""
+    kind, _, target = source.partition(":")
+    if kind == "udp":
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        address = ("127.0.0.1", int(target))
+
+        def send(text):
+            sender.sendto(text.encode("utf-8"), address)
+    elif kind == "file":
+        output = open(target, "a", encoding="utf-8")
+
+        def send(text):
+            output.write(text)
+            output.flush()
+    else:
+        raise ValueError(f"unknown feed source {source!r}; use file:PATH or udp:PORT")
+
+    rates = {currency: random.uniform(0.5, 150) for currency in currencies}
+    batch = max(1, ticks_per_second // 100)
+    started = time.perf_counter()
+    sent = 0
+    while seconds is None or time.perf_counter() - started < seconds:
+        lines = []
+        for _ in range(batch):
+            currency = random.choice(currencies)
+            rates[currency] *= 1 + random.gauss(0, 1e-4)
+            lines.append(f"{currency},{rates[currency]:.6f}\n")
+        send("".join(lines))
+        sent += batch
+        # Keep to the requested rate
+        delay = sent / ticks_per_second - (time.perf_counter() - started)
+        if delay > 0:
+            time.sleep(delay)
+    return sent
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rate feed tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    simulator = commands.add_parser("simulate", help="send random-walk ticks to a feed source")
+    simulator.add_argument("source", help="file:PATH or udp:PORT")
+    simulator.add_argument("--currencies", default="EUR,JPY,GBP,CHF,AUD,CAD",
+                           help="comma-separated currency codes")
+    simulator.add_argument("--ticks-per-second", type=int, default=1000)
+    simulator.add_argument("--seconds", type=float, help="stop after this long (default: run until interrupted)")
+    args = parser.parse_args(argv)
+
+    currencies = [c.strip().upper() for c in args.currencies.split(",") if c.strip()]
+    try:
+        sent = simulate(args.source, currencies, args.ticks_per_second, args.seconds)
+    except KeyboardInterrupt:
+        return 0
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    print(f"{sent:,} ticks sent")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+"""Historical exchange rates on disk, and backtests of positions over them.
+
+Each currency's history is stored as two flat binary files in one
+directory: ``<CUR>.time`` (int64 seconds since the Unix epoch, strictly
+increasing) and ``<CUR>.rate`` (float64 units of the currency per unit of
+the base, as in the rates CSV). The files are read through ``np.memmap``, so
+opening a store costs nothing, a date range is found by binary search and
+only the pages of that range are ever read. New data is appended to the end
+of the files.
+
+A backtest prices positions at every point of a time grid. Rates are
+forward-filled onto the grid (the last known rate at or before each time).
+The base-currency profit/loss of a position is ``amount * entry / rate[target]
+- amount / rate[initial]``, so a whole portfolio's profit/loss path is a
+weighted sum of one ``1 / rate`` path per currency, however many positions
+it holds.
+
+History CSV (header required; time as ISO 8601 or epoch seconds)::
+
+    time,currency,rate
+    2024-01-02T00:00,EUR,0.9112
+
+    python rate_history.py import history/ rates.csv --base USD
+    python rate_history.py info history/
+    python rate_history.py backtest history/ --position EUR,JPY,100000,161.2 --start 2020-01-01
+    python rate_history.py backtest history/ --positions positions.csv --step 1d -o path.csv
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from forex_calc import cross_rates, profit_loss
+
+TIME_SUFFIX = ".time"
+RATE_SUFFIX = ".rate"
+META_FILE = "meta.json"
+IMPORT_CHUNK_ROWS = 1_000_000
+# Grid points processed at once by a portfolio backtest, bounding its memory use
+BACKTEST_CHUNK = 1 << 20
+
+STEPS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def to_seconds(values):
+    """Epoch seconds (int64) from datetime64 values, ISO 8601 strings or numbers"""
+    array = np.asarray(values)
+    if array.dtype.kind == "M":
+        return array.astype("datetime64[s]").astype(np.int64)
+    if array.dtype.kind in "USO":
+        try:
+            return array.astype(np.float64).astype(np.int64)
+        except ValueError:
+            return array.astype("datetime64[s]").astype(np.int64)
+    return array.astype(np.int64)
+
+
+def parse_step(text):
+    """Seconds in a step such as ``60``, ``1m``, ``4h`` or ``1d``"""
+    text = str(text).strip().lower()
+    if text and text[-1] in STEPS:
+        return int(float(text[:-1] or 1) * STEPS[text[-1]])
+    return int(text)
+
+
+def format_times(seconds):
+    return seconds.astype("datetime64[s]").astype(str)
+
+
+class RateHistory:
+    """Rate histories of many currencies, stored in `directory`"""
+
+    def __init__(self, directory, base=None):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, META_FILE)
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        if base is not None and meta.get("base") != base.upper():
+            meta["base"] = base.upper()
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+        # The base currency has no files: its rate is always 1
+        self.base = meta.get("base")
+        self._series = {}  # currency -> (times, rates) memmaps
+
+    @property
+    def currencies(self):
+        return sorted(name[:-len(RATE_SUFFIX)] for name in os.listdir(self.directory)
+                      if name.endswith(RATE_SUFFIX))
+
+    def _path(self, currency, suffix):
+        return os.path.join(self.directory, currency + suffix)
+
+    def series(self, currency, start=None, end=None):
+        """``(times, rates)`` of `currency` with start <= time <= end, as memmap views"""
+        if currency not in self._series:
+            if not os.path.exists(self._path(currency, RATE_SUFFIX)):
+                raise KeyError(f"no rate history for {currency}")
+            times = _memmap(self._path(currency, TIME_SUFFIX), np.int64)
+            rates = _memmap(self._path(currency, RATE_SUFFIX), np.float64)
+            # An interrupted append can leave one file longer than the other
+            count = min(len(times), len(rates))
+            self._series[currency] = (times[:count], rates[:count])
+        times, rates = self._series[currency]
+        first = 0 if start is None else np.searchsorted(times, to_seconds(start), side="left")
+        last = len(times) if end is None else np.searchsorted(times, to_seconds(end), side="right")
+        return times[first:last], rates[first:last]
+
+    def span(self, currency):
+        """First and last time (epoch seconds) of `currency`'s history, or None if it is empty"""
+        times, _ = self.series(currency)
+        return (int(times[0]), int(times[-1])) if len(times) else None
+
+    def append(self, currency, times, rates):
+        """Add rates after the end of `currency`'s history"""
+        currency = currency.upper()
+        if currency == self.base:
+            raise ValueError(f"{currency} is the base currency; its rate is always 1")
+        times = to_seconds(times)
+        rates = np.asarray(rates, dtype=np.float64)
+        if times.shape != rates.shape or times.ndim != 1:
+            raise ValueError("times and rates must be 1-d arrays of the same length")
+        if not len(times):
+            return
+        if np.any(np.diff(times) <= 0):
+            raise ValueError(f"{currency}: times must be strictly increasing")
+        if not np.all(np.isfinite(rates) & (rates > 0)):
+            raise ValueError(f"{currency}: rates must be positive numbers")
+        if currency in self.currencies:
+            stored = self.span(currency)
+            if stored is not None and times[0] <= stored[1]:
+                raise ValueError(f"{currency}: new data starts at {format_times(times[:1])[0]}, "
+                                 f"not after the stored history ({format_times(np.array([stored[1]]))[0]})")
+        count = self._stored_count(currency)
+        self._series.pop(currency, None)
+        try:
+            with open(self._path(currency, RATE_SUFFIX), "ab") as f:
+                f.write(rates.astype("<f8").tobytes())
+            with open(self._path(currency, TIME_SUFFIX), "ab") as f:
+                f.write(times.astype("<i8").tobytes())
+        except OSError:
+            self._truncate(currency, count)
+            raise
+
+    def _stored_count(self, currency):
+        """Rows of `currency`, cutting off whatever an interrupted append left in only one file"""
+        sizes = [os.path.getsize(path) if os.path.exists(path) else 0
+                 for path in (self._path(currency, TIME_SUFFIX), self._path(currency, RATE_SUFFIX))]
+        count = min(sizes) // 8
+        if max(sizes) != 8 * count:
+            self._truncate(currency, count)
+        return count
+
+    def _truncate(self, currency, count):
+        for suffix in (TIME_SUFFIX, RATE_SUFFIX):
+            path = self._path(currency, suffix)
+            if os.path.exists(path):
+                os.truncate(path, 8 * count)
+
+    def import_csv(self, path, chunk_rows=IMPORT_CHUNK_ROWS):
+        """Append a ``time,currency,rate`` CSV; returns the number of rows imported.
+
+        All or nothing: if any chunk fails, every file is cut back to its
+        length before the import, and files the import created are removed.
+        """
+        stored = {currency: self._stored_count(currency) for currency in self.currencies}
+        total = 0
+        try:
+            with open(path, "r", newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                header = [name.strip().lower() for name in next(reader, [])]
+                try:
+                    columns = [header.index(name) for name in ("time", "currency", "rate")]
+                except ValueError:
+                    raise ValueError(f"{path}: expected columns time, currency and rate")
+                while True:
+                    rows = _rows(reader, columns, chunk_rows, path)
+                    if not rows:
+                        return total
+                    times, currencies, rates = zip(*rows)
+                    self._append_chunk(to_seconds(times), np.char.upper(np.char.strip(np.array(currencies))),
+                                       np.array(rates, dtype=np.float64))
+                    total += len(rows)
+        except BaseException:
+            self._rollback(stored)
+            raise
+
+    def _rollback(self, stored):
+        # Cached memmaps may reach past the lengths being restored
+        self._series.clear()
+        for currency in self.currencies:
+            if currency in stored:
+                self._truncate(currency, stored[currency])
+            else:
+                for suffix in (TIME_SUFFIX, RATE_SUFFIX):
+                    if os.path.exists(self._path(currency, suffix)):
+                        os.remove(self._path(currency, suffix))
+
+    def _append_chunk(self, times, currencies, rates):
+        names, codes = np.unique(currencies, return_inverse=True)
+        # Group rows by currency, keeping time order within each group
+        order = np.lexsort((times, codes))
+        bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+        for i, currency in enumerate(names):
+            if currency == self.base:
+                continue  # rows of the base currency only restate its rate of 1
+            rows = order[bounds[i]:bounds[i + 1]]
+            self.append(str(currency), times[rows], rates[rows])
+
+    def sample(self, currency, times):
+        """Rates of `currency` at `times` (sorted epoch seconds), forward-filled; NaN before its history"""
+        if currency == self.base:
+            return np.ones(len(times))
+        if not len(times):
+            return np.empty(0)
+        stored_times, stored_rates = self.series(currency, end=times[-1])
+        # Start at the last rate at or before the first time, the one it is forward-filled from
+        first = max(np.searchsorted(stored_times, times[0], side="right") - 1, 0)
+        stored_times, stored_rates = stored_times[first:], stored_rates[first:]
+        if len(stored_times) == len(times) and np.array_equal(stored_times, times):
+            return np.array(stored_rates)
+        if not len(stored_times):
+            return np.full(len(times), np.nan)
+        index = np.searchsorted(stored_times, times, side="right") - 1
+        result = stored_rates[np.maximum(index, 0)]
+        result[index < 0] = np.nan
+        return result
+
+    def grid(self, currencies, start=None, end=None, step=None):
+        """Sorted times to price at: every `step` seconds, or every time any of `currencies` has a rate"""
+        histories = [self.series(c, start, end)[0] for c in currencies if c != self.base]
+        if step is not None:
+            if start is None or end is None:
+                spans = [(h[0], h[-1]) for h in histories if len(h)]
+                if not spans:
+                    return np.empty(0, dtype=np.int64)
+                start = min(s for s, _ in spans) if start is None else start
+                end = max(e for _, e in spans) if end is None else end
+            return np.arange(to_seconds(start), to_seconds(end) + 1, step, dtype=np.int64)
+        if not histories:
+            return np.empty(0, dtype=np.int64)
+        times = np.asarray(histories[0])
+        for other in histories[1:]:
+            # Currencies recorded together share their times; only merge when they differ
+            if not (len(other) == len(times) and np.array_equal(other, times)):
+                times = np.union1d(times, other)
+        return np.array(times)
+
+
+def _rows(reader, columns, count, path):
+    """Up to `count` rows of `reader`, keeping only `columns`; blank lines are skipped"""
+    rows = []
+    needed = max(columns)
+    for row in reader:
+        if not row:
+            continue
+        if len(row) <= needed:
+            raise ValueError(f"{path}: line {reader.line_num}: expected time, currency and rate")
+        rows.append([row[i] for i in columns])
+        if len(rows) == count:
+            break
+    return rows
+
+
+def _memmap(path, dtype):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+def position_path(history, initial, target, amount, entry_rate, start=None, end=None, step=None):
+    """``(times, profit/loss in the initial currency)`` of one position over the history"""
+    times = history.grid([initial, target], start, end, step)
+    current = cross_rates(history.sample(initial, times), history.sample(target, times))
+    return times, profit_loss(amount, entry_rate, current)
+
+
+def portfolio_path(history, portfolio, start=None, end=None, step=None):
+    """``(times, total profit/loss in the base currency)`` of a Portfolio over the history.
+
+    NaN where a currency of the portfolio has no rate yet.
+    """
+    count = len(portfolio.currencies)
+    # Base P/L of a position is amount * entry / rate[target] - amount / rate[initial]
+    weights = (np.bincount(portfolio.target_codes, portfolio.amounts * portfolio.entry_rates, count)
+               - np.bincount(portfolio.currency_codes, portfolio.amounts, count))
+    currencies = [c for c, w in zip(portfolio.currencies, weights) if w != 0]
+    weights = weights[weights != 0]
+    times = history.grid(currencies, start, end, step)
+    path = np.zeros(len(times))
+    for first in range(0, len(times), BACKTEST_CHUNK):
+        chunk = times[first:first + BACKTEST_CHUNK]
+        out = path[first:first + BACKTEST_CHUNK]
+        for currency, weight in zip(currencies, weights):
+            out += weight / history.sample(currency, chunk)
+    return times, path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Store rate histories and backtest positions over them")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="append a time,currency,rate CSV to a store")
+    importer.add_argument("store")
+    importer.add_argument("csv")
+    importer.add_argument("--base", help="base currency the rates are quoted against")
+
+    info = commands.add_parser("info", help="list the currencies in a store")
+    info.add_argument("store")
+
+    backtest = commands.add_parser("backtest", help="profit/loss path of a position or portfolio")
+    backtest.add_argument("store")
+    what = backtest.add_mutually_exclusive_group(required=True)
+    what.add_argument("--position", help="INITIAL,TARGET,AMOUNT,RATE, as in the calculator form")
+    what.add_argument("--positions", help="positions CSV (book,currency,target,amount,rate)")
+    backtest.add_argument("--start", help="first time, e.g. 2020-01-01")
+    backtest.add_argument("--end", help="last time")
+    backtest.add_argument("--step", help="grid step such as 1m, 1h or 1d (default: every stored time)")
+    backtest.add_argument("-o", "--output", help="CSV file for the path (default: print a summary only)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "import":
+            history = RateHistory(args.store, args.base)
+            start = time.perf_counter()
+            rows = history.import_csv(args.csv)
+            print(f"{rows:,} rows imported in {time.perf_counter() - start:.2f} s")
+            return 0
+
+        history = RateHistory(args.store)
+        if args.command == "info":
+            print(f"base: {history.base or 'unknown'}")
+            for currency in history.currencies:
+                times, _ = history.series(currency)
+                span = history.span(currency)
+                text = "empty" if span is None else " to ".join(format_times(np.array(span)))
+                print(f"{currency}: {len(times):,} rates, {text}")
+            return 0
+
+        step = parse_step(args.step) if args.step else None
+        start = time.perf_counter()
+        if args.position:
+            initial, target, amount, rate = args.position.split(",")
+            currency = initial.strip().upper()
+            times, path = position_path(history, currency, target.strip().upper(), float(amount),
+                                        float(rate), args.start, args.end, step)
+        else:
+            from portfolio import Portfolio
+            currency = history.base or "base currency"
+            times, path = portfolio_path(history, Portfolio.from_csv(args.positions),
+                                         args.start, args.end, step)
+        elapsed = time.perf_counter() - start
+    except KeyError as e:
+        print(f"Error: {e.args[0]}", file=sys.stderr)
+        return 2
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            f.write("time,profit_loss\n")
+            for first in range(0, len(times), BACKTEST_CHUNK):
+                stamps = format_times(times[first:first + BACKTEST_CHUNK])
+                values = path[first:first + BACKTEST_CHUNK]
+                f.writelines(f"{t},{v:.2f}\n" for t, v in zip(stamps, values))
+    if len(path) and not np.all(np.isnan(path)):
+        low, high = np.nanargmin(path), np.nanargmax(path)
+        print(f"{len(path):,} points in {elapsed:.3f} s; profit/loss in {currency}: "
+              f"final {path[-1]:,.2f}, low {path[low]:,.2f} at {format_times(times[low:low + 1])[0]}, "
+              f"high {path[high]:,.2f} at {format_times(times[high:high + 1])[0]}")
+    else:
+        print("No rates in the requested range.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
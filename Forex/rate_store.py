@@ -0,0 +1,108 @@
+"""Exchange rates against one base currency, with every cross rate precomputed.
+
+Rates are stored as units of each currency per unit of the base, as in the
+rates CSV read by ``portfolio.load_rates``. The cross rate "1 A = ? B" is
+``rate[B] / rate[A]``; the store keeps all of them in an N x N NumPy matrix,
+so a lookup is one index into it. Changing one rate only changes one row and
+one column of the matrix, so a tick costs O(N) instead of recomputing all N*N
+cross rates; loading a whole table rebuilds the matrix in one outer division.
+"""
+import math
+
+import numpy as np
+
+from portfolio import load_rates
+
+INITIAL_CAPACITY = 16
+
+
+class RateStore:
+    def __init__(self, rates=None):
+        self.codes = {}  # currency -> row/column of the matrix
+        self.currencies = []
+        self._rates = np.empty(INITIAL_CAPACITY)
+        self._matrix = np.empty((INITIAL_CAPACITY, INITIAL_CAPACITY))
+        if rates:
+            self.set_rates(rates)
+
+    @classmethod
+    def from_csv(cls, path):
+        return cls(load_rates(path))
+
+    def __len__(self):
+        return len(self.currencies)
+
+    def __contains__(self, currency):
+        return currency in self.codes
+
+    @property
+    def rates(self):
+        """Rates against the base, indexed by currency code"""
+        return self._rates[:len(self.currencies)]
+
+    @property
+    def matrix(self):
+        """``matrix[i, j]`` is the rate for 1 currencies[i] = ? currencies[j]"""
+        count = len(self.currencies)
+        return self._matrix[:count, :count]
+
+    def get(self, currency, default=None):
+        code = self.codes.get(currency)
+        return default if code is None else float(self._rates[code])
+
+    def cross(self, initial, target):
+        """The rate for 1 `initial` = ? `target`; KeyError if either has no rate"""
+        return float(self._matrix[self.codes[initial], self.codes[target]])
+
+    def set_rate(self, currency, rate):
+        """Set one rate against the base and update its row and column of cross rates"""
+        rate = _checked(currency, rate)
+        code = self.codes.get(currency)
+        if code is None:
+            code = self._add(currency)
+        self._rates[code] = rate
+        rates = self.rates
+        np.divide(rates, rate, out=self._matrix[code, :len(rates)])
+        np.divide(rate, rates, out=self._matrix[:len(rates), code])
+
+    def set_rates(self, rates):
+        """Set many rates at once (a dict of currency -> rate) and rebuild the matrix"""
+        checked = {currency: _checked(currency, rate) for currency, rate in rates.items()}
+        for currency, rate in checked.items():
+            code = self.codes.get(currency)
+            if code is None:
+                code = self._add(currency)
+            self._rates[code] = rate
+        rates = self.rates
+        # Same division as set_rate, so both give bit-identical cross rates
+        np.divide(rates[np.newaxis, :], rates[:, np.newaxis], out=self.matrix)
+
+    def update(self, rates):
+        """Apply a batch of changed rates the cheaper way: row by row, or one rebuild if most changed"""
+        # Checked up front, so a bad rate rejects the whole batch rather than the rows after it
+        rates = {currency: _checked(currency, rate) for currency, rate in rates.items()}
+        if 2 * len(rates) < len(self.currencies):
+            for currency, rate in rates.items():
+                self.set_rate(currency, rate)
+        else:
+            self.set_rates(rates)
+
+    def _add(self, currency):
+        count = len(self.currencies)
+        if count == len(self._rates):
+            capacity = 2 * count
+            rates = np.empty(capacity)
+            rates[:count] = self._rates
+            matrix = np.empty((capacity, capacity))
+            matrix[:count, :count] = self._matrix[:count, :count]
+            self._rates, self._matrix = rates, matrix
+        self.codes[currency] = count
+        self.currencies.append(currency)
+        return count
+
+
+def _checked(currency, rate):
+    rate = float(rate)
+    if not math.isfinite(rate) or rate <= 0:
+        raise ValueError(f"{currency}: rate must be a positive number, got {rate}")
+    return rate
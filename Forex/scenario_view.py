@@ -0,0 +1,205 @@
+"""Scenario sweep for the Forex calculator: profit/loss over a grid of new rates and amounts.
+
+The whole surface is one broadcast NumPy expression, the same arithmetic as
+the single-position form with amounts down the rows and new rates across the
+columns. It is shown as a heatmap: the surface is coloured in one vectorized
+pass into a 32-bit pixel buffer that is drawn as a QImage, so a 1000 x 1000
+grid renders as fast as a small one. Break-even is where the new rate equals
+the entry rate, whatever the amount; it is marked with a line.
+"""
+import time
+
+import numpy as np
+from PyQt5.QtCore import Qt, QRectF
+from PyQt5.QtGui import QImage, QPainter, QPen
+from PyQt5.QtWidgets import (
+    QWidget, QFormLayout, QVBoxLayout, QHBoxLayout, QLineEdit, QSpinBox,
+    QPushButton, QLabel, QMessageBox, QToolTip
+)
+
+from forex_calc import profit_loss
+
+MAX_STEPS = 4000
+MARGIN_LEFT, MARGIN_BOTTOM, MARGIN_TOP, MARGIN_RIGHT = 90, 40, 10, 10
+
+
+def profit_loss_surface(amounts, entry_rate, new_rates):
+    """Profit/loss for every amount (rows) at every new rate (columns), in the initial currency"""
+    amounts = np.asarray(amounts, dtype=np.float64)[:, np.newaxis]
+    new_rates = np.asarray(new_rates, dtype=np.float64)[np.newaxis, :]
+    return profit_loss(amounts, entry_rate, new_rates)
+
+
+def colour(surface):
+    """ARGB pixels for `surface`: green for profit, red for loss, white at break-even"""
+    scale = np.abs(surface).max() or 1.0
+    t = surface / scale
+    fade = (255 * (1 - np.abs(t))).astype(np.uint32)
+    # Profit keeps green at full strength and fades red and blue; loss the other way round
+    red = np.where(t >= 0, fade, 255)
+    green = np.where(t >= 0, 255 - (t * 90).astype(np.uint32), fade)
+    return (0xFF000000 | (red << 16) | (green << 8) | fade).astype(np.uint32)
+
+
+class HeatmapWidget(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumSize(400, 300)
+        self.setMouseTracking(True)
+        self.surface = None
+        self.image = None
+
+    def set_surface(self, amounts, new_rates, surface, entry_rate, currency):
+        self.amounts, self.new_rates, self.surface = amounts, new_rates, surface
+        self.entry_rate, self.currency = entry_rate, currency
+        # Row 0 of the image is the top, where the largest amount goes
+        self.pixels = np.ascontiguousarray(colour(surface)[::-1])
+        height, width = self.pixels.shape
+        self.image = QImage(self.pixels.data, width, height, 4 * width, QImage.Format_ARGB32)
+        self.update()
+
+    def plot_rect(self):
+        return QRectF(MARGIN_LEFT, MARGIN_TOP, self.width() - MARGIN_LEFT - MARGIN_RIGHT,
+                      self.height() - MARGIN_TOP - MARGIN_BOTTOM)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.white)
+        if self.image is None:
+            painter.drawText(self.rect(), Qt.AlignCenter, "Set the ranges and press Compute.")
+            return
+        rect = self.plot_rect()
+        painter.drawImage(rect, self.image)
+
+        low, high = self.new_rates[0], self.new_rates[-1]
+        if low != high and min(low, high) <= self.entry_rate <= max(low, high):
+            x = rect.left() + (self.entry_rate - low) / (high - low) * rect.width()
+            painter.setPen(QPen(Qt.black, 2, Qt.DashLine))
+            painter.drawLine(int(x), int(rect.top()), int(x), int(rect.bottom()))
+            painter.drawText(int(x) + 4, int(rect.top()) + 14, f"break-even {self.entry_rate:.6g}")
+
+        painter.setPen(Qt.black)
+        painter.drawRect(rect)
+        bottom = int(rect.bottom()) + 16
+        painter.drawText(int(rect.left()), bottom, f"{low:.6g}")
+        painter.drawText(QRectF(rect.left(), bottom - 14, rect.width(), 20), Qt.AlignHCenter, "new rate")
+        painter.drawText(QRectF(rect.right() - 100, bottom - 14, 100, 20), Qt.AlignRight, f"{high:.6g}")
+        painter.drawText(QRectF(0, rect.top(), MARGIN_LEFT - 4, 20), Qt.AlignRight, f"{self.amounts[-1]:,.6g}")
+        painter.drawText(QRectF(0, rect.bottom() - 16, MARGIN_LEFT - 4, 20), Qt.AlignRight,
+                         f"{self.amounts[0]:,.6g}")
+        painter.drawText(QRectF(0, rect.center().y() - 10, MARGIN_LEFT - 4, 20), Qt.AlignRight, "amount")
+
+    def cell_at(self, position):
+        """``(row, column)`` of the surface under a widget position, or None"""
+        rect = self.plot_rect()
+        if self.surface is None or not rect.contains(position.x(), position.y()):
+            return None
+        rows, columns = self.surface.shape
+        column = min(int((position.x() - rect.left()) / rect.width() * columns), columns - 1)
+        row = min(int((rect.bottom() - position.y()) / rect.height() * rows), rows - 1)
+        return row, column
+
+    def mouseMoveEvent(self, event):
+        cell = self.cell_at(event.pos())
+        if cell is None:
+            QToolTip.hideText()
+            return
+        row, column = cell
+        QToolTip.showText(event.globalPos(),
+                          f"amount {self.amounts[row]:,.2f}, new rate {self.new_rates[column]:.6g}: "
+                          f"{self.surface[row, column]:,.2f} {self.currency}", self)
+
+
+class ScenarioWindow(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Scenario Sweep")
+        self.resize(800, 600)
+
+        self.currency_input = QLineEdit()
+        self.entry_rate_input = QLineEdit()
+        self.rate_from_input = QLineEdit()
+        self.rate_to_input = QLineEdit()
+        self.rate_steps_input = self._steps(1000)
+        self.amount_from_input = QLineEdit()
+        self.amount_to_input = QLineEdit()
+        self.amount_steps_input = self._steps(1000)
+
+        form_layout = QFormLayout()
+        form_layout.addRow("Initial Currency:", self.currency_input)
+        form_layout.addRow("Exchange Rate (1 Initial = ? Target):", self.entry_rate_input)
+        form_layout.addRow("New Rates:", self._range(self.rate_from_input, self.rate_to_input,
+                                                      self.rate_steps_input))
+        form_layout.addRow("Amounts:", self._range(self.amount_from_input, self.amount_to_input,
+                                                    self.amount_steps_input))
+
+        self.compute_button = QPushButton("Compute")
+        self.compute_button.clicked.connect(self.compute)
+        self.heatmap = HeatmapWidget()
+        self.result_label = QLabel("")
+        self.result_label.setWordWrap(True)
+
+        layout = QVBoxLayout()
+        layout.addLayout(form_layout)
+        layout.addWidget(self.compute_button)
+        layout.addWidget(self.heatmap, 1)
+        layout.addWidget(self.result_label)
+        self.setLayout(layout)
+
+    def _steps(self, value):
+        spin = QSpinBox()
+        spin.setRange(1, MAX_STEPS)
+        spin.setValue(value)
+        return spin
+
+    def _range(self, low, high, steps):
+        row = QHBoxLayout()
+        row.addWidget(low)
+        row.addWidget(QLabel("to"))
+        row.addWidget(high)
+        row.addWidget(QLabel("steps"))
+        row.addWidget(steps)
+        return row
+
+    def set_position(self, currency, amount, entry_rate, new_rate=None):
+        """Fill the form from a position, sweeping amounts 0-200% and rates around the new rate"""
+        centre = new_rate or entry_rate
+        self.currency_input.setText(currency)
+        self.entry_rate_input.setText(f"{entry_rate:g}")
+        self.rate_from_input.setText(f"{centre * 0.9:.6g}")
+        self.rate_to_input.setText(f"{centre * 1.1:.6g}")
+        self.amount_from_input.setText("0")
+        self.amount_to_input.setText(f"{amount * 2:g}")
+
+    def compute(self):
+        try:
+            entry_rate = float(self.entry_rate_input.text())
+            rate_from, rate_to = float(self.rate_from_input.text()), float(self.rate_to_input.text())
+            amount_from, amount_to = float(self.amount_from_input.text()), float(self.amount_to_input.text())
+        except ValueError:
+            QMessageBox.critical(self, "Input Error", "Please enter valid numeric values.")
+            return
+        # nan and inf parse as floats, but would turn the whole surface into NaN
+        if not np.all(np.isfinite([entry_rate, rate_from, rate_to, amount_from, amount_to])):
+            QMessageBox.critical(self, "Input Error", "Please enter valid numeric values.")
+            return
+        if entry_rate <= 0 or rate_from <= 0 or rate_to <= 0:
+            QMessageBox.critical(self, "Input Error", "Exchange rates must be positive.")
+            return
+        new_rates = np.linspace(rate_from, rate_to, self.rate_steps_input.value())
+        amounts = np.linspace(amount_from, amount_to, self.amount_steps_input.value())
+        currency = self.currency_input.text().strip()
+        start = time.perf_counter()
+        with np.errstate(over="ignore"):
+            surface = profit_loss_surface(amounts, entry_rate, new_rates)
+        computed = time.perf_counter()
+        if not np.all(np.isfinite(surface)):
+            QMessageBox.critical(self, "Input Error", "Profit/loss is out of range for these values.")
+            return
+        self.heatmap.set_surface(amounts, new_rates, surface, entry_rate, currency)
+        self.heatmap.repaint()
+        drawn = time.perf_counter()
+        self.result_label.setText(
+            f"{surface.size:,} scenarios: computed in {(computed - start) * 1000:.0f} ms, "
+            f"drawn in {(drawn - computed) * 1000:.0f} ms. Worst {surface.min():,.2f}, "
+            f"best {surface.max():,.2f} {currency}.")
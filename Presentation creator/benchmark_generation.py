@@ -0,0 +1,107 @@
+"""Benchmark deck generation: legacy two-pass build vs the single-pass engine.
+
+Each measurement runs in a fresh interpreter so that peak RSS is reported
+per deck size and per engine.
+
+    python benchmark_generation.py
+    python benchmark_generation.py --sizes 100 1000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from pptx import Presentation
+from pptx.util import Pt
+
+from benchmark_restyle import legacy_change_font_and_size
+from pptx_generator import build_presentation
+
+DEFAULT_SIZES = (100, 1000, 10000)
+CONTENT_FONT_SIZE = Pt(32)
+TITLE_FONT_SIZE = Pt(36)
+
+
+def make_slides(count):
+    return [
+        {"title": f"Slide {i + 1}", "content": f"Point one of {i + 1}\nPoint two\nPoint three"}
+        for i in range(count)
+    ]
+
+
+def build_two_pass(slides_content):
+    """The original generate-then-restyle path of the GUI"""
+    presentation = Presentation()
+    for slide in slides_content:
+        slide_obj = presentation.slides.add_slide(presentation.slide_layouts[1])
+        slide_obj.shapes.title.text = slide['title']
+        tf = slide_obj.placeholders[1].text_frame
+        tf.text = slide['content']
+        for paragraph in tf.paragraphs:
+            for run in paragraph.runs:
+                run.font.name = 'Times New Roman'
+                run.font.size = CONTENT_FONT_SIZE
+    legacy_change_font_and_size(presentation, CONTENT_FONT_SIZE, TITLE_FONT_SIZE)
+    return presentation
+
+
+def build_single_pass(slides_content):
+    return build_presentation(slides_content, CONTENT_FONT_SIZE, TITLE_FONT_SIZE)
+
+
+ENGINES = {
+    "two-pass": build_two_pass,
+    "single-pass": build_single_pass,
+}
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_child(engine, count):
+    slides = make_slides(count)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        start = time.perf_counter()
+        presentation = ENGINES[engine](slides)
+        built = time.perf_counter()
+        presentation.save(os.path.join(tmp_dir, "bench.pptx"))
+        saved = time.perf_counter()
+    print(json.dumps({
+        "build": built - start,
+        "save": saved - built,
+        "rss": peak_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark presentation generation")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--child", nargs=2, metavar=("ENGINE", "COUNT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], int(args.child[1]))
+        return
+
+    print(f"{'slides':>8} {'engine':>12} {'build s':>9} {'save s':>9} {'total s':>9} {'peak MB':>9}")
+    for count in args.sizes:
+        for engine in ENGINES:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", engine, str(count)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output)
+            total = result["build"] + result["save"]
+            print(f"{count:>8} {engine:>12} {result['build']:>9.2f} {result['save']:>9.2f} "
+                  f"{total:>9.2f} {result['rss']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
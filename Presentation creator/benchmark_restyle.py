@@ -0,0 +1,99 @@
+"""Benchmark restyling existing decks: the original object-model path vs the XML engine.
+
+Builds a deck with many runs per slide, restyles a fresh copy with each
+engine, checks that both produce identical slide XML and reports the time.
+
+    python benchmark_restyle.py
+    python benchmark_restyle.py --slides 2000 --paragraphs 8 --runs 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from lxml import etree
+from pptx import Presentation
+from pptx.dml.color import RGBColor
+from pptx.enum.text import PP_ALIGN
+from pptx.util import Pt
+
+from pptx_generator import restyle_presentation
+
+CONTENT_FONT_SIZE = Pt(32)
+TITLE_FONT_SIZE = Pt(36)
+
+
+def legacy_change_font_and_size(presentation, content_font_size, title_font_size):
+    """The GUI's original change_font_and_size, kept as the reference output"""
+    for slide in presentation.slides:
+        for shape in slide.shapes:
+            if shape.has_text_frame:
+                text_frame = shape.text_frame
+                for paragraph in text_frame.paragraphs:
+                    for run in paragraph.runs:
+                        if shape == slide.shapes.title:
+                            run.font.name = 'Times New Roman'
+                            run.font.size = title_font_size
+                            paragraph.alignment = PP_ALIGN.CENTER
+                            run.font.color.rgb = RGBColor(0, 0, 0)
+                        else:
+                            run.font.name = 'Times New Roman'
+                            run.font.size = content_font_size
+                            paragraph.alignment = PP_ALIGN.LEFT
+                            run.font.color.rgb = RGBColor(0, 0, 0)
+
+
+ENGINES = {
+    "object model": legacy_change_font_and_size,
+    "xml": restyle_presentation,
+}
+
+
+def make_deck(path, slides, paragraphs, runs):
+    presentation = Presentation()
+    layout = presentation.slide_layouts[1]
+    for i in range(slides):
+        slide = presentation.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {i + 1}"
+        text_frame = slide.placeholders[1].text_frame
+        for p in range(paragraphs):
+            paragraph = text_frame.paragraphs[0] if p == 0 else text_frame.add_paragraph()
+            for r in range(runs):
+                run = paragraph.add_run()
+                run.text = f"run {r} "
+                if r % 2:
+                    run.font.bold = True
+    presentation.save(path)
+    return slides * (1 + paragraphs * runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark restyling of existing presentations")
+    parser.add_argument("--slides", type=int, default=1000)
+    parser.add_argument("--paragraphs", type=int, default=6)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        deck = os.path.join(tmp_dir, "deck.pptx")
+        run_count = make_deck(deck, args.slides, args.paragraphs, args.runs)
+        print(f"{args.slides} slides, {run_count} runs")
+
+        outputs = {}
+        timings = {}
+        for name, engine in ENGINES.items():
+            presentation = Presentation(deck)
+            start = time.perf_counter()
+            engine(presentation, CONTENT_FONT_SIZE, TITLE_FONT_SIZE)
+            timings[name] = time.perf_counter() - start
+            outputs[name] = [etree.tostring(slide.element) for slide in presentation.slides]
+            print(f"{name:>14}: {timings[name]:8.3f} s  ({run_count / timings[name]:,.0f} runs/s)")
+
+        reference, *others = outputs.values()
+        identical = all(output == reference for output in others)
+        print(f"speed-up: {timings['object model'] / timings['xml']:.1f}x, "
+              f"output {'identical' if identical else 'DIFFERS'}")
+
+
+if __name__ == "__main__":
+    main()
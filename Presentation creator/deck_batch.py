@@ -0,0 +1,337 @@
+"""Headless batch tools for the Presentation creator.
+
+Builds many decks from JSON slide specs (the same format the GUI loads and
+saves), or re-fonts existing decks like "Modify Existing Presentation", in a
+process pool without starting PyQt5:
+
+    python deck_batch.py build specs/ -o decks/
+    python deck_batch.py build "nightly/*.json" --jobs 8 --content-size 28
+    python deck_batch.py modify archive/ --recursive
+"""
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pptx import Presentation
+from pptx.util import Pt
+
+from pptx_generator import IncrementalBuilder, PresentationBuilder, restyle_presentation
+from slide_spec import iter_valid_slides
+
+DEFAULT_CONTENT_FONT_SIZE = 32
+DEFAULT_TITLE_FONT_SIZE = 36
+
+
+MODIFIED_SUFFIX = "_modified"
+MANIFEST_NAME = ".deck_batch_manifest.json"
+MANIFEST_SAVE_INTERVAL = 100
+
+
+def expand_inputs(patterns, extension, recursive=False):
+    """Resolve directories, globs and plain paths into a sorted, de-duplicated file list"""
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            if recursive:
+                matches = glob.glob(os.path.join(pattern, "**", f"*{extension}"), recursive=True)
+            else:
+                matches = glob.glob(os.path.join(pattern, f"*{extension}"))
+        else:
+            matches = glob.glob(pattern, recursive=recursive) or ([pattern] if os.path.isfile(pattern) else [])
+        files.extend(os.path.abspath(path) for path in matches)
+    return sorted(set(files))
+
+
+def output_path_for(source_file, output_dir, suffix=""):
+    stem = os.path.splitext(os.path.basename(source_file))[0]
+    directory = output_dir or os.path.dirname(source_file)
+    return os.path.join(directory, f"{stem}{suffix}.pptx")
+
+
+def build_deck(json_file, output_file, content_font_size, title_font_size, template_file=None,
+               incremental=False):
+    """Build one deck from a JSON spec; font sizes are given in points.
+
+    With `incremental`, only slides that changed since the last incremental
+    build of `output_file` are generated.
+    """
+    # Image paths in the spec are relative to the spec itself
+    media_dir = os.path.dirname(os.path.abspath(json_file))
+    if incremental:
+        builder = IncrementalBuilder(output_file, Pt(content_font_size), Pt(title_font_size),
+                                     template_file, media_dir)
+    else:
+        builder = PresentationBuilder(Pt(content_font_size), Pt(title_font_size), template_file,
+                                      media_dir)
+    # Slides are parsed and validated one at a time while the deck is built
+    with open(json_file, 'rb') as f:
+        for slide in iter_valid_slides(f):
+            builder.add_slide(slide)
+    builder.save(output_file)
+    return builder.slide_count
+
+
+def _build_job(json_file, output_file, content_font_size, title_font_size, template_file, incremental):
+    start = time.perf_counter()
+    try:
+        slide_count = build_deck(json_file, output_file, content_font_size, title_font_size,
+                                 template_file, incremental)
+        return {"source": json_file, "output": output_file, "ok": True,
+                "slides": slide_count, "seconds": time.perf_counter() - start}
+    except Exception as e:
+        return {"source": json_file, "output": output_file, "ok": False,
+                "error": f"{type(e).__name__}: {e}", "seconds": time.perf_counter() - start}
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_file):
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest_file, manifest):
+    temp_file = f"{manifest_file}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(temp_file, manifest_file)
+
+
+def restyle_deck(source_file, output_file, content_font_size, title_font_size):
+    """Re-font one existing deck into `output_file`; font sizes are given in points"""
+    presentation = Presentation(source_file)
+    restyle_presentation(presentation, Pt(content_font_size), Pt(title_font_size))
+    presentation.save(output_file)
+    return len(presentation.slides)
+
+
+def _output_entry(output_file):
+    """What the manifest records of an output, to tell whether it is still the one written"""
+    try:
+        stat = os.stat(output_file)
+    except OSError:
+        return None
+    return {"path": os.path.abspath(output_file), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _modify_job(source_file, output_file, content_font_size, title_font_size, previous):
+    """Restyle `source_file` unless the manifest entry `previous` shows its output is current"""
+    start = time.perf_counter()
+    result = {"source": source_file, "output": output_file, "ok": True, "skipped": False}
+    try:
+        stat = os.stat(source_file)
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                 "settings": [content_font_size, title_font_size]}
+        up_to_date = (previous is not None
+                      and previous.get("settings") == entry["settings"]
+                      and previous.get("size") == entry["size"]
+                      and previous.get("output") == _output_entry(output_file))
+        if up_to_date and previous.get("mtime_ns") != entry["mtime_ns"]:
+            # Touched but possibly unchanged: fall back to comparing content
+            entry["sha256"] = file_digest(source_file)
+            up_to_date = previous.get("sha256") == entry["sha256"]
+
+        if up_to_date:
+            entry.setdefault("sha256", previous.get("sha256"))
+            result.update(skipped=True, slides=previous.get("slides", 0))
+        else:
+            entry.setdefault("sha256", file_digest(source_file))
+            result["slides"] = restyle_deck(source_file, output_file, content_font_size, title_font_size)
+        entry["slides"] = result["slides"]
+        entry["output"] = _output_entry(output_file)
+        result["entry"] = entry
+    except Exception as e:
+        result.update(ok=False, error=f"{type(e).__name__}: {e}")
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def plan_outputs(sources, output_dir, suffix=MODIFIED_SUFFIX):
+    """Pair every source with its `suffix`ed .pptx output, mirroring folders into `output_dir`.
+
+    Mirroring keeps sources with the same name in different folders from
+    writing the same output.
+    """
+    root = os.path.commonpath([os.path.dirname(source) for source in sources])
+    pairs = []
+    for source in sources:
+        target_dir = None
+        if output_dir:
+            target_dir = os.path.normpath(os.path.join(output_dir, os.path.relpath(os.path.dirname(source), root)))
+        pairs.append((source, output_path_for(source, target_dir, suffix)))
+    return pairs, root
+
+
+def run_jobs(job_function, jobs, max_workers):
+    """Run jobs in a process pool, yielding each result as soon as it completes.
+
+    Closing the generator early cancels the jobs that have not started yet.
+    Workers are spawned rather than forked so the pool is also safe to start
+    from the GUI's worker threads.
+    """
+    max_workers = max(1, min(max_workers, len(jobs)))
+    if max_workers == 1:
+        for job in jobs:
+            yield job_function(*job)
+        return
+    executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        futures = [executor.submit(job_function, *job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def find_presentations(patterns, recursive=False):
+    """Decks to restyle, leaving out the `_modified` outputs of earlier runs"""
+    return [source for source in expand_inputs(patterns, ".pptx", recursive)
+            if not os.path.splitext(source)[0].endswith(MODIFIED_SUFFIX)]
+
+
+def run_modify(sources, output_dir, content_font_size, title_font_size, max_workers, manifest_file=None):
+    """Restyle `sources` in parallel, yielding per-file results and keeping the manifest current"""
+    pairs, root = plan_outputs(sources, output_dir)
+    manifest_file = manifest_file or os.path.join(output_dir or root, MANIFEST_NAME)
+    manifest = load_manifest(manifest_file)
+    jobs = [(source, output, content_font_size, title_font_size, manifest.get(source))
+            for source, output in pairs]
+
+    for directory in {os.path.dirname(job[1]) for job in jobs}:
+        os.makedirs(directory, exist_ok=True)
+
+    pending = 0
+    try:
+        for result in run_jobs(_modify_job, jobs, max_workers):
+            if result["ok"]:
+                manifest[result["source"]] = result["entry"]
+                pending += 1
+                if pending >= MANIFEST_SAVE_INTERVAL:
+                    save_manifest(manifest_file, manifest)
+                    pending = 0
+            yield result
+    finally:
+        save_manifest(manifest_file, manifest)
+
+
+def print_result(result, index, total):
+    name = os.path.basename(result["source"])
+    if result.get("skipped"):
+        print(f"[{index}/{total}] skipped {name} (up to date)", flush=True)
+    elif result["ok"]:
+        print(f"[{index}/{total}] ok      {name} -> {result['output']} "
+              f"({result['slides']} slides, {result['seconds']:.2f} s)", flush=True)
+    else:
+        print(f"[{index}/{total}] failed  {name}: {result['error']}", flush=True)
+
+
+def print_summary(verb, results, elapsed):
+    succeeded = [result for result in results if result["ok"] and not result.get("skipped")]
+    skipped = sum(1 for result in results if result.get("skipped"))
+    failed = sum(1 for result in results if not result["ok"])
+    slides = sum(result["slides"] for result in succeeded)
+    seconds = max(elapsed, 1e-9)
+    print(f"{verb} {len(succeeded)} of {len(results)} decks ({slides} slides) in {elapsed:.2f} s: "
+          f"{len(succeeded) / seconds:.1f} decks/s, {slides / seconds:.0f} slides/s"
+          f"{f', {skipped} up to date' if skipped else ''}{f', {failed} failed' if failed else ''}")
+
+
+def command_build(args):
+    specs = expand_inputs(args.inputs, ".json")
+    if not specs:
+        print("No JSON slide specs found", file=sys.stderr)
+        return 2
+    if args.template and not os.path.isfile(args.template):
+        print(f"Template not found: {args.template}", file=sys.stderr)
+        return 2
+    pairs, _ = plan_outputs(specs, args.output_dir, suffix="")
+    for directory in {os.path.dirname(output) for _, output in pairs}:
+        os.makedirs(directory, exist_ok=True)
+
+    jobs = [(spec, output, args.content_size, args.title_size, args.template, args.incremental)
+            for spec, output in pairs]
+    start = time.perf_counter()
+    results = []
+    for result in run_jobs(_build_job, jobs, args.jobs):
+        results.append(result)
+        print_result(result, len(results), len(jobs))
+    print_summary("Built", results, time.perf_counter() - start)
+    return 0 if all(result["ok"] for result in results) else 1
+
+
+def command_modify(args):
+    sources = find_presentations(args.inputs, args.recursive)
+    if not sources:
+        print("No presentations found", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    results = []
+    for result in run_modify(sources, args.output_dir, args.content_size, args.title_size,
+                             args.jobs, args.manifest):
+        results.append(result)
+        print_result(result, len(results), len(sources))
+    print_summary("Modified", results, time.perf_counter() - start)
+    return 0 if all(result["ok"] for result in results) else 1
+
+
+def add_font_arguments(parser):
+    parser.add_argument("--content-size", type=int, default=DEFAULT_CONTENT_FONT_SIZE,
+                        help="content font size in points (default: %(default)s)")
+    parser.add_argument("--title-size", type=int, default=DEFAULT_TITLE_FONT_SIZE,
+                        help="title font size in points (default: %(default)s)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="number of worker processes (default: CPU count)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch presentation tools for the Presentation creator")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="build decks from JSON slide specs")
+    build_parser.add_argument("inputs", nargs="+", help="JSON files, directories or glob patterns")
+    build_parser.add_argument("-o", "--output-dir",
+                              help="directory for the generated decks, mirroring the input folders "
+                                   "(default: next to each spec)")
+    build_parser.add_argument("-t", "--template",
+                              help=".pptx file whose masters, layouts and theme are used for every deck")
+    build_parser.add_argument("-i", "--incremental", action="store_true",
+                              help="regenerate only the slides that changed since the last incremental "
+                                   "build, tracked in <deck>.pptx.manifest.json")
+    add_font_arguments(build_parser)
+    build_parser.set_defaults(handler=command_build)
+
+    modify_parser = subparsers.add_parser(
+        "modify", help="change the fonts of existing decks, saving <name>_modified.pptx")
+    modify_parser.add_argument("inputs", nargs="+", help=".pptx files, directories or glob patterns")
+    modify_parser.add_argument("-r", "--recursive", action="store_true", help="include subdirectories")
+    modify_parser.add_argument("-o", "--output-dir",
+                               help="directory for the modified decks, mirroring the input folders "
+                                    "(default: next to each deck)")
+    modify_parser.add_argument("--manifest",
+                               help=f"file recording processed decks (default: {MANIFEST_NAME} "
+                                    "in the output or common input directory)")
+    add_font_arguments(modify_parser)
+    modify_parser.set_defaults(handler=command_modify)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,18 +3,111 @@ import json
 import os
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, 
                              QWidget, QPushButton, QLabel, QLineEdit, QTextEdit, 
-                             QSpinBox, QListWidget, QListWidgetItem, QMessageBox,
-                             QFileDialog, QTabWidget, QFormLayout, QGroupBox)
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont, QIcon
-from pptx.enum.text import PP_ALIGN
-from pptx.dml.color import RGBColor
+                             QSpinBox, QListView, QAbstractItemView, QMessageBox,
+                             QFileDialog, QTabWidget, QFormLayout, QGroupBox,
+                             QProgressBar, QCheckBox, QComboBox, QListWidget, QUndoStack,
+                             QUndoCommand)
+from PyQt5.QtCore import (Qt, QThread, pyqtSignal, QAbstractListModel, QModelIndex,
+                          QPersistentModelIndex, QMimeData, QTimer)
+from PyQt5.QtGui import QFont, QIcon, QDrag, QKeySequence
 from pptx import Presentation
 from pptx.util import Pt
+from pptx_generator import (PresentationBuilder, IncrementalBuilder, style_slide, layout_names,
+                            CONTENT_LAYOUT_INDEX)
+from deck_batch import find_presentations, run_modify
+from slide_spec import load_slides
+from slide_journal import SlideJournal, claim_stale_journals
+from slide_preview import (SLIDE_ROLE, PREVIEW_WIDTH, PreviewCache, SlideThumbnailDelegate,
+                           ViewportRefresher, preview_key)
+
+class PresentationWorker(QThread):
+    """Worker thread that builds or restyles a presentation off the GUI thread"""
+    progress_updated = pyqtSignal(int, int)
+    status_changed = pyqtSignal(str)
+    presentation_saved = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    error_occurred = pyqtSignal(str)
+    
+    def __init__(self, filename, content_font_size, title_font_size, slides_data=None, source_file=None,
+                 template_file=None, media_dir=None, incremental=False):
+        super().__init__()
+        # Either build `slides_data` into `filename` or restyle `source_file` into it
+        self.filename = filename
+        self.content_font_size = content_font_size
+        self.title_font_size = title_font_size
+        self.template_file = template_file
+        self.media_dir = media_dir
+        self.incremental = incremental
+        self.summary = ""
+        self.slides_data = [dict(slide) for slide in slides_data] if slides_data is not None else None
+        self.source_file = source_file
+        self.is_running = True
+        self._last_percent = -1
+    
+    def run(self):
+        try:
+            # Either a builder or a loaded presentation, both are saved the same way
+            if self.source_file is None:
+                output = self.build_presentation()
+            else:
+                output = self.modify_presentation()
+            
+            if not self.is_running:
+                self.cancelled.emit()
+                return
+            
+            self.status_changed.emit(f"Saving {os.path.basename(self.filename)}...")
+            output.save(self.filename)
+            if isinstance(output, IncrementalBuilder) and not output.full_build:
+                self.summary = (f"{output.built} slides regenerated, {output.reused} reused, "
+                                f"{output.removed} removed")
+            self.presentation_saved.emit(self.filename)
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+    
+    def build_presentation(self):
+        if self.incremental:
+            builder = IncrementalBuilder(self.filename, self.content_font_size, self.title_font_size,
+                                         self.template_file, self.media_dir)
+        else:
+            builder = PresentationBuilder(self.content_font_size, self.title_font_size, self.template_file,
+                                          self.media_dir)
+        total = len(self.slides_data)
+        for i, slide in enumerate(self.slides_data):
+            if not self.is_running:
+                break
+            builder.add_slide(slide)
+            self.report_progress(i + 1, total)
+        return builder
+    
+    def modify_presentation(self):
+        self.status_changed.emit(f"Loading {os.path.basename(self.source_file)}...")
+        presentation = Presentation(self.source_file)
+        total = len(presentation.slides)
+        for i, slide in enumerate(presentation.slides):
+            if not self.is_running:
+                break
+            style_slide(slide, self.content_font_size, self.title_font_size)
+            self.report_progress(i + 1, total)
+        return presentation
+    
+    def report_progress(self, done, total):
+        # Only emit when the percentage moves so large decks don't flood the event loop
+        percent = done * 100 // total
+        if percent != self._last_percent or done == total:
+            self._last_percent = percent
+            self.progress_updated.emit(done, total)
+    
+    def stop(self):
+        self.is_running = False
 
 class SlideEditor(QWidget):
     def __init__(self):
         super().__init__()
+        # Slide fields the editor has no controls for (tables, charts) are kept as they are
+        self.other_fields = {}
+        # Image entries as in the spec (a path, or an object with a path and position)
+        self.images = []
         self.init_ui()
         
     def init_ui(self):
@@ -33,32 +126,440 @@ class SlideEditor(QWidget):
         self.content_edit.setMaximumHeight(150)
         layout.addWidget(self.content_edit)
         
+        # Layout selection
+        layout_layout = QHBoxLayout()
+        layout_layout.addWidget(QLabel("Layout:"))
+        self.layout_combo = QComboBox()
+        layout_layout.addWidget(self.layout_combo)
+        layout.addLayout(layout_layout)
+        self.set_layout_names(layout_names())
+        
+        # Images
+        layout.addWidget(QLabel("Images:"))
+        self.images_list = QListWidget()
+        self.images_list.setMaximumHeight(70)
+        layout.addWidget(self.images_list)
+        
+        images_buttons = QHBoxLayout()
+        self.add_image_btn = QPushButton("Add Image...")
+        self.add_image_btn.clicked.connect(self.add_image)
+        images_buttons.addWidget(self.add_image_btn)
+        self.remove_image_btn = QPushButton("Remove Image")
+        self.remove_image_btn.clicked.connect(self.remove_image)
+        images_buttons.addWidget(self.remove_image_btn)
+        layout.addLayout(images_buttons)
+        
+        # Tables and charts come from the JSON spec and are listed here
+        self.media_label = QLabel()
+        layout.addWidget(self.media_label)
+        
         self.setLayout(layout)
     
+    def set_layout_names(self, names):
+        current = self.layout_combo.currentData()
+        self.layout_combo.clear()
+        for i, name in enumerate(names):
+            self.layout_combo.addItem(f"{i}: {name}", i)
+        self.set_layout(CONTENT_LAYOUT_INDEX if current is None else current)
+    
+    def set_layout(self, index):
+        position = self.layout_combo.findData(index)
+        if position < 0:
+            # Keep layouts the current template doesn't have, the build reports them
+            self.layout_combo.addItem(f"{index}: (not in template)", index)
+            position = self.layout_combo.count() - 1
+        self.layout_combo.setCurrentIndex(position)
+    
+    def add_image(self):
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, "Add Images", "", "Images (*.png *.jpg *.jpeg *.gif *.bmp *.tif *.tiff)")
+        for file_path in file_paths:
+            self.images.append(file_path)
+            self.images_list.addItem(file_path)
+    
+    def remove_image(self):
+        for row in sorted((self.images_list.row(item) for item in self.images_list.selectedItems()),
+                          reverse=True):
+            self.images_list.takeItem(row)
+            del self.images[row]
+    
     def get_slide_data(self):
-        return {
-            "title": self.title_edit.text(),
-            "content": self.content_edit.toPlainText()
-        }
+        slide = dict(self.other_fields)
+        slide["title"] = self.title_edit.text()
+        slide["content"] = self.content_edit.toPlainText()
+        layout = self.layout_combo.currentData()
+        if layout is not None and layout != CONTENT_LAYOUT_INDEX:
+            slide["layout"] = layout
+        if self.images:
+            slide["images"] = list(self.images)
+        return slide
+    
+    def set_slide_data(self, slide):
+        self.title_edit.setText(slide.get("title", ""))
+        self.content_edit.setPlainText(slide.get("content", ""))
+        self.set_layout(slide.get("layout", CONTENT_LAYOUT_INDEX))
+        self.images = list(slide.get("images", []))
+        self.images_list.clear()
+        for image in self.images:
+            self.images_list.addItem(image["path"] if isinstance(image, dict) else image)
+        self.other_fields = {key: value for key, value in slide.items()
+                             if key not in ("title", "content", "layout", "images")}
+        self.update_media_label()
     
-    def set_slide_data(self, title, content):
-        self.title_edit.setText(title)
-        self.content_edit.setPlainText(content)
+    def update_media_label(self):
+        media = []
+        table = self.other_fields.get("table")
+        if table:
+            media.append(f"table {len(table['rows'])} × {max(len(row) for row in table['rows'])}")
+        chart = self.other_fields.get("chart")
+        if chart:
+            media.append(f"{chart.get('type', 'column')} chart, {len(chart['series'])} series")
+        self.media_label.setText(f"Also on this slide: {', '.join(media)}" if media else "")
     
     def clear(self):
         self.title_edit.clear()
         self.content_edit.clear()
+        self.set_layout(CONTENT_LAYOUT_INDEX)
+        self.images = []
+        self.images_list.clear()
+        self.other_fields = {}
+        self.update_media_label()
+
+class SpecLoadWorker(QThread):
+    """Worker thread that streams and validates a JSON slide spec"""
+    progress_updated = pyqtSignal(int, int)
+    slides_loaded = pyqtSignal(list)
+    error_occurred = pyqtSignal(str)
+    
+    def __init__(self, file_path):
+        super().__init__()
+        self.file_path = file_path
+    
+    def run(self):
+        try:
+            total = os.path.getsize(self.file_path)
+            slides = load_slides(self.file_path, lambda done: self.progress_updated.emit(done, total))
+            self.slides_loaded.emit(slides)
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+
+class BatchModifyWorker(QThread):
+    """Worker thread that restyles a folder of presentations in a process pool"""
+    progress_updated = pyqtSignal(int, int)
+    batch_finished = pyqtSignal(int, int, list)
+    error_occurred = pyqtSignal(str)
+    
+    def __init__(self, folder, recursive, content_font_size, title_font_size):
+        super().__init__()
+        self.folder = folder
+        self.recursive = recursive
+        self.content_font_size = content_font_size
+        self.title_font_size = title_font_size
+        self.is_running = True
+    
+    def run(self):
+        try:
+            sources = find_presentations([self.folder], self.recursive)
+            total = len(sources)
+            done = skipped = 0
+            failures = []
+            if sources:
+                results = run_modify(sources, None, self.content_font_size, self.title_font_size,
+                                     os.cpu_count())
+                try:
+                    for result in results:
+                        done += 1
+                        if not result["ok"]:
+                            failures.append(f"{os.path.relpath(result['source'], self.folder)}: {result['error']}")
+                        elif result["skipped"]:
+                            skipped += 1
+                        self.progress_updated.emit(done, total)
+                        if not self.is_running:
+                            break
+                finally:
+                    results.close()
+            self.batch_finished.emit(done - skipped - len(failures), skipped, failures)
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+    
+    def stop(self):
+        self.is_running = False
+
+SLIDE_ROWS_MIME_TYPE = "application/x-pptx-creator-slide-rows"
+
+AUTOSAVE_DIR = os.path.join(os.path.expanduser("~"), ".pptx_creator")
+
+class SlideListModel(QAbstractListModel):
+    """List model over the slide dicts; edits notify only the rows they touch"""
+    
+    def __init__(self, slides=None, parent=None):
+        super().__init__(parent)
+        self.slides = slides if slides is not None else []
+        # Optional SlideJournal that every change is recorded to
+        self.journal = None
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.slides)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            row = index.row()
+            return f"{row + 1}. {self.slides[row].get('title', f'Slide {row + 1}')}"
+        if role == SLIDE_ROLE:
+            return self.slides[index.row()]
+        return None
+    
+    def flags(self, index):
+        if not index.isValid():
+            # Drops are only accepted between rows, never onto a slide
+            return Qt.ItemIsDropEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDragEnabled
+    
+    def supportedDropActions(self):
+        return Qt.MoveAction
+    
+    def mimeTypes(self):
+        return [SLIDE_ROWS_MIME_TYPE]
+    
+    def mimeData(self, indexes):
+        mime_data = QMimeData()
+        rows = sorted({index.row() for index in indexes})
+        mime_data.setData(SLIDE_ROWS_MIME_TYPE, ",".join(map(str, rows)).encode())
+        return mime_data
+    
+    def dropMimeData(self, data, action, row, column, parent):
+        # Drops are applied by SlideListView.dropEvent through move_slides
+        return False
+    
+    def moveRows(self, source_parent, source_row, count, destination_parent, destination_child):
+        if (source_parent.isValid() or destination_parent.isValid() or count < 1
+                or source_row <= destination_child <= source_row + count):
+            return False
+        self.beginMoveRows(QModelIndex(), source_row, source_row + count - 1, QModelIndex(), destination_child)
+        moved = self.slides[source_row:source_row + count]
+        del self.slides[source_row:source_row + count]
+        insert_at = destination_child - count if destination_child > source_row else destination_child
+        self.slides[insert_at:insert_at] = moved
+        self.endMoveRows()
+        if self.journal:
+            self.journal.record({"op": "move", "row": source_row, "count": count, "to": destination_child})
+        # Slide numbers are part of the label, so refresh the rows between the two positions
+        first = min(source_row, insert_at)
+        last = max(source_row, insert_at) + count - 1
+        self.dataChanged.emit(self.index(first), self.index(last), [Qt.DisplayRole])
+        return True
+    
+    def removeRows(self, row, count, parent=QModelIndex()):
+        if parent.isValid() or row < 0 or count < 1 or row + count > len(self.slides):
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row + count - 1)
+        del self.slides[row:row + count]
+        self.endRemoveRows()
+        if self.journal:
+            self.journal.record({"op": "remove", "row": row, "count": count})
+        if row < len(self.slides):
+            self.dataChanged.emit(self.index(row), self.index(len(self.slides) - 1), [Qt.DisplayRole])
+        return True
+    
+    def move_slides(self, rows, destination):
+        """Move any set of rows so they end up contiguous, in order, before row `destination`"""
+        rows = sorted(set(rows))
+        insert_at = destination
+        for row in [row for row in rows if row >= destination]:
+            self.moveRows(QModelIndex(), row, 1, QModelIndex(), insert_at)
+            insert_at += 1
+        insert_at = destination
+        for row in reversed([row for row in rows if row < destination]):
+            self.moveRows(QModelIndex(), row, 1, QModelIndex(), insert_at)
+            insert_at -= 1
+    
+    def move_row_to(self, row, target):
+        """Move one row so that it ends up at index `target`"""
+        if row != target:
+            self.moveRows(QModelIndex(), row, 1, QModelIndex(), target + 1 if target > row else target)
+    
+    def remove_slides(self, rows):
+        """Remove any set of rows, one contiguous block at a time from the bottom up"""
+        rows = sorted(set(rows), reverse=True)
+        while rows:
+            last = first = rows.pop(0)
+            while rows and rows[0] == first - 1:
+                first = rows.pop(0)
+            self.removeRows(first, last - first + 1)
+    
+    def insert_slide(self, row, slide):
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.slides.insert(row, slide)
+        self.endInsertRows()
+        if self.journal:
+            self.journal.record({"op": "insert", "row": row, "slide": slide})
+        if row + 1 < len(self.slides):
+            self.dataChanged.emit(self.index(row + 1), self.index(len(self.slides) - 1), [Qt.DisplayRole])
+    
+    def set_slide(self, row, slide):
+        self.slides[row] = slide
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, SLIDE_ROLE])
+        if self.journal:
+            self.journal.record({"op": "set", "row": row, "slide": slide})
+    
+    def set_slides(self, slides):
+        self.beginResetModel()
+        self.slides = slides
+        self.endResetModel()
+        if self.journal:
+            self.journal.checkpoint(slides)
+
+class InsertSlideCommand(QUndoCommand):
+    def __init__(self, model, row, slide):
+        super().__init__("Add Slide")
+        self.model = model
+        self.row = row
+        self.slide = slide
+    
+    def redo(self):
+        self.model.insert_slide(self.row, self.slide)
+    
+    def undo(self):
+        self.model.removeRows(self.row, 1)
+
+class EditSlideCommand(QUndoCommand):
+    def __init__(self, model, row, slide):
+        super().__init__("Edit Slide")
+        self.model = model
+        self.row = row
+        # Only the replaced slide and its new version are kept, not the whole list
+        self.old_slide = model.slides[row]
+        self.new_slide = slide
+    
+    def redo(self):
+        self.model.set_slide(self.row, self.new_slide)
+    
+    def undo(self):
+        self.model.set_slide(self.row, self.old_slide)
+
+class RemoveSlidesCommand(QUndoCommand):
+    def __init__(self, model, rows):
+        super().__init__("Remove Slides" if len(set(rows)) > 1 else "Remove Slide")
+        self.model = model
+        self.removed = [(row, model.slides[row]) for row in sorted(set(rows))]
+    
+    def redo(self):
+        self.model.remove_slides([row for row, _ in self.removed])
+    
+    def undo(self):
+        for row, slide in self.removed:
+            self.model.insert_slide(row, slide)
+
+class MoveSlidesCommand(QUndoCommand):
+    def __init__(self, model, rows, destination):
+        super().__init__("Move Slides" if len(set(rows)) > 1 else "Move Slide")
+        self.model = model
+        self.rows = sorted(set(rows))
+        self.destination = destination
+    
+    def redo(self):
+        self.model.move_slides(self.rows, self.destination)
+    
+    def undo(self):
+        # The moved rows form one block after redo: move it to the end, then put each
+        # row back where it came from, lowest first, so the other rows never shift
+        count = len(self.rows)
+        total = self.model.rowCount()
+        start = self.destination - sum(1 for row in self.rows if row < self.destination)
+        if start + count != total:
+            self.model.moveRows(QModelIndex(), start, count, QModelIndex(), total)
+        for i, row in enumerate(self.rows):
+            self.model.move_row_to(total - count + i, row)
+
+class SlideListView(QListView):
+    """Slide list whose drag and drop reorders slides through the model's row moves"""
+    slides_dropped = pyqtSignal(list, int)
+    
+    def startDrag(self, supported_actions):
+        indexes = self.selectionModel().selectedRows()
+        if indexes:
+            drag = QDrag(self)
+            drag.setMimeData(self.model().mimeData(indexes))
+            # The drop already moved the rows, so nothing is removed afterwards
+            drag.exec_(Qt.MoveAction)
+    
+    def dropEvent(self, event):
+        if event.source() is not self or not event.mimeData().hasFormat(SLIDE_ROWS_MIME_TYPE):
+            event.ignore()
+            return
+        rows = [int(row) for row in bytes(event.mimeData().data(SLIDE_ROWS_MIME_TYPE)).decode().split(",")]
+        index = self.indexAt(event.pos())
+        if index.isValid():
+            destination = index.row() + (1 if event.pos().y() > self.visualRect(index).center().y() else 0)
+        else:
+            destination = self.model().rowCount()
+        self.slides_dropped.emit(rows, destination)
+        event.accept()
+        self.stopAutoScroll()
+        self.setState(QAbstractItemView.NoState)
+        self.viewport().update()
 
 class PowerPointGUI(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.slides_data = []
-        self.current_slide_index = -1
+        self.slides_model = SlideListModel(parent=self)
+        # The slide being edited follows moves and becomes invalid when it is removed
+        self._current_slide = QPersistentModelIndex()
+        self.worker = None
+        # Directory of the loaded JSON spec, which relative image paths refer to
+        self.media_dir = None
+        self.preview_cache = PreviewCache(parent=self)
+        self._preview_key = None
+        self.undo_stack = QUndoStack(self)
+        # Set while a new command is pushed, so only undo and redo reload the editor
+        self._pushing = False
+        
+        # Journals of sessions that ended without closing them; other running instances keep theirs locked
+        stale_journals = claim_stale_journals(AUTOSAVE_DIR) if os.path.isdir(AUTOSAVE_DIR) else []
+        try:
+            self.journal = SlideJournal.for_instance(AUTOSAVE_DIR)
+        except OSError:
+            # Without a writable autosave folder the editor still works, only without crash recovery
+            self.journal = None
+        self.slides_model.journal = self.journal
         self.init_ui()
+        self.recover_autosave(stale_journals)
+    
+    @property
+    def slides_data(self):
+        return self.slides_model.slides
+    
+    @slides_data.setter
+    def slides_data(self, slides):
+        self.slides_model.set_slides(slides)
+    
+    @property
+    def current_slide_index(self):
+        return self._current_slide.row() if self._current_slide.isValid() else -1
+    
+    @current_slide_index.setter
+    def current_slide_index(self, index):
+        if 0 <= index < len(self.slides_data):
+            self._current_slide = QPersistentModelIndex(self.slides_model.index(index))
+        else:
+            self._current_slide = QPersistentModelIndex()
         
     def init_ui(self):
         self.setWindowTitle("PowerPoint Presentation Creator")
-        self.setGeometry(100, 100, 800, 600)
+        self.setGeometry(100, 100, 1150, 650)
+        
+        # Edit menu with undo and redo of slide list changes
+        edit_menu = self.menuBar().addMenu("&Edit")
+        undo_action = self.undo_stack.createUndoAction(self, "&Undo")
+        undo_action.setShortcut(QKeySequence.Undo)
+        edit_menu.addAction(undo_action)
+        redo_action = self.undo_stack.createRedoAction(self, "&Redo")
+        redo_action.setShortcut(QKeySequence.Redo)
+        edit_menu.addAction(redo_action)
+        self.undo_stack.indexChanged.connect(self.on_undo_index_changed)
         
         # Create central widget and main layout
         central_widget = QWidget()
@@ -73,14 +574,27 @@ class PowerPointGUI(QMainWindow):
         right_panel = self.create_right_panel()
         main_layout.addWidget(right_panel, 2)
         
+        # Preview panel - Rendered current slide and thumbnails of the whole deck
+        preview_panel = self.create_preview_panel()
+        main_layout.addWidget(preview_panel, 1)
+        
     def create_left_panel(self):
         panel = QWidget()
         layout = QVBoxLayout(panel)
         
         # Slide list
         layout.addWidget(QLabel("Slides:"))
-        self.slides_list = QListWidget()
-        self.slides_list.itemClicked.connect(self.on_slide_selected)
+        self.slides_list = SlideListView()
+        self.slides_list.setModel(self.slides_model)
+        self.slides_list.setUniformItemSizes(True)
+        # Lay rows out in batches so moves and resets don't relayout thousands of rows at once
+        self.slides_list.setLayoutMode(QListView.Batched)
+        self.slides_list.setBatchSize(1000)
+        self.slides_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.slides_list.setDragDropMode(QAbstractItemView.InternalMove)
+        self.slides_list.setDefaultDropAction(Qt.MoveAction)
+        self.slides_list.clicked.connect(self.on_slide_selected)
+        self.slides_list.slides_dropped.connect(self.move_slides)
         layout.addWidget(self.slides_list)
         
         # Slide control buttons
@@ -159,19 +673,120 @@ class PowerPointGUI(QMainWindow):
         filename_layout.addWidget(self.filename_edit)
         ppt_layout.addLayout(filename_layout)
         
+        # Optional template whose masters, layouts and theme are used for new presentations
+        template_layout = QHBoxLayout()
+        template_layout.addWidget(QLabel("Template:"))
+        self.template_edit = QLineEdit()
+        self.template_edit.setPlaceholderText("Default template")
+        self.template_edit.editingFinished.connect(self.refresh_layout_names)
+        template_layout.addWidget(self.template_edit)
+        self.browse_template_btn = QPushButton("Browse...")
+        self.browse_template_btn.clicked.connect(self.browse_template)
+        template_layout.addWidget(self.browse_template_btn)
+        ppt_layout.addLayout(template_layout)
+        
         # Create and modify buttons
         self.create_ppt_btn = QPushButton("Create New Presentation")
         self.create_ppt_btn.clicked.connect(self.create_presentation)
         ppt_layout.addWidget(self.create_ppt_btn)
         
+        # Regenerate only changed slides, tracked in <filename>.manifest.json
+        self.incremental_checkbox = QCheckBox("Incremental rebuild (only regenerate changed slides)")
+        ppt_layout.addWidget(self.incremental_checkbox)
+        
         self.modify_ppt_btn = QPushButton("Modify Existing Presentation")
         self.modify_ppt_btn.clicked.connect(self.modify_presentation)
         ppt_layout.addWidget(self.modify_ppt_btn)
         
+        # Batch modification of every presentation in a folder
+        folder_layout = QHBoxLayout()
+        self.modify_folder_btn = QPushButton("Modify Folder...")
+        self.modify_folder_btn.clicked.connect(self.modify_folder)
+        folder_layout.addWidget(self.modify_folder_btn)
+        self.recursive_checkbox = QCheckBox("Include subfolders")
+        folder_layout.addWidget(self.recursive_checkbox)
+        ppt_layout.addLayout(folder_layout)
+        
+        # Progress of the background build
+        progress_layout = QHBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        progress_layout.addWidget(self.progress_bar)
+        
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setVisible(False)
+        self.cancel_btn.clicked.connect(self.cancel_processing)
+        progress_layout.addWidget(self.cancel_btn)
+        ppt_layout.addLayout(progress_layout)
+        
         layout.addWidget(ppt_group)
         
         return panel
     
+    def create_preview_panel(self):
+        panel = QWidget()
+        layout = QVBoxLayout(panel)
+        
+        layout.addWidget(QLabel("Preview:"))
+        self.preview_label = QLabel()
+        self.preview_label.setFixedSize(PREVIEW_WIDTH, PREVIEW_WIDTH * 3 // 4)
+        self.preview_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.preview_label)
+        
+        # Thumbnails share the slide model and selection; only visible rows are rendered
+        layout.addWidget(QLabel("Thumbnails:"))
+        self.thumbnail_list = QListView()
+        self.thumbnail_list.setModel(self.slides_model)
+        self.thumbnail_list.setSelectionModel(self.slides_list.selectionModel())
+        self.thumbnail_list.setItemDelegate(
+            SlideThumbnailDelegate(self.preview_cache, self.preview_font_sizes, self.thumbnail_list))
+        self.thumbnail_list.setUniformItemSizes(True)
+        self.thumbnail_list.setLayoutMode(QListView.Batched)
+        self.thumbnail_list.setBatchSize(1000)
+        self.thumbnail_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.thumbnail_list.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.thumbnail_list.clicked.connect(self.on_slide_selected)
+        layout.addWidget(self.thumbnail_list)
+        
+        self.thumbnail_refresher = ViewportRefresher(self.thumbnail_list)
+        self.preview_cache.preview_ready.connect(self.on_preview_ready)
+        
+        # Re-render the preview shortly after typing stops rather than on every keystroke
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(150)
+        self.preview_timer.timeout.connect(self.refresh_preview)
+        self.slide_editor.title_edit.textChanged.connect(self.preview_timer.start)
+        self.slide_editor.content_edit.textChanged.connect(self.preview_timer.start)
+        self.title_font_size.valueChanged.connect(self.on_font_size_changed)
+        self.content_font_size.valueChanged.connect(self.on_font_size_changed)
+        self.refresh_preview()
+        
+        return panel
+    
+    def preview_font_sizes(self):
+        return self.title_font_size.value(), self.content_font_size.value()
+    
+    def refresh_preview(self):
+        key = preview_key(self.slide_editor.get_slide_data(), *self.preview_font_sizes(), PREVIEW_WIDTH)
+        self._preview_key = key
+        pixmap = self.preview_cache.get(key)
+        if pixmap is not None:
+            self.preview_label.setPixmap(pixmap)
+        else:
+            self.preview_cache.request(key)
+    
+    def on_preview_ready(self, key):
+        if key == self._preview_key:
+            self.preview_label.setPixmap(self.preview_cache.get(key))
+        else:
+            self.thumbnail_refresher.schedule()
+    
+    def on_font_size_changed(self):
+        # Font sizes are part of the cache key, so visible thumbnails simply re-render
+        self.refresh_preview()
+        self.thumbnail_list.viewport().update()
+    
     def create_settings_tab(self):
         settings_tab = QWidget()
         layout = QFormLayout(settings_tab)
@@ -193,72 +808,117 @@ class PowerPointGUI(QMainWindow):
     
     def add_slide(self):
         slide_data = {"title": f"Slide {len(self.slides_data) + 1}", "content": "Enter content here"}
-        self.slides_data.append(slide_data)
-        self.update_slides_list()
-        self.slides_list.setCurrentRow(len(self.slides_data) - 1)
+        self.push_command(InsertSlideCommand(self.slides_model, len(self.slides_data), slide_data))
+        self.set_current_row(len(self.slides_data) - 1)
         self.load_slide_to_editor(len(self.slides_data) - 1)
     
     def remove_slide(self):
-        current_row = self.slides_list.currentRow()
-        if current_row >= 0 and current_row < len(self.slides_data):
-            self.slides_data.pop(current_row)
-            self.update_slides_list()
-            self.slide_editor.clear()
-            self.current_slide_index = -1
+        rows = [index.row() for index in self.slides_list.selectionModel().selectedRows()]
+        if rows:
+            self.push_command(RemoveSlidesCommand(self.slides_model, rows))
+            if self.current_slide_index < 0:
+                self.slide_editor.clear()
     
     def move_slide_up(self):
-        current_row = self.slides_list.currentRow()
+        current_row = self.slides_list.currentIndex().row()
         if current_row > 0:
-            self.slides_data[current_row], self.slides_data[current_row - 1] = \
-                self.slides_data[current_row - 1], self.slides_data[current_row]
-            self.update_slides_list()
-            self.slides_list.setCurrentRow(current_row - 1)
+            self.move_slides([current_row], current_row - 1)
+            self.set_current_row(current_row - 1)
     
     def move_slide_down(self):
-        current_row = self.slides_list.currentRow()
+        current_row = self.slides_list.currentIndex().row()
         if current_row >= 0 and current_row < len(self.slides_data) - 1:
-            self.slides_data[current_row], self.slides_data[current_row + 1] = \
-                self.slides_data[current_row + 1], self.slides_data[current_row]
-            self.update_slides_list()
-            self.slides_list.setCurrentRow(current_row + 1)
+            self.move_slides([current_row], current_row + 2)
+            self.set_current_row(current_row + 1)
     
-    def update_slides_list(self):
-        self.slides_list.clear()
-        for i, slide in enumerate(self.slides_data):
-            title = slide.get("title", f"Slide {i + 1}")
-            item = QListWidgetItem(f"{i + 1}. {title}")
-            self.slides_list.addItem(item)
+    def move_slides(self, rows, destination):
+        self.push_command(MoveSlidesCommand(self.slides_model, rows, destination))
+    
+    def push_command(self, command):
+        self._pushing = True
+        try:
+            self.undo_stack.push(command)
+        finally:
+            self._pushing = False
     
-    def on_slide_selected(self, item):
-        row = self.slides_list.row(item)
-        self.load_slide_to_editor(row)
+    def on_undo_index_changed(self):
+        # Undo and redo can change or remove the slide in the editor. A new change leaves
+        # the editor alone, so text typed but not yet applied survives moves and removals
+        if self._pushing:
+            return
+        if self.current_slide_index >= 0:
+            self.load_slide_to_editor(self.current_slide_index)
+    
+    def recover_autosave(self, stale_journals):
+        """Offer the newest stale journal with slides; older ones are left for later starts"""
+        offered = False
+        for stale in stale_journals:
+            if offered:
+                stale.release()
+                continue
+            slides = stale.replay()
+            if slides:
+                offered = True
+                reply = QMessageBox.question(
+                    self, "Recover Slides",
+                    f"The last session ended unexpectedly with {len(slides)} slides. Recover them?",
+                    QMessageBox.Yes | QMessageBox.No
+                )
+                if reply == QMessageBox.Yes:
+                    # Setting the slides checkpoints them into this session's journal
+                    self.slides_data = slides
+                    self.set_current_row(0)
+                    self.load_slide_to_editor(0)
+            stale.discard()
+    
+    def set_current_row(self, row):
+        self.slides_list.setCurrentIndex(self.slides_model.index(row))
+    
+    def on_slide_selected(self, index):
+        self.load_slide_to_editor(index.row())
     
     def load_slide_to_editor(self, index):
         if 0 <= index < len(self.slides_data):
             self.current_slide_index = index
-            slide = self.slides_data[index]
-            self.slide_editor.set_slide_data(slide["title"], slide["content"])
+            self.slide_editor.set_slide_data(self.slides_data[index])
     
     def update_current_slide(self):
         if self.current_slide_index >= 0:
             slide_data = self.slide_editor.get_slide_data()
-            self.slides_data[self.current_slide_index] = slide_data
-            self.update_slides_list()
-            self.slides_list.setCurrentRow(self.current_slide_index)
+            if slide_data != self.slides_data[self.current_slide_index]:
+                self.push_command(EditSlideCommand(self.slides_model, self.current_slide_index, slide_data))
     
     def load_from_json(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Load JSON File", "", "JSON Files (*.json)")
         if file_path:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    self.slides_data = json.load(f)
-                self.update_slides_list()
-                if self.slides_data:
-                    self.slides_list.setCurrentRow(0)
-                    self.load_slide_to_editor(0)
-                QMessageBox.information(self, "Success", f"Loaded {len(self.slides_data)} slides from JSON")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to load JSON: {str(e)}")
+            if not self.begin_processing():
+                return
+            self.cancel_btn.setVisible(False)
+            self.statusBar().showMessage(f"Loading {os.path.basename(file_path)}...")
+            
+            self.worker = SpecLoadWorker(file_path)
+            self.worker.progress_updated.connect(self.on_load_progress)
+            self.worker.slides_loaded.connect(self.on_slides_loaded)
+            self.worker.error_occurred.connect(
+                lambda error: QMessageBox.critical(self, "Error", f"Failed to load JSON:\n{error}"))
+            self.worker.finished.connect(self.on_worker_finished)
+            self.worker.start()
+    
+    def on_load_progress(self, done, total):
+        # Progress is reported in kilobytes so large files stay within the bar's int range
+        self.progress_bar.setMaximum(max(total // 1024, 1))
+        self.progress_bar.setValue(done // 1024)
+    
+    def on_slides_loaded(self, slides):
+        self.media_dir = os.path.dirname(os.path.abspath(self.worker.file_path))
+        self.slides_data = slides
+        self.undo_stack.clear()
+        self.slide_editor.clear()
+        if self.slides_data:
+            self.set_current_row(0)
+            self.load_slide_to_editor(0)
+        self.statusBar().showMessage(f"Loaded {len(self.slides_data)} slides")
+        QMessageBox.information(self, "Success", f"Loaded {len(self.slides_data)} slides from JSON")
     
     def save_to_json(self):
         if not self.slides_data:
@@ -270,44 +930,13 @@ class PowerPointGUI(QMainWindow):
             try:
                 with open(file_path, 'w', encoding='utf-8') as f:
                     json.dump(self.slides_data, f, indent=2, ensure_ascii=False)
+                # Everything up to here is saved, so the journal can start over from this state
+                if self.journal:
+                    self.journal.checkpoint(self.slides_data)
                 QMessageBox.information(self, "Success", f"Saved {len(self.slides_data)} slides to JSON")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to save JSON: {str(e)}")
     
-    def change_font_and_size(self, presentation, content_font_size, title_font_size):
-        for slide in presentation.slides:
-            for shape in slide.shapes:
-                if shape.has_text_frame:
-                    text_frame = shape.text_frame
-                    for paragraph in text_frame.paragraphs:
-                        for run in paragraph.runs:
-                            if shape == slide.shapes.title:
-                                run.font.name = 'Times New Roman'
-                                run.font.size = title_font_size
-                                paragraph.alignment = PP_ALIGN.CENTER
-                                run.font.color.rgb = RGBColor(0, 0, 0)
-                            else:
-                                run.font.name = 'Times New Roman'
-                                run.font.size = content_font_size
-                                paragraph.alignment = PP_ALIGN.LEFT
-                                run.font.color.rgb = RGBColor(0, 0, 0)
-    
-    def create_presentation_from_data(self, slides_content):
-        presentation = Presentation()
-        for slide in slides_content:
-            slide_layout = presentation.slide_layouts[1]
-            slide_obj = presentation.slides.add_slide(slide_layout)
-            title_placeholder = slide_obj.shapes.title
-            body_placeholder = slide_obj.placeholders[1]
-            title_placeholder.text = slide['title']
-            tf = body_placeholder.text_frame
-            tf.text = slide['content']
-            for paragraph in tf.paragraphs:
-                for run in paragraph.runs:
-                    run.font.name = 'Times New Roman'
-                    run.font.size = Pt(self.content_font_size.value())
-        return presentation
-    
     def create_presentation(self):
         if not self.slides_data:
             QMessageBox.warning(self, "Warning", "No slides to create presentation")
@@ -324,38 +953,178 @@ class PowerPointGUI(QMainWindow):
         if not filename.endswith('.pptx'):
             filename += '.pptx'
         
+        template_file = self.template_edit.text().strip() or None
+        if template_file and not os.path.isfile(template_file):
+            QMessageBox.warning(self, "Warning", f"Template not found: {template_file}")
+            return
+        
+        self.start_processing(filename, slides_data=self.slides_data, template_file=template_file,
+                              media_dir=self.media_dir, incremental=self.incremental_checkbox.isChecked())
+    
+    def browse_template(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Select Template", "", "PowerPoint Files (*.pptx)")
+        if file_path:
+            self.template_edit.setText(file_path)
+            self.refresh_layout_names()
+    
+    def refresh_layout_names(self):
+        # The layout choices follow the template the presentation will be built from
+        template_file = self.template_edit.text().strip() or None
+        if template_file and not os.path.isfile(template_file):
+            return
         try:
-            presentation = self.create_presentation_from_data(self.slides_data)
-            self.change_font_and_size(
-                presentation, 
-                Pt(self.content_font_size.value()), 
-                Pt(self.title_font_size.value())
-            )
-            presentation.save(filename)
-            QMessageBox.information(self, "Success", f"Presentation saved as {filename}")
+            self.slide_editor.set_layout_names(layout_names(template_file))
         except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to create presentation: {str(e)}")
+            QMessageBox.warning(self, "Warning", f"Could not read template layouts: {str(e)}")
     
     def modify_presentation(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Select PowerPoint File", "", "PowerPoint Files (*.pptx)")
         if file_path:
-            try:
-                presentation = Presentation(file_path)
-                self.change_font_and_size(
-                    presentation, 
-                    Pt(self.content_font_size.value()), 
-                    Pt(self.title_font_size.value())
-                )
-                
-                # Create modified filename
-                base_name = os.path.splitext(file_path)[0]
-                modified_filename = f"{base_name}_modified.pptx"
-                presentation.save(modified_filename)
-                
-                QMessageBox.information(self, "Success", 
-                    f"Font and size changed to Times New Roman and saved as {os.path.basename(modified_filename)}")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to modify presentation: {str(e)}")
+            # Create modified filename
+            base_name = os.path.splitext(file_path)[0]
+            modified_filename = f"{base_name}_modified.pptx"
+            self.start_processing(modified_filename, source_file=file_path)
+    
+    def modify_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Select Folder of Presentations")
+        if not folder:
+            return
+        if not self.begin_processing():
+            return
+        
+        self.worker = BatchModifyWorker(
+            folder,
+            self.recursive_checkbox.isChecked(),
+            self.content_font_size.value(),
+            self.title_font_size.value()
+        )
+        self.worker.progress_updated.connect(self.on_batch_progress)
+        self.worker.batch_finished.connect(self.on_batch_finished)
+        self.worker.error_occurred.connect(lambda error: self.on_error(error, "modify"))
+        self.worker.finished.connect(self.on_worker_finished)
+        self.worker.start()
+    
+    def begin_processing(self):
+        if self.worker and self.worker.isRunning():
+            QMessageBox.information(self, "Info", "A presentation is already being processed.")
+            return False
+        
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setValue(0)
+        self.cancel_btn.setVisible(True)
+        self.create_ppt_btn.setEnabled(False)
+        self.modify_ppt_btn.setEnabled(False)
+        self.modify_folder_btn.setEnabled(False)
+        self.load_json_btn.setEnabled(False)
+        self.statusBar().showMessage("Processing presentation...")
+        return True
+    
+    def start_processing(self, filename, slides_data=None, source_file=None, template_file=None,
+                         media_dir=None, incremental=False):
+        if not self.begin_processing():
+            return
+        
+        self.worker = PresentationWorker(
+            filename,
+            Pt(self.content_font_size.value()),
+            Pt(self.title_font_size.value()),
+            slides_data=slides_data,
+            source_file=source_file,
+            template_file=template_file,
+            media_dir=media_dir,
+            incremental=incremental
+        )
+        self.worker.progress_updated.connect(self.on_progress_updated)
+        self.worker.status_changed.connect(self.statusBar().showMessage)
+        if source_file is None:
+            self.worker.presentation_saved.connect(self.on_presentation_created)
+        else:
+            self.worker.presentation_saved.connect(self.on_presentation_modified)
+        self.worker.cancelled.connect(self.on_processing_cancelled)
+        self.worker.error_occurred.connect(
+            lambda error: self.on_error(error, "create" if source_file is None else "modify"))
+        self.worker.finished.connect(self.on_worker_finished)
+        self.worker.start()
+    
+    def cancel_processing(self):
+        if self.worker and self.worker.isRunning():
+            self.worker.stop()
+            self.cancel_btn.setEnabled(False)
+            self.statusBar().showMessage("Cancelling...")
+    
+    def on_progress_updated(self, done, total):
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(done)
+        self.statusBar().showMessage(f"Processing slide {done} of {total}")
+    
+    def on_batch_progress(self, done, total):
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(done)
+        self.statusBar().showMessage(f"Processed {done} of {total} presentations")
+    
+    def on_batch_finished(self, modified, skipped, failures):
+        summary = f"Modified {modified} presentations, {skipped} already up to date"
+        self.statusBar().showMessage(f"{summary}, {len(failures)} failed")
+        if failures:
+            shown = "\n".join(failures[:20])
+            more = f"\n... and {len(failures) - 20} more" if len(failures) > 20 else ""
+            QMessageBox.warning(self, "Batch Finished",
+                f"{summary}.\n\n{len(failures)} failed:\n{shown}{more}")
+        else:
+            QMessageBox.information(self, "Success", f"{summary}.")
+    
+    def on_presentation_created(self, filename):
+        summary = f" ({self.worker.summary})" if self.worker and self.worker.summary else ""
+        self.statusBar().showMessage(f"Presentation saved as {filename}{summary}")
+        QMessageBox.information(self, "Success", f"Presentation saved as {filename}{summary}")
+    
+    def on_presentation_modified(self, filename):
+        self.statusBar().showMessage(f"Modified presentation saved as {filename}")
+        QMessageBox.information(self, "Success", 
+            f"Font and size changed to Times New Roman and saved as {os.path.basename(filename)}")
+    
+    def on_processing_cancelled(self):
+        self.statusBar().showMessage("Processing cancelled, nothing was saved")
+    
+    def on_error(self, error_msg, action):
+        self.statusBar().showMessage("Error occurred during processing")
+        QMessageBox.critical(self, "Error", f"Failed to {action} presentation: {error_msg}")
+    
+    def on_worker_finished(self):
+        self.progress_bar.setVisible(False)
+        self.cancel_btn.setVisible(False)
+        self.cancel_btn.setEnabled(True)
+        self.create_ppt_btn.setEnabled(True)
+        self.modify_ppt_btn.setEnabled(True)
+        self.modify_folder_btn.setEnabled(True)
+        self.load_json_btn.setEnabled(True)
+        if self.worker:
+            self.worker.deleteLater()
+            self.worker = None
+    
+    def closeEvent(self, event):
+        if self.worker and self.worker.isRunning():
+            reply = QMessageBox.question(
+                self, "Confirm Exit",
+                "A presentation is still being processed. Do you want to stop and exit?",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if reply == QMessageBox.Yes:
+                self.worker.stop()
+                self.worker.wait()
+                self.shutdown()
+                event.accept()
+            else:
+                event.ignore()
+        else:
+            self.shutdown()
+            event.accept()
+    
+    def shutdown(self):
+        self.preview_cache.shutdown()
+        # A clean exit needs no recovery
+        if self.journal:
+            self.journal.close(discard=True)
 
 def main():
     app = QApplication(sys.argv)
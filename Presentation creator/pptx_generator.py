@@ -0,0 +1,548 @@
+"""Presentation generation engine for the Presentation creator.
+
+Slides are styled while they are created, so a deck is built in a single
+pass instead of being generated first and walked again before saving.
+Styling edits the slide XML directly rather than going through the
+python-pptx run and font proxies, with identical output.
+
+Besides title and content, slides may pick a layout and carry images, a
+table and a chart. Each distinct image is stored once per deck, however many
+slides show it.
+
+IncrementalBuilder rebuilds an existing deck from an edited spec, generating
+only the slides whose spec changed and reusing the others as they are.
+"""
+import copy
+import hashlib
+import json
+import os
+from collections import defaultdict, deque
+
+from pptx import Presentation
+from pptx.chart.data import CategoryChartData
+from pptx.dml.color import RGBColor
+from pptx.enum.chart import XL_CHART_TYPE, XL_LEGEND_POSITION
+from pptx.enum.shapes import PP_PLACEHOLDER
+from pptx.enum.text import PP_ALIGN
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.packuri import PackURI
+from pptx.oxml.ns import qn
+from pptx.parts.image import Image, ImagePart
+from pptx.parts.slide import SlidePart
+from pptx.util import Emu, Inches, Pt
+
+FONT_NAME = 'Times New Roman'
+FONT_COLOR = RGBColor(0, 0, 0)
+CONTENT_LAYOUT_INDEX = 1
+TABLE_FONT_SIZE = 18
+CHART_FONT_SIZE = 14
+CHART_TYPES = {
+    'column': XL_CHART_TYPE.COLUMN_CLUSTERED,
+    'bar': XL_CHART_TYPE.BAR_CLUSTERED,
+    'line': XL_CHART_TYPE.LINE_MARKERS,
+    'pie': XL_CHART_TYPE.PIE,
+}
+BODY_PLACEHOLDER_TYPES = (PP_PLACEHOLDER.BODY, PP_PLACEHOLDER.OBJECT, PP_PLACEHOLDER.SUBTITLE)
+
+# Template parts that generating a deck only ever reads
+SHARED_PART_PREFIXES = (
+    '/ppt/theme/', '/ppt/slideMasters/', '/ppt/slideLayouts/', '/ppt/notesMasters/',
+    '/ppt/handoutMasters/', '/ppt/media/', '/ppt/fonts/', '/ppt/printerSettings/',
+    '/docProps/thumbnail',
+)
+
+_A_P = qn('a:p')
+_A_R = qn('a:r')
+_A_PPR = qn('a:pPr')
+_A_RPR = qn('a:rPr')
+_A_LATIN = qn('a:latin')
+_A_SOLID_FILL = qn('a:solidFill')
+_A_SRGB_CLR = qn('a:srgbClr')
+_P_SP = qn('p:sp')
+_SP_TREE_PATH = f"{qn('p:cSld')}/{qn('p:spTree')}"
+_PH_PATH = f"*/{qn('p:nvPr')}/{qn('p:ph')}"
+_FONT_COLOR_HEX = str(FONT_COLOR)
+_ALIGNMENTS = {PP_ALIGN.LEFT: 'l', PP_ALIGN.CENTER: 'ctr'}
+
+# Child-order constraints of a:rPr and a:solidFill from the DrawingML schema
+_FILL_TAGS = {qn(f'a:{name}') for name in (
+    'noFill', 'solidFill', 'gradFill', 'blipFill', 'pattFill', 'grpFill')}
+_FILL_SUCCESSORS = {qn(f'a:{name}') for name in (
+    'effectLst', 'effectDag', 'highlight', 'uLnTx', 'uLn', 'uFillTx', 'uFill', 'latin', 'ea',
+    'cs', 'sym', 'hlinkClick', 'hlinkMouseOver', 'rtl', 'extLst')}
+_LATIN_SUCCESSORS = {qn(f'a:{name}') for name in (
+    'ea', 'cs', 'sym', 'hlinkClick', 'hlinkMouseOver', 'rtl', 'extLst')}
+_COLOR_TAGS = {qn(f'a:{name}') for name in (
+    'scrgbClr', 'srgbClr', 'hslClr', 'sysClr', 'schemeClr', 'prstClr')}
+_SHAPE_TAGS = {qn(f'p:{name}') for name in (
+    'sp', 'grpSp', 'graphicFrame', 'cxnSp', 'pic', 'contentPart')}
+
+
+def _insert_before(parent, child, successors):
+    """Insert `child` before the first existing child whose tag is in `successors`"""
+    for existing in parent:
+        if existing.tag in successors:
+            existing.addprevious(child)
+            return child
+    parent.append(child)
+    return child
+
+
+def style_text_body(txBody, font_size, alignment):
+    """Apply the deck font, size, colour and alignment to every run of an ``a:txBody``.
+
+    Works on the XML directly and produces the same markup as setting
+    ``run.font.name``, ``run.font.size``, ``paragraph.alignment`` and
+    ``run.font.color.rgb`` through the python-pptx object model.
+    """
+    size = str(Emu(font_size).centipoints)
+    align = _ALIGNMENTS[alignment]
+    for paragraph in txBody.iterchildren(_A_P):
+        runs = paragraph.findall(_A_R)
+        if not runs:
+            continue
+        pPr = paragraph.find(_A_PPR)
+        if pPr is None:
+            pPr = paragraph.makeelement(_A_PPR, {})
+            paragraph.insert(0, pPr)
+        pPr.set('algn', align)
+
+        for run in runs:
+            rPr = run.find(_A_RPR)
+            if rPr is None:
+                rPr = run.makeelement(_A_RPR, {})
+                run.insert(0, rPr)
+
+            latin = rPr.find(_A_LATIN)
+            if latin is None:
+                latin = _insert_before(rPr, rPr.makeelement(_A_LATIN, {}), _LATIN_SUCCESSORS)
+            latin.set('typeface', FONT_NAME)
+            rPr.set('sz', size)
+
+            solid_fill = rPr.find(_A_SOLID_FILL)
+            if solid_fill is None:
+                for fill in [child for child in rPr if child.tag in _FILL_TAGS]:
+                    rPr.remove(fill)
+                solid_fill = _insert_before(rPr, rPr.makeelement(_A_SOLID_FILL, {}), _FILL_SUCCESSORS)
+            srgb_color = solid_fill.find(_A_SRGB_CLR)
+            if srgb_color is None:
+                for color in [child for child in solid_fill if child.tag in _COLOR_TAGS]:
+                    solid_fill.remove(color)
+                srgb_color = solid_fill.makeelement(_A_SRGB_CLR, {})
+                solid_fill.append(srgb_color)
+            srgb_color.set('val', _FONT_COLOR_HEX)
+
+
+def _title_element(spTree):
+    """The shape python-pptx reports as ``slide.shapes.title``: the first placeholder with idx 0"""
+    for shape in spTree:
+        if shape.tag in _SHAPE_TAGS:
+            ph = shape.find(_PH_PATH)
+            if ph is not None and int(ph.get('idx', 0)) == 0:
+                return shape
+    return None
+
+
+def style_slide(slide, content_font_size, title_font_size):
+    """Restyle every text shape of an existing slide"""
+    spTree = slide.element.find(_SP_TREE_PATH)
+    title = _title_element(spTree)
+    for sp in spTree.iterchildren(_P_SP):
+        # Like ``shape.text_frame``, this adds an empty text body to shapes without one
+        txBody = sp.get_or_add_txBody()
+        if sp is title:
+            style_text_body(txBody, title_font_size, PP_ALIGN.CENTER)
+        else:
+            style_text_body(txBody, content_font_size, PP_ALIGN.LEFT)
+
+
+def restyle_presentation(presentation, content_font_size, title_font_size):
+    """Restyle all slides of a loaded presentation in place"""
+    for slide in presentation.slides:
+        style_slide(slide, content_font_size, title_font_size)
+
+
+class TemplateCache:
+    """Parses each template once per process and hands out cheap clones of it.
+
+    A clone deep-copies only the parts a new deck writes to (presentation,
+    slides, document properties) and shares the read-only masters, layouts,
+    theme and media with the cached template. Slide layouts of a clone are
+    therefore the cached template's layout objects.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def _key(self, template_file):
+        if template_file is None:
+            return None
+        # Re-parse the template when it is edited on disk
+        stat = os.stat(template_file)
+        return (os.path.abspath(template_file), stat.st_mtime_ns, stat.st_size)
+
+    def _entry(self, template_file):
+        key = self._key(template_file)
+        entry = self._entries.get(key)
+        if entry is None:
+            template = Presentation(template_file)
+            shared = {
+                id(part): part for part in template.part.package.iter_parts()
+                if part.partname.startswith(SHARED_PART_PREFIXES)
+            }
+            entry = self._entries[key] = (template, shared)
+        return entry
+
+    def new_presentation(self, template_file=None):
+        """Return a fresh presentation based on `template_file` (the default template if None)"""
+        template, shared = self._entry(template_file)
+        return copy.deepcopy(template, dict(shared))
+
+    def clear(self):
+        self._entries.clear()
+
+
+template_cache = TemplateCache()
+
+
+def layout_names(template_file=None):
+    """Names of the slide layouts of `template_file`, in index order"""
+    template, _ = template_cache._entry(template_file)
+    return [layout.name for layout in template.slide_layouts]
+
+
+def _box(item, default):
+    """(left, top, width, height) of a media item: its own position in inches, else `default`"""
+    if all(key in item for key in ('left', 'top', 'width', 'height')):
+        return tuple(Inches(item[key]) for key in ('left', 'top', 'width', 'height'))
+    return default
+
+
+class PresentationBuilder:
+    """Builds a presentation one slide at a time, styling each slide as it is added"""
+
+    def __init__(self, content_font_size, title_font_size, template_file=None, media_dir=None,
+                 presentation=None):
+        self.content_font_size = content_font_size
+        self.title_font_size = title_font_size
+        # Slides are appended to `presentation` if given, else to a new deck from the template
+        self.presentation = presentation or template_cache.new_presentation(template_file)
+        self.slide_layouts = list(self.presentation.slide_layouts)
+        self.slide_layout = self.slide_layouts[CONTENT_LAYOUT_INDEX]
+        self.slide_count = 0
+        # Relative image paths in slide specs are resolved against this directory
+        self.media_dir = media_dir
+
+        # sha1 -> (image part, native size); path -> sha1. Filled on the first image
+        self._images = None
+        self._image_sha1s = {}
+        self._next_image_number = None
+        self._content_areas = {}
+
+        self._presentation_part = self.presentation.part
+        self._sldIdLst = self.presentation.slides._sldIdLst
+        used_ids = [sldId.id for sldId in self._sldIdLst.sldId_lst]
+        self._next_slide_id = max([255] + used_ids) + 1
+
+    def _append_slide(self, slide_layout):
+        """Append a blank slide in O(1).
+
+        ``Slides.add_slide`` rescans every existing slide relationship and slide id
+        on each call, which makes generating large decks quadratic. The builder is
+        the only writer while a deck is generated, so it tracks those itself.
+        """
+        partname = PackURI(f"/ppt/slides/slide{len(self._sldIdLst) + 1}.xml")
+        slide_part = SlidePart.new(partname, self._presentation_part.package, slide_layout.part)
+        rId = self._presentation_part.rels._add_relationship(RT.SLIDE, slide_part)
+        slide_obj = slide_part.slide
+        slide_obj.shapes.clone_layout_placeholders(slide_layout)
+        self._sldIdLst._add_sldId(id=self._next_slide_id, rId=rId)
+        self._next_slide_id += 1
+        return slide_obj
+
+    def _layout(self, slide):
+        index = slide.get('layout', CONTENT_LAYOUT_INDEX)
+        if not 0 <= index < len(self.slide_layouts):
+            raise ValueError(f"slide layout {index} does not exist, the template has "
+                             f"{len(self.slide_layouts)} layouts")
+        return self.slide_layouts[index]
+
+    def _image(self, image_file):
+        """Image part and native size for `image_file`, adding each distinct image only once.
+
+        python-pptx looks images up by scanning every part of the package, which
+        makes a deck with one image per slide quadratic to build; the builder
+        keeps its own index by path and by content hash instead.
+        """
+        path = os.path.join(self.media_dir, image_file) if self.media_dir else image_file
+        path = os.path.abspath(path)
+        sha1 = self._image_sha1s.get(path)
+        if sha1 is not None:
+            return self._images[sha1]
+
+        if self._images is None:
+            self._images = {}
+            numbers = [0]
+            for part in self._presentation_part.package.iter_parts():
+                if isinstance(part, ImagePart):
+                    self._images[part.sha1] = (part, part._native_size)
+                if part.partname.startswith('/ppt/media/image'):
+                    numbers.append(part.partname.idx or 0)
+            self._next_image_number = max(numbers) + 1
+
+        image = Image.from_file(path)
+        sha1 = self._image_sha1s[path] = image.sha1
+        if sha1 not in self._images:
+            partname = PackURI(f"/ppt/media/image{self._next_image_number}.{image.ext}")
+            self._next_image_number += 1
+            part = ImagePart(partname, image.content_type, self._presentation_part.package,
+                             image.blob, image.filename)
+            self._images[sha1] = (part, part._native_size)
+        return self._images[sha1]
+
+    def _add_image(self, slide_obj, item, box):
+        image_part, (native_cx, native_cy) = self._image(item['path'] if isinstance(item, dict) else item)
+        rId = slide_obj.part.relate_to(image_part, RT.IMAGE)
+        left, top, width, height = box
+        if isinstance(item, dict) and 'left' in item:
+            cx, cy = width, height
+        else:
+            # Fit the image into its area, keeping its aspect ratio
+            scale = min(width / native_cx, height / native_cy)
+            cx, cy = int(native_cx * scale), int(native_cy * scale)
+            left, top = left + (width - cx) // 2, top + (height - cy) // 2
+        slide_obj.shapes._add_pic_from_image_part(image_part, rId, left, top, cx, cy)
+
+    def _add_table(self, slide_obj, table_spec, box):
+        rows = table_spec['rows']
+        columns = max(len(row) for row in rows)
+        table = slide_obj.shapes.add_table(len(rows), columns, *box).table
+        font_size = Pt(table_spec.get('font_size', TABLE_FONT_SIZE))
+        for r, row in enumerate(rows):
+            for c, value in enumerate(row):
+                text_frame = table.cell(r, c).text_frame
+                text_frame.text = str(value)
+                style_text_body(text_frame._txBody, font_size, PP_ALIGN.LEFT)
+
+    def _add_chart(self, slide_obj, chart_spec, box):
+        chart_data = CategoryChartData()
+        chart_data.categories = chart_spec['categories']
+        for series in chart_spec['series']:
+            chart_data.add_series(series['name'], series['values'])
+        chart_type = CHART_TYPES[chart_spec.get('type', 'column')]
+        chart = slide_obj.shapes.add_chart(chart_type, *box, chart_data).chart
+        chart.has_legend = len(chart_spec['series']) > 1 or chart_type == XL_CHART_TYPE.PIE
+        if chart.has_legend:
+            chart.legend.position = XL_LEGEND_POSITION.BOTTOM
+            chart.legend.include_in_layout = False
+        chart.font.name = FONT_NAME
+        chart.font.size = Pt(CHART_FONT_SIZE)
+
+    def _content_area(self, slide_layout, body_placeholder):
+        """Box of the body placeholder, or the area below the title when the layout has none"""
+        # Inherited placeholder positions are slow to resolve, so they are cached per layout
+        area = self._content_areas.get(slide_layout.part.partname)
+        if area is None:
+            if body_placeholder is not None:
+                area = (body_placeholder.left, body_placeholder.top,
+                        body_placeholder.width, body_placeholder.height)
+            else:
+                top = Inches(1.75)
+                area = (Inches(0.5), top, self.presentation.slide_width - Inches(1),
+                        self.presentation.slide_height - top - Inches(0.5))
+            self._content_areas[slide_layout.part.partname] = area
+        return area
+
+    def add_slide(self, slide):
+        slide_layout = self._layout(slide)
+        slide_obj = self._append_slide(slide_layout)
+        title_placeholder = slide_obj.shapes.title
+        body_placeholder = next((placeholder for placeholder in slide_obj.placeholders
+                                 if placeholder.placeholder_format.idx != 0
+                                 and placeholder.placeholder_format.type in BODY_PLACEHOLDER_TYPES),
+                                None)
+
+        if title_placeholder is not None:
+            title_placeholder.text = slide['title']
+            style_text_body(title_placeholder.text_frame._txBody, self.title_font_size, PP_ALIGN.CENTER)
+
+        content = slide.get('content', '')
+        media = [(self._add_image, item) for item in slide.get('images', ())]
+        if 'table' in slide:
+            media.append((self._add_table, slide['table']))
+        if 'chart' in slide:
+            media.append((self._add_chart, slide['chart']))
+        # Media without a position of their own share the content area, stacked top to bottom
+        unplaced = [item for _, item in media if not (isinstance(item, dict) and 'left' in item)]
+        if unplaced or body_placeholder is None:
+            left, top, width, height = self._content_area(slide_layout, body_placeholder)
+
+        if media and not content:
+            if body_placeholder is not None:
+                # The media take the place of the empty body placeholder
+                body_placeholder._element.getparent().remove(body_placeholder._element)
+        elif content or body_placeholder is not None:
+            if body_placeholder is None:
+                # Layouts without a body (Title Only, Blank) get the content as a text box
+                body_placeholder = slide_obj.shapes.add_textbox(left, top, width, height)
+            if unplaced:
+                # Text keeps the left half, media take the right half
+                width //= 2
+                # An inherited position has no xfrm of its own yet, so set all of it
+                body_placeholder.left, body_placeholder.top = left, top
+                body_placeholder.width, body_placeholder.height = width, height
+                left += width
+            tf = body_placeholder.text_frame
+            tf.text = content
+            style_text_body(tf._txBody, self.content_font_size, PP_ALIGN.LEFT)
+
+        if unplaced:
+            height //= len(unplaced)
+        areas = iter([(left, top + i * height, width, height) for i in range(len(unplaced))])
+        for add, item in media:
+            default = None if isinstance(item, dict) and 'left' in item else next(areas)
+            add(slide_obj, item, _box(item, default) if isinstance(item, dict) else default)
+
+        self.slide_count += 1
+        return slide_obj
+
+    def save(self, filename):
+        self.presentation.save(filename)
+
+
+def build_presentation(slides_content, content_font_size, title_font_size, template_file=None,
+                       media_dir=None):
+    """Build a styled presentation from a list of slide dicts"""
+    builder = PresentationBuilder(content_font_size, title_font_size, template_file, media_dir)
+    for slide in slides_content:
+        builder.add_slide(slide)
+    return builder.presentation
+
+
+MANIFEST_SUFFIX = '.manifest.json'
+MANIFEST_VERSION = 1
+
+
+def slide_digest(slide, media_dir=None):
+    """Content hash of a slide spec, including the size and modification time of its images"""
+    digest = hashlib.sha1(json.dumps(slide, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    for image in slide.get('images', ()):
+        path = image['path'] if isinstance(image, dict) else image
+        path = os.path.abspath(os.path.join(media_dir, path) if media_dir else path)
+        try:
+            stat = os.stat(path)
+            digest.update(f"\0{path}\0{stat.st_size}\0{stat.st_mtime_ns}".encode('utf-8'))
+        except OSError:
+            digest.update(f"\0{path}\0missing".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class IncrementalBuilder:
+    """Rebuilds `output_file` from a slide spec, regenerating only the slides that changed.
+
+    A manifest next to the output (``<output>.manifest.json``) records the
+    build settings and the content hash of every slide in deck order. When the
+    settings match, the existing deck is opened and each slide whose hash is
+    in the manifest is reused as it is, possibly at a new position; only new
+    or edited slides are generated, and slides that are no longer in the spec
+    are dropped. Anything else (no manifest, other fonts or template, a deck
+    edited by hand) falls back to a full build.
+
+    Has the same add_slide/save interface as PresentationBuilder.
+    """
+
+    def __init__(self, output_file, content_font_size, title_font_size, template_file=None,
+                 media_dir=None):
+        self.output_file = output_file
+        self.manifest_file = output_file + MANIFEST_SUFFIX
+        self.media_dir = media_dir
+        template_key = template_cache._key(template_file)
+        self.settings = [int(content_font_size), int(title_font_size),
+                         list(template_key) if template_key else None]
+
+        presentation = self._load_previous()
+        self.builder = PresentationBuilder(content_font_size, title_font_size, template_file,
+                                           media_dir, presentation)
+        self.presentation = self.builder.presentation
+        self.full_build = presentation is None
+
+        # digest -> sldId elements of reusable slides, in their old order
+        self._reusable = defaultdict(deque)
+        if not self.full_build:
+            for sldId, digest in zip(self.builder._sldIdLst.sldId_lst, self._previous_digests):
+                self._reusable[digest].append(sldId)
+        self._order = []
+        self.digests = []
+        self.reused = 0
+        self.built = 0
+        self.removed = 0
+
+    def _load_previous(self):
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (manifest.get('version') != MANIFEST_VERSION or manifest.get('settings') != self.settings
+                or not os.path.exists(self.output_file)):
+            return None
+        stat = os.stat(self.output_file)
+        if manifest.get('deck') != [stat.st_size, stat.st_mtime_ns]:
+            # The deck was written by something else since the last build
+            return None
+        try:
+            presentation = Presentation(self.output_file)
+        except Exception:
+            return None
+        if len(presentation.slides._sldIdLst) != len(manifest['slides']):
+            return None
+        self._previous_digests = manifest['slides']
+        return presentation
+
+    @property
+    def slide_count(self):
+        return len(self._order)
+
+    def add_slide(self, slide):
+        digest = slide_digest(slide, self.media_dir)
+        reusable = self._reusable.get(digest)
+        if reusable:
+            self._order.append(reusable.popleft())
+            self.reused += 1
+        else:
+            self.builder.add_slide(slide)
+            self._order.append(self.builder._sldIdLst[-1])
+            self.built += 1
+        self.digests.append(digest)
+
+    def save(self, filename=None):
+        """Write the deck in spec order and record its manifest"""
+        filename = filename or self.output_file
+        sldIdLst = self.builder._sldIdLst
+        presentation_part = self.presentation.part
+        for leftovers in self._reusable.values():
+            for sldId in leftovers:
+                # Without its relationship the slide part is no longer written
+                presentation_part.rels.pop(sldId.rId)
+                self.removed += 1
+        self._reusable.clear()
+
+        for sldId in list(sldIdLst):
+            sldIdLst.remove(sldId)
+        for sldId in self._order:
+            sldIdLst.append(sldId)
+        presentation_part.rename_slide_parts([sldId.rId for sldId in self._order])
+        self.builder.save(filename)
+
+        stat = os.stat(filename)
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'settings': self.settings,
+            'deck': [stat.st_size, stat.st_mtime_ns],
+            'slides': self.digests,
+        }
+        manifest_file = filename + MANIFEST_SUFFIX
+        temp_file = f"{manifest_file}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(temp_file, manifest_file)
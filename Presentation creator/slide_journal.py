@@ -0,0 +1,229 @@
+"""Append-only autosave journal for the slide list.
+
+Every change to the slide list is recorded as one small JSON line, for
+example ``{"op": "set", "row": 4, "slide": {...}}``, instead of rewriting the
+whole slide spec. Lines are written and flushed on a background thread in
+batches. After a crash the slide list is recovered by replaying the journal
+from its last checkpoint, a ``reset`` line holding the full slide list.
+
+Every running instance writes its own journal, ``autosave-<pid>-<start>.jsonl``,
+next to a lock file it holds until it exits. A journal whose lock can be
+taken belongs to a session that ended without closing it, and is offered
+for recovery by the next instance to start.
+"""
+import glob
+import json
+import os
+import queue
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+FLUSH_INTERVAL = 0.5
+JOURNAL_PATTERN = "autosave*.jsonl"
+_STOP = object()
+
+
+def _lock_path(journal_path):
+    return os.path.splitext(journal_path)[0] + ".lock"
+
+
+def _try_lock(path):
+    """Open and exclusively lock `path` without waiting; returns the open file, or None if it is held"""
+    f = open(path, "a+b")
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class StaleJournal:
+    """A journal left by a session that ended without closing it, locked while it is recovered"""
+
+    def __init__(self, path, lock):
+        self.path = path
+        self._lock = lock
+
+    def replay(self):
+        return replay_journal(self.path)
+
+    def discard(self):
+        """Delete the journal once its slides are recovered or declined"""
+        _remove(self.path)
+        self.release(remove_lock=True)
+
+    def release(self, remove_lock=False):
+        """Leave the journal for a later start to recover"""
+        self._lock.close()
+        if remove_lock:
+            _remove(_lock_path(self.path))
+
+
+def claim_stale_journals(directory):
+    """Journals in `directory` whose owners are gone, newest first, each locked against other instances"""
+    stale = []
+    for path in glob.glob(os.path.join(directory, JOURNAL_PATTERN)):
+        try:
+            lock = _try_lock(_lock_path(path))
+        except OSError:
+            continue  # No lock can be made here, so nothing can be recovered safely
+        if lock is not None:
+            stale.append(StaleJournal(path, lock))
+    stale.sort(key=lambda journal: os.path.getmtime(journal.path), reverse=True)
+    return stale
+
+
+class _Checkpoint:
+    def __init__(self, slides):
+        self.slides = slides
+
+
+def apply_op(slides, op):
+    """Apply one journal entry to a list of slide dicts in place"""
+    kind = op["op"]
+    if kind == "reset":
+        slides[:] = op["slides"]
+    elif kind == "insert":
+        slides.insert(op["row"], op["slide"])
+    elif kind == "set":
+        slides[op["row"]] = op["slide"]
+    elif kind == "remove":
+        del slides[op["row"]:op["row"] + op["count"]]
+    elif kind == "move":
+        row, count, destination = op["row"], op["count"], op["to"]
+        moved = slides[row:row + count]
+        del slides[row:row + count]
+        insert_at = destination - count if destination > row else destination
+        slides[insert_at:insert_at] = moved
+    else:
+        raise ValueError(f"unknown journal entry '{kind}'")
+
+
+def replay_journal(path):
+    """Rebuild the slide list recorded in `path`, or return None if there is nothing to recover"""
+    slides = []
+    recorded = False
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash is the last one written
+                    break
+                try:
+                    apply_op(slides, op)
+                except (IndexError, KeyError, TypeError, ValueError):
+                    # An entry that does not fit the list: recover what came before it
+                    break
+                recorded = True
+    except OSError:
+        return None
+    return slides if recorded else None
+
+
+class SlideJournal:
+    """Records slide list changes to `path` from a background writer thread"""
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._lock = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="slide-journal", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def for_instance(cls, directory, flush_interval=FLUSH_INTERVAL):
+        """This process's own journal in `directory`, locked for as long as it is open"""
+        os.makedirs(directory, exist_ok=True)
+        # The start time keeps the name unique even if an earlier process had the same pid
+        path = os.path.join(directory, f"autosave-{os.getpid()}-{time.time_ns():x}.jsonl")
+        lock = _try_lock(_lock_path(path))
+        if lock is None:
+            raise OSError(f"journal {path} is in use")
+        journal = cls(path, flush_interval)
+        journal._lock = lock
+        return journal
+
+    def record(self, op):
+        self._queue.put(op)
+
+    def checkpoint(self, slides):
+        """Start a new journal holding just `slides`, dropping the entries before it"""
+        # A shallow copy is enough: slide dicts are replaced, never edited in place
+        self._queue.put(_Checkpoint(list(slides)))
+
+    def close(self, discard=False):
+        """Write everything still queued; with `discard`, delete the journal afterwards"""
+        self._queue.put(_STOP)
+        self._thread.join()
+        if discard:
+            _remove(self.path)
+        if self._lock is not None:
+            # Unlocked, a kept journal is stale and will be offered for recovery
+            self._lock.close()
+            self._lock = None
+            if discard:
+                _remove(_lock_path(self.path))
+
+    def _next_batch(self):
+        """Block for one entry, then collect whatever else arrives within the flush interval"""
+        batch = [self._queue.get()]
+        # Timed from the first entry, so a steady stream of edits is still written every interval
+        deadline = time.monotonic() + self.flush_interval
+        while batch[-1] is not _STOP:
+            try:
+                batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        f = open(self.path, "a", encoding="utf-8")
+        try:
+            while True:
+                batch = self._next_batch()
+                for item in batch:
+                    if item is _STOP:
+                        break
+                    if isinstance(item, _Checkpoint):
+                        f.close()
+                        temp_file = f"{self.path}.tmp"
+                        with open(temp_file, "w", encoding="utf-8") as checkpoint:
+                            checkpoint.write(_dumps({"op": "reset", "slides": item.slides}))
+                        os.replace(temp_file, self.path)
+                        f = open(self.path, "a", encoding="utf-8")
+                    else:
+                        f.write(_dumps(item))
+                f.flush()
+                os.fsync(f.fileno())
+                if batch[-1] is _STOP:
+                    return
+        finally:
+            f.close()
+
+
+def _dumps(op):
+    return json.dumps(op, ensure_ascii=False, separators=(",", ":")) + "\n"
@@ -0,0 +1,182 @@
+"""Slide previews for the Presentation creator.
+
+Slides are drawn into QImages on a thread pool, roughly matching the title
+and content placeholders of the default "Title and Content" layout, and kept
+as QPixmaps in an LRU cache. Cache keys are built from the slide text, the
+font sizes and the image width, so an edit only invalidates the slide it
+touches and nothing has to be cleared explicitly.
+"""
+from collections import OrderedDict
+
+from PyQt5.QtCore import (Qt, QObject, QRunnable, QThreadPool, QRectF, QSize, QTimer,
+                          pyqtSignal)
+from PyQt5.QtGui import QImage, QPainter, QColor, QFont, QPixmap, QPen
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle
+
+SLIDE_ROLE = Qt.UserRole + 1
+
+# Default 4:3 slide and "Title and Content" placeholder boxes, in points
+SLIDE_WIDTH_PT = 720
+SLIDE_HEIGHT_PT = 540
+TITLE_BOX_PT = (36, 21.6, 648, 90)
+BODY_BOX_PT = (36, 126, 648, 356.4)
+FONT_FAMILY = 'Times New Roman'
+
+THUMBNAIL_WIDTH = 160
+PREVIEW_WIDTH = 320
+CACHE_CAPACITY = 800
+MAX_QUEUED_RENDERS = 256
+
+
+def preview_key(slide, title_font_size, content_font_size, width):
+    return (slide.get('title', ''), slide.get('content', ''), title_font_size, content_font_size, width)
+
+
+def render_slide(title, content, title_font_size, content_font_size, width):
+    """Draw one slide into a QImage `width` pixels wide; font sizes are in points"""
+    height = round(width * SLIDE_HEIGHT_PT / SLIDE_WIDTH_PT)
+    scale = width / SLIDE_WIDTH_PT
+    image = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.white)
+
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.TextAntialiasing)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.setPen(QPen(QColor('#c0c0c0')))
+    painter.drawRect(0, 0, width - 1, height - 1)
+
+    def box(rect):
+        x, y, w, h = rect
+        return QRectF(x * scale, y * scale, w * scale, h * scale)
+
+    def font(points):
+        f = QFont(FONT_FAMILY)
+        f.setPixelSize(max(1, round(points * scale)))
+        return f
+
+    painter.setPen(Qt.black)
+    painter.setFont(font(title_font_size))
+    painter.drawText(box(TITLE_BOX_PT), Qt.AlignCenter | Qt.TextWordWrap, title)
+
+    bullets = "\n".join(f"• {line}" if line.strip() else line for line in content.split("\n"))
+    body = box(BODY_BOX_PT)
+    painter.setClipRect(body)
+    painter.setFont(font(content_font_size))
+    painter.drawText(body, Qt.AlignLeft | Qt.AlignTop | Qt.TextWordWrap, bullets)
+    painter.end()
+    return image
+
+
+class _RenderTask(QRunnable):
+    def __init__(self, cache, key):
+        super().__init__()
+        self.cache = cache
+        self.key = key
+
+    def run(self):
+        image = render_slide(*self.key)
+        # Delivered through a queued connection to the cache's (GUI) thread
+        self.cache.image_rendered.emit(self.key, image)
+
+
+class PreviewCache(QObject):
+    """LRU cache of rendered slides that renders misses in the background"""
+    image_rendered = pyqtSignal(object, QImage)
+    preview_ready = pyqtSignal(object)
+
+    def __init__(self, capacity=CACHE_CAPACITY, parent=None):
+        super().__init__(parent)
+        self.capacity = capacity
+        self._pixmaps = OrderedDict()
+        self._queued = OrderedDict()
+        self._in_flight = set()
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max(1, min(4, QThreadPool.globalInstance().maxThreadCount() - 1)))
+        self.image_rendered.connect(self._store)
+
+    def get(self, key):
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+        return pixmap
+
+    def request(self, key):
+        """Schedule `key` for rendering; the most recently requested keys are rendered first"""
+        if key in self._pixmaps or key in self._in_flight:
+            return
+        self._queued[key] = None
+        self._queued.move_to_end(key)
+        while len(self._queued) > MAX_QUEUED_RENDERS:
+            # Slides scrolled past long ago are not worth rendering any more
+            self._queued.popitem(last=False)
+        self._dispatch()
+
+    def _dispatch(self):
+        while self._queued and len(self._in_flight) < self._pool.maxThreadCount():
+            key, _ = self._queued.popitem()
+            self._in_flight.add(key)
+            self._pool.start(_RenderTask(self, key))
+
+    def _store(self, key, image):
+        self._in_flight.discard(key)
+        self._pixmaps[key] = QPixmap.fromImage(image)
+        while len(self._pixmaps) > self.capacity:
+            self._pixmaps.popitem(last=False)
+        self.preview_ready.emit(key)
+        self._dispatch()
+
+    def shutdown(self):
+        self._queued.clear()
+        self._pool.waitForDone()
+
+
+class SlideThumbnailDelegate(QStyledItemDelegate):
+    """Paints cached slide thumbnails, requesting the visible ones that are missing"""
+    MARGIN = 6
+
+    def __init__(self, cache, font_sizes, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        # Callable returning the current (title, content) font sizes in points
+        self.font_sizes = font_sizes
+        self.thumbnail_height = round(THUMBNAIL_WIDTH * SLIDE_HEIGHT_PT / SLIDE_WIDTH_PT)
+
+    def sizeHint(self, option, index):
+        return QSize(THUMBNAIL_WIDTH + 2 * self.MARGIN, self.thumbnail_height + 2 * self.MARGIN)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+
+        target = QRectF(option.rect.x() + self.MARGIN, option.rect.y() + self.MARGIN,
+                        THUMBNAIL_WIDTH, self.thumbnail_height)
+        key = preview_key(index.data(SLIDE_ROLE), *self.font_sizes(), THUMBNAIL_WIDTH)
+        pixmap = self.cache.get(key)
+        if pixmap is not None:
+            painter.drawPixmap(target.topLeft(), pixmap)
+        else:
+            painter.fillRect(target, QColor('#f4f4f4'))
+            painter.setPen(QColor('#c0c0c0'))
+            painter.drawRect(target)
+            self.cache.request(key)
+
+        painter.setPen(QColor('#606060'))
+        painter.drawText(target.adjusted(4, 2, -4, -2), Qt.AlignLeft | Qt.AlignBottom, str(index.row() + 1))
+        painter.restore()
+
+
+class ViewportRefresher(QObject):
+    """Coalesces 'thumbnail ready' notifications into one repaint per frame"""
+
+    def __init__(self, view, interval=30):
+        super().__init__(view)
+        self.view = view
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.view.viewport().update)
+
+    def schedule(self, *args):
+        if not self.timer.isActive():
+            self.timer.start()
@@ -0,0 +1,279 @@
+"""Streaming loader and validator for JSON slide specs.
+
+A slide spec is a JSON array of slide objects such as
+``{"title": "Welcome", "content": "First line\\nSecond line"}``. The array is
+parsed one slide at a time from fixed-size chunks, so memory use does not
+depend on the size of the file, and every slide is checked against
+``SLIDE_SCHEMA`` with its position in the file.
+
+Slides may also choose a layout and carry media, for example::
+
+    {"title": "Results", "layout": 5,
+     "images": ["logo.png", {"path": "plot.png", "left": 1, "top": 2, "width": 4, "height": 3}],
+     "table": {"rows": [["Region", "Sales"], ["North", 120]]},
+     "chart": {"type": "bar", "categories": ["Q1", "Q2"],
+               "series": [{"name": "Sales", "values": [120, 135]}]}}
+
+Positions are in inches and optional; media without one share the content area.
+"""
+import codecs
+import json
+import re
+
+CHUNK_SIZE = 256 * 1024
+MAX_SLIDE_CHARS = 16 * 1024 * 1024
+MAX_REPORTED_ERRORS = 20
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+CHART_TYPES = ("column", "bar", "line", "pie")
+POSITION_FIELDS = ("left", "top", "width", "height")
+
+# field name -> (accepted types, required)
+SLIDE_SCHEMA = {
+    "title": (str, True),
+    "content": (str, False),
+    "layout": (int, False),
+    "images": (list, False),
+    "table": (dict, False),
+    "chart": (dict, False),
+}
+
+
+class SlideSpecError(ValueError):
+    """Raised for malformed or invalid slide specs.
+
+    `errors` holds ``(slide_index, line, column, message)`` tuples; the slide
+    index is None for syntax errors outside of a slide.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("\n".join(format_error(*error) for error in errors))
+
+
+def format_error(index, line, column, message):
+    where = f"line {line}, column {column}"
+    if index is not None:
+        where = f"slide {index + 1} ({where})"
+    return f"{where}: {message}"
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _validate_position(item, where):
+    given = [field for field in POSITION_FIELDS if field in item]
+    if given and len(given) != len(POSITION_FIELDS):
+        return [f"{where} must give all of {', '.join(POSITION_FIELDS)} or none of them"]
+    return [f"{where} field '{field}' must be a number of inches"
+            for field in given if not _is_number(item[field])]
+
+
+def _validate_images(images):
+    problems = []
+    for i, image in enumerate(images):
+        where = f"image {i + 1}"
+        if isinstance(image, dict):
+            if not isinstance(image.get("path"), str):
+                problems.append(f"{where} needs a 'path' string")
+            problems.extend(_validate_position(image, where))
+        elif not isinstance(image, str):
+            problems.append(f"{where} must be a path or an object with a 'path'")
+    return problems
+
+
+def _validate_table(table):
+    rows = table.get("rows")
+    if not isinstance(rows, list) or not rows or not all(isinstance(row, list) and row for row in rows):
+        return ["table needs 'rows', a non-empty list of non-empty lists"]
+    problems = _validate_position(table, "table")
+    if any(isinstance(cell, (list, dict)) for row in rows for cell in row):
+        problems.append("table cells must be text or numbers")
+    if "font_size" in table and not _is_number(table["font_size"]):
+        problems.append("table field 'font_size' must be a number of points")
+    return problems
+
+
+def _validate_chart(chart):
+    problems = _validate_position(chart, "chart")
+    if chart.get("type", "column") not in CHART_TYPES:
+        problems.append(f"chart type must be one of {', '.join(CHART_TYPES)}")
+    categories = chart.get("categories")
+    if not isinstance(categories, list) or not categories:
+        problems.append("chart needs 'categories', a non-empty list")
+        return problems
+    series = chart.get("series")
+    if not isinstance(series, list) or not series:
+        problems.append("chart needs 'series', a non-empty list of {name, values} objects")
+        return problems
+    for i, item in enumerate(series):
+        if (not isinstance(item, dict) or not isinstance(item.get("name"), str)
+                or not isinstance(item.get("values"), list)
+                or not all(value is None or _is_number(value) for value in item["values"])):
+            problems.append(f"chart series {i + 1} needs a 'name' and a list of numeric 'values'")
+        elif len(item["values"]) != len(categories):
+            problems.append(f"chart series {i + 1} has {len(item['values'])} values "
+                            f"for {len(categories)} categories")
+    return problems
+
+
+# Checks of the nested structure of fields that passed the type check
+FIELD_VALIDATORS = {
+    "layout": lambda layout: [] if layout >= 0 else ["field 'layout' must not be negative"],
+    "images": _validate_images,
+    "table": _validate_table,
+    "chart": _validate_chart,
+}
+
+
+def validate_slide(slide):
+    """Return the list of schema violations of one slide object"""
+    if not isinstance(slide, dict):
+        return [f"expected an object, got {type(slide).__name__}"]
+    problems = []
+    for field, (types, required) in SLIDE_SCHEMA.items():
+        if field not in slide:
+            if required:
+                problems.append(f"missing required field '{field}'")
+        elif not isinstance(slide[field], types) or isinstance(slide[field], bool):
+            expected = types.__name__ if isinstance(types, type) else " or ".join(t.__name__ for t in types)
+            problems.append(f"field '{field}' must be {expected}, got {type(slide[field]).__name__}")
+        elif field in FIELD_VALIDATORS:
+            problems.extend(FIELD_VALIDATORS[field](slide[field]))
+    for field in slide:
+        if field not in SLIDE_SCHEMA:
+            problems.append(f"unknown field '{field}'")
+    return problems
+
+
+class _PositionTracker:
+    """Maps character offsets of the consumed stream to line and column numbers"""
+
+    def __init__(self):
+        self.line = 1
+        self.column = 1
+
+    def advance(self, text, start, end):
+        newlines = text.count("\n", start, end)
+        if newlines:
+            self.line += newlines
+            self.column = end - text.rindex("\n", start, end)
+        else:
+            self.column += end - start
+
+    def locate(self, text, start, pos):
+        """Line and column of `pos` in `text`, given that `start` is the current position"""
+        newlines = text.count("\n", start, pos)
+        if newlines:
+            return self.line + newlines, pos - text.rindex("\n", start, pos)
+        return self.line, self.column + pos - start
+
+
+def iter_slides(file_obj, progress=None):
+    """Yield ``(index, line, column, slide)`` for every element of the top-level array.
+
+    `file_obj` must be opened in binary mode. `progress`, if given, is called
+    with the number of bytes read so far after every chunk. Syntax errors
+    raise SlideSpecError.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tracker = _PositionTracker()
+    buffer = ""
+    pos = 0
+    bytes_read = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, bytes_read, eof
+        chunk = file_obj.read(CHUNK_SIZE)
+        bytes_read += len(chunk)
+        # Drop the consumed part only when reading, so each slide costs no copying
+        buffer = buffer[pos:] + text_decoder.decode(chunk, final=not chunk)
+        pos = 0
+        eof = not chunk
+        if progress is not None:
+            progress(bytes_read)
+
+    def consume(end):
+        nonlocal pos
+        tracker.advance(buffer, pos, end)
+        pos = end
+
+    def skip_whitespace():
+        while True:
+            consume(WHITESPACE.match(buffer, pos).end())
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    def fail(index, error_pos, message):
+        raise SlideSpecError([(index, *tracker.locate(buffer, pos, error_pos), message)])
+
+    skip_whitespace()
+    if not buffer.startswith("[", pos):
+        fail(None, pos, "a slide spec must be a JSON array of slides")
+    consume(pos + 1)
+
+    index = 0
+    while True:
+        skip_whitespace()
+        if buffer.startswith("]", pos):
+            consume(pos + 1)
+            break
+        if index:
+            if not buffer.startswith(",", pos):
+                fail(None, pos, "expected ',' or ']' after a slide")
+            consume(pos + 1)
+            skip_whitespace()
+
+        while True:
+            try:
+                slide, end = decoder.raw_decode(buffer, pos)
+                # A number could continue in the next chunk
+                if end < len(buffer) or eof or not isinstance(slide, (int, float)):
+                    break
+            except json.JSONDecodeError as e:
+                if eof:
+                    fail(index, e.pos, e.msg)
+                if len(buffer) - pos > MAX_SLIDE_CHARS:
+                    fail(index, pos, "slide is too large or malformed")
+            fill()
+
+        yield (index, *tracker.locate(buffer, pos, pos), slide)
+        consume(end)
+        index += 1
+
+    skip_whitespace()
+    if pos < len(buffer):
+        fail(None, pos, "unexpected data after the slide array")
+
+
+def iter_valid_slides(file_obj, progress=None):
+    """Yield slides, raising SlideSpecError at the first invalid one"""
+    for index, line, column, slide in iter_slides(file_obj, progress):
+        problems = validate_slide(slide)
+        if problems:
+            raise SlideSpecError([(index, line, column, problem) for problem in problems])
+        yield slide
+
+
+def load_slides(path, progress=None, max_errors=MAX_REPORTED_ERRORS):
+    """Load and validate a whole slide spec.
+
+    Schema errors are collected (up to `max_errors`) and raised together as a
+    SlideSpecError, so that one load reports every broken slide.
+    """
+    slides = []
+    errors = []
+    with open(path, "rb") as f:
+        for index, line, column, slide in iter_slides(f, progress):
+            for problem in validate_slide(slide):
+                errors.append((index, line, column, problem))
+            if len(errors) >= max_errors:
+                break
+            slides.append(slide)
+    if errors:
+        raise SlideSpecError(errors[:max_errors])
+    return slides